@@ -0,0 +1,174 @@
+"""
+Local stand-in for the Groq chat completions endpoint, for tests and
+benchmarks. Point LLMClient (or LLM_BASE_URL) at `server.url`.
+
+    with FakeLLMServer(latency=0.1) as server:
+        server.fail_next(429, retry_after=0.2)
+        LLMClient(api_key="test", base_url=server.url).complete("hi")
+
+Replies echo the first sentence of the system prompt, so callers can tell
+which agent a reply belongs to. The model "writes" a word every
+`token_latency` seconds after the first; streaming requests get each word
+as a server-sent event as it is written.
+"""
+import json
+import re
+import sys
+import threading
+import time
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from backend.agents.llm_client import estimate_tokens
+
+COMPLETIONS_PATH = "/openai/v1/chat/completions"
+
+class _Server(ThreadingHTTPServer):
+    def handle_error(self, request, client_address):
+        # Clients hanging up mid-reply (timeouts, abandoned streams) are expected here
+        if not isinstance(sys.exc_info()[1], ConnectionError):
+            super().handle_error(request, client_address)
+
+class FakeLLMServer:
+    def __init__(self, latency=0.0, reply=None, limit=None, window=60.0, token_latency=0.0):
+        self.latency = latency
+        self.token_latency = token_latency
+        # Like the provider: more than `limit` requests per `window` seconds get a 429
+        self.limit = limit
+        self.window = window
+        self._recent = deque()
+        self.rejected = 0
+        # reply(messages) -> text; defaults to echoing the system prompt
+        self.reply = reply or _echo
+        self.requests = [] # request bodies, in arrival order
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self._failures = [] # (status, retry_after) to answer the next requests with
+        self._lock = threading.Lock()
+        self._server = _Server(("127.0.0.1", 0), self._handler())
+        self._server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def url(self):
+        return f"http://127.0.0.1:{self._server.server_address[1]}"
+
+    def fail_next(self, status, times=1, retry_after=None):
+        with self._lock:
+            self._failures.extend([(status, retry_after)] * times)
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def _over_limit(self):
+        if self.limit is None:
+            return None
+        now = time.monotonic()
+        while self._recent and self._recent[0] <= now - self.window:
+            self._recent.popleft()
+        if len(self._recent) >= self.limit:
+            self.rejected += 1
+            return 429, round(self._recent[0] + self.window - now, 3)
+        self._recent.append(now)
+        return None
+
+    def _handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1" # keep-alive, like the real API
+
+            def do_POST(self):
+                if self.path != COMPLETIONS_PATH:
+                    return self._send(404, {"error": {"message": "Not found"}})
+                body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))))
+                with server._lock:
+                    server.requests.append(body)
+                    failure = server._failures.pop(0) if server._failures else server._over_limit()
+                    server.in_flight += 1
+                    server.max_in_flight = max(server.max_in_flight, server.in_flight)
+                try:
+                    if failure is not None:
+                        status, retry_after = failure
+                        headers = {"retry-after": str(retry_after)} if retry_after is not None else {}
+                        return self._send(status, {"error": {"message": f"Fake error {status}"}}, headers)
+                    time.sleep(server.latency)
+                    content = server.reply(body["messages"])
+                    prompt_tokens = sum(estimate_tokens(m["content"]) for m in body["messages"])
+                    usage = {"prompt_tokens": prompt_tokens, "completion_tokens": estimate_tokens(content),
+                             "total_tokens": prompt_tokens + estimate_tokens(content)}
+                    if body.get("stream"):
+                        return self._send_stream(body["model"], content, usage)
+                    # The whole reply is generated before it is sent
+                    time.sleep(server.token_latency * max(len(_words(content)) - 1, 0))
+                    self._send(200, {
+                        "id": "fake", "object": "chat.completion", "created": int(time.time()), "model": body["model"],
+                        "choices": [{"index": 0, "finish_reason": "stop",
+                                     "message": {"role": "assistant", "content": content}}],
+                        "usage": usage
+                    })
+                finally:
+                    with server._lock:
+                        server.in_flight -= 1
+
+            def _send(self, status, payload, headers=None):
+                data = json.dumps(payload).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                for name, value in (headers or {}).items():
+                    self.send_header(name, value)
+                self.end_headers()
+                self.wfile.write(data)
+
+            def _send_stream(self, model, content, usage):
+                self.send_response(200)
+                self.send_header("Content-Type", "text/event-stream")
+                self.send_header("Transfer-Encoding", "chunked")
+                self.end_headers()
+                words = _words(content) or [""]
+                try:
+                    for i, word in enumerate(words):
+                        last = i == len(words) - 1
+                        chunk = {"id": "fake", "object": "chat.completion.chunk", "created": int(time.time()),
+                                 "model": model, "choices": [{"index": 0, "delta": {"content": word},
+                                                              "finish_reason": "stop" if last else None}]}
+                        if last:
+                            chunk["x_groq"] = {"id": "fake", "usage": usage} # where Groq puts it
+                        if i:
+                            time.sleep(server.token_latency)
+                        self._write_chunk(f"data: {json.dumps(chunk)}\n\n")
+                    self._write_chunk("data: [DONE]\n\n")
+                    self._write_chunk("")
+                except (BrokenPipeError, ConnectionResetError):
+                    # The client stopped reading
+                    self.close_connection = True
+
+            def _write_chunk(self, text):
+                data = text.encode("utf-8")
+                self.wfile.write(f"{len(data):x}\r\n".encode("ascii") + data + b"\r\n")
+                self.wfile.flush()
+
+            def log_message(self, *args):
+                pass
+
+        return Handler
+
+def _echo(messages):
+    system = next((m["content"] for m in messages if m["role"] == "system"), "")
+    return f"report for: {system.split('.')[0]}"
+
+def _words(text):
+    return re.findall(r"\S+\s*", text)
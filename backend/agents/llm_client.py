@@ -0,0 +1,333 @@
+"""
+Shared client for the Groq chat completions API.
+
+One LLMClient runs its own event loop on a background thread, so every
+caller (agent worker threads through complete(), async code through
+acomplete()) shares the same:
+
+  - HTTP connection pool (keep-alive), with at most `max_concurrency`
+    requests in flight
+  - token buckets for requests and tokens per minute, the provider's
+    limits, so bursts wait here instead of coming back as 429s
+  - retries with full-jitter exponential backoff on 429, 5xx, timeouts and
+    connection errors, honouring Retry-After
+  - latency and token usage stats
+
+stream() yields the reply as it is generated, for callers that show it live.
+
+Failures raise LLMError instead of returning an error string. Set
+`base_url` to a local server (backend/agents/fake_server.py) to run
+without the real API.
+"""
+import asyncio
+import queue
+import random
+import threading
+import time
+from collections import deque
+
+import groq
+import httpx
+
+DEFAULT_RPM = 30
+DEFAULT_TPM = 12000
+DEFAULT_MAX_CONCURRENCY = 8
+DEFAULT_TIMEOUT = 30.0 # seconds per attempt
+DEFAULT_MAX_RETRIES = 4
+# Backoff before retry n is uniform in [0, min(BACKOFF_MAX, BACKOFF_BASE * 2**n)] seconds
+DEFAULT_BACKOFF_BASE = 0.5
+DEFAULT_BACKOFF_MAX = 20.0
+
+_DONE = object() # end of a stream()
+
+class LLMError(Exception):
+    """A completion that failed for good (after any retries)."""
+    def __init__(self, message, status=None, retryable=False):
+        super().__init__(message)
+        self.status = status
+        self.retryable = retryable
+
+class LLMTimeoutError(LLMError):
+    pass
+
+def estimate_tokens(text):
+    """Rough token count (~4 characters per token for English), for rate limiting."""
+    return len(text or "") // 4 + 1
+
+class TokenBucket:
+    """
+    Refills at `per_minute` / 60 units per second, up to `capacity` (a
+    minute's worth by default). Not thread-safe: LLMClient only uses it
+    from its own event loop.
+    """
+    def __init__(self, per_minute, capacity=None, clock=time.monotonic):
+        self.rate = per_minute / 60.0
+        self.capacity = capacity or per_minute
+        self.clock = clock
+        self.tokens = self.capacity
+        self.updated = clock()
+
+    def delay(self, amount):
+        """Seconds until `amount` can be taken; an amount over capacity waits for a full bucket."""
+        self._refill()
+        return max(0.0, (min(amount, self.capacity) - self.tokens) / self.rate)
+
+    def take(self, amount):
+        self._refill()
+        self.tokens -= amount # may go negative: the overdraft delays later callers
+
+    def give_back(self, amount):
+        """Returns unused units (or, when negative, charges extra)."""
+        self._refill()
+        self.tokens = min(self.capacity, self.tokens + amount)
+
+    def _refill(self):
+        now = self.clock()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+class LLMClient:
+    def __init__(self, api_key, base_url=None, model=None, rpm=DEFAULT_RPM, tpm=DEFAULT_TPM,
+                 max_concurrency=DEFAULT_MAX_CONCURRENCY, timeout=DEFAULT_TIMEOUT, max_retries=DEFAULT_MAX_RETRIES,
+                 backoff_base=DEFAULT_BACKOFF_BASE, backoff_max=DEFAULT_BACKOFF_MAX):
+        self.api_key = api_key
+        self.base_url = base_url
+        self.model = model
+        self.max_concurrency = max_concurrency
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        # 0 disables a limit
+        self.request_bucket = TokenBucket(rpm) if rpm else None
+        self.token_bucket = TokenBucket(tpm) if tpm else None
+
+        self._loop = None
+        self._thread = None
+        self._api = None
+        self._semaphore = None
+        self._paused_until = 0.0 # set from a 429's Retry-After, holds back every caller
+        self._lock = threading.Lock()
+        self._stats = dict.fromkeys(("requests", "succeeded", "failed", "retries", "rate_limited",
+                                     "prompt_tokens", "completion_tokens"), 0)
+        self._stats["throttled_seconds"] = 0.0
+        self._latencies = deque(maxlen=1000) # ms, successful attempts
+
+    def complete(self, prompt, system_prompt=None, temperature=0.3, max_tokens=500):
+        """Blocking completion, safe to call from any thread. Returns the reply text."""
+        future = asyncio.run_coroutine_threadsafe(
+            self._complete(prompt, system_prompt, temperature, max_tokens), self._ensure_loop())
+        return future.result()
+
+    async def acomplete(self, prompt, system_prompt=None, temperature=0.3, max_tokens=500):
+        """Awaitable completion, from any event loop."""
+        loop = self._ensure_loop()
+        coro = self._complete(prompt, system_prompt, temperature, max_tokens)
+        if asyncio.get_running_loop() is loop:
+            return await coro
+        return await asyncio.wrap_future(asyncio.run_coroutine_threadsafe(coro, loop))
+
+    def stream(self, prompt, system_prompt=None, temperature=0.3, max_tokens=500):
+        """
+        Blocking generator of reply text pieces as the model produces them,
+        safe to call from any thread. Raises LLMError if the request fails.
+        """
+        pieces = queue.Queue()
+        future = asyncio.run_coroutine_threadsafe(
+            self._pump(self._stream(prompt, system_prompt, temperature, max_tokens), pieces.put),
+            self._ensure_loop())
+        try:
+            while (piece := pieces.get()) is not _DONE:
+                yield piece
+            future.result()
+        finally:
+            # Caller stopped reading: drop the request
+            future.cancel()
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+            latencies = sorted(self._latencies)
+        stats["throttled_seconds"] = round(stats["throttled_seconds"], 3)
+        if latencies:
+            stats["latency_ms"] = {
+                "avg": round(sum(latencies) / len(latencies)),
+                "p50": latencies[len(latencies) // 2],
+                "p95": latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))]
+            }
+        return stats
+
+    def close(self):
+        with self._lock:
+            loop, thread = self._loop, self._thread
+            self._loop = self._thread = None
+        if loop is None:
+            return
+        if self._api is not None:
+            asyncio.run_coroutine_threadsafe(self._api.close(), loop).result()
+            self._api = None
+        loop.call_soon_threadsafe(loop.stop)
+        thread.join()
+        loop.close()
+
+    def _ensure_loop(self):
+        with self._lock:
+            if self._loop is None:
+                self._loop = asyncio.new_event_loop()
+                self._thread = threading.Thread(target=self._loop.run_forever, name="llm-client", daemon=True)
+                self._thread.start()
+            return self._loop
+
+    async def _pump(self, pieces, put):
+        try:
+            async for piece in pieces:
+                put(piece)
+        finally:
+            put(_DONE)
+
+    def _setup(self):
+        # Created on the client's loop, which the connection pool is bound to
+        if self._api is None:
+            limits = httpx.Limits(max_connections=self.max_concurrency, max_keepalive_connections=self.max_concurrency)
+            self._api = groq.AsyncGroq(
+                api_key=self.api_key,
+                base_url=self.base_url,
+                timeout=self.timeout,
+                max_retries=0, # retried here, with the rate limiter in the loop
+                http_client=httpx.AsyncClient(limits=limits, timeout=self.timeout)
+            )
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+
+    async def _complete(self, prompt, system_prompt, temperature, max_tokens):
+        self._setup()
+        messages, estimate = self._request(prompt, system_prompt, max_tokens)
+
+        for attempt in range(self.max_retries + 1):
+            await self._acquire(estimate)
+            try:
+                async with self._semaphore:
+                    start = time.perf_counter()
+                    response = await self._api.chat.completions.create(
+                        model=self.model, messages=messages, temperature=temperature, max_tokens=max_tokens)
+                    latency_ms = round((time.perf_counter() - start) * 1000)
+            except Exception as e:
+                await self._retry_or_raise(e, attempt, estimate)
+                continue
+
+            self._finish(estimate, response.usage, latency_ms)
+            return (response.choices[0].message.content or "").strip()
+
+    async def _stream(self, prompt, system_prompt, temperature, max_tokens):
+        """Async generator of reply pieces. Only retried until the first piece is out."""
+        self._setup()
+        messages, estimate = self._request(prompt, system_prompt, max_tokens)
+
+        for attempt in range(self.max_retries + 1):
+            await self._acquire(estimate)
+            started = False
+            usage = None
+            try:
+                async with self._semaphore:
+                    start = time.perf_counter()
+                    response = await self._api.chat.completions.create(
+                        model=self.model, messages=messages, temperature=temperature, max_tokens=max_tokens,
+                        stream=True)
+                    async for chunk in response:
+                        # Groq reports usage on the last chunk, under x_groq
+                        usage = chunk.usage or (chunk.x_groq.usage if chunk.x_groq else None) or usage
+                        piece = chunk.choices[0].delta.content if chunk.choices else None
+                        if piece:
+                            started = True
+                            yield piece
+                    latency_ms = round((time.perf_counter() - start) * 1000)
+            except Exception as e:
+                if started:
+                    # Part of the reply is already out, a retry would repeat it
+                    self._count("failed")
+                    raise self._classify(e)[0] from e
+                await self._retry_or_raise(e, attempt, estimate)
+                continue
+
+            self._finish(estimate, usage, latency_ms)
+            return
+
+    def _request(self, prompt, system_prompt, max_tokens):
+        """(messages, token estimate) for one completion; counts the request."""
+        messages = []
+        if system_prompt:
+            messages.append({"role": "system", "content": system_prompt})
+        messages.append({"role": "user", "content": prompt})
+        self._count("requests")
+        # Providers count max_tokens against the budget until the reply's real usage is known
+        return messages, estimate_tokens(system_prompt) + estimate_tokens(prompt) + max_tokens
+
+    async def _retry_or_raise(self, e, attempt, estimate):
+        """Sleeps before the next attempt, or raises the LLMError for `e` when it's final."""
+        error, retry_after = self._classify(e)
+        if self.token_bucket is not None:
+            self.token_bucket.give_back(estimate)
+        if not error.retryable or attempt == self.max_retries:
+            self._count("failed")
+            if attempt:
+                error.args = (f"{error} (after {attempt + 1} attempts)",)
+            raise error from e
+        self._count("retries")
+        delay = random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempt))
+        if retry_after:
+            delay = max(delay, retry_after)
+            self._paused_until = max(self._paused_until, time.monotonic() + retry_after)
+        await asyncio.sleep(delay)
+
+    def _finish(self, estimate, usage, latency_ms):
+        if usage is not None:
+            if self.token_bucket is not None:
+                self.token_bucket.give_back(estimate - (usage.total_tokens or 0))
+            self._count("prompt_tokens", usage.prompt_tokens or 0)
+            self._count("completion_tokens", usage.completion_tokens or 0)
+        self._count("succeeded")
+        with self._lock:
+            self._latencies.append(latency_ms)
+
+    async def _acquire(self, tokens):
+        """Waits until the rate limits allow one request of `tokens` tokens, then takes them."""
+        waited = 0.0
+        while True:
+            delay = self._paused_until - time.monotonic()
+            if self.request_bucket is not None:
+                delay = max(delay, self.request_bucket.delay(1))
+            if self.token_bucket is not None:
+                delay = max(delay, self.token_bucket.delay(tokens))
+            if delay <= 0:
+                break
+            await asyncio.sleep(delay)
+            waited += delay
+        # Nothing awaits between the check and here, so no other request can take them first
+        if self.request_bucket is not None:
+            self.request_bucket.take(1)
+        if self.token_bucket is not None:
+            self.token_bucket.take(tokens)
+        if waited:
+            self._count("throttled_seconds", waited)
+
+    def _classify(self, e):
+        """(LLMError, Retry-After seconds or None) for an exception from the API call."""
+        if isinstance(e, groq.APITimeoutError):
+            return LLMTimeoutError(f"LLM request timed out after {self.timeout}s", retryable=True), None
+        if isinstance(e, groq.APIConnectionError):
+            return LLMError(f"LLM connection failed: {e}", retryable=True), None
+        if isinstance(e, groq.APIStatusError):
+            status = e.status_code
+            retry_after = None
+            if status == 429:
+                self._count("rate_limited")
+                try:
+                    retry_after = float(e.response.headers.get("retry-after"))
+                except (TypeError, ValueError):
+                    pass
+            return LLMError(f"LLM request failed ({status}): {e.message}", status=status,
+                            retryable=status == 429 or status >= 500), retry_after
+        return LLMError(f"LLM request failed: {e}"), None
+
+    def _count(self, key, amount=1):
+        with self._lock:
+            self._stats[key] += amount
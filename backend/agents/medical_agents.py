@@ -1,44 +1,65 @@
 
-from backend.agents.ollama_client import query_ollama
+from backend.agents.ollama_client import query_ollama, stream_ollama
 
 class BaseAgent:
-    def __init__(self, role, system_instruction):
+    def __init__(self, role, system_instruction, llm=None, stream_llm=None):
         self.role = role
         self.system_instruction = system_instruction
+        # Any callable with query_ollama's signature; tests pass a fake
+        self.llm = llm or query_ollama
+        # Same, but yielding the reply in pieces (stream_ollama). A plain fake
+        # `llm` without one streams its whole reply as a single piece.
+        if stream_llm is None:
+            stream_llm = _single_piece(llm) if llm else stream_ollama
+        self.stream_llm = stream_llm
 
     def run(self, data):
-        return query_ollama(f"Analyze this data:\n{data}", system_prompt=self.system_instruction)
+        return self.llm(f"Analyze this data:\n{data}", system_prompt=self.system_instruction)
 
 class VitalsAgent(BaseAgent):
-    def __init__(self):
+    def __init__(self, llm=None):
         super().__init__(
             role="Vitals Analyst",
-            system_instruction="You are an expert cardiologist assistant. Analyze the following vital signs history (Blood Pressure, Heart Rate). Identify trends (rising, falling, stable) and any immediate concerns based on standard medical guidelines. Be concise/bullet points."
+            system_instruction="You are an expert cardiologist assistant. Analyze the following vital signs history (Blood Pressure, Heart Rate). Identify trends (rising, falling, stable) and any immediate concerns based on standard medical guidelines. Be concise/bullet points.",
+            llm=llm
         )
 
 class LabAgent(BaseAgent):
-    def __init__(self):
+    def __init__(self, llm=None):
         super().__init__(
             role="Lab Specialist",
-            system_instruction="You are an expert pathologist assistant. Review the provided lab results (A1C, Cholesterol, etc.). Flag any abnormal values and what they might indicate long-term. Be concise/bullet points."
+            system_instruction="You are an expert pathologist assistant. Review the provided lab results (A1C, Cholesterol, etc.). Flag any abnormal values and what they might indicate long-term. Be concise/bullet points.",
+            llm=llm
         )
 
 class RiskAgent(BaseAgent):
-    def __init__(self):
+    def __init__(self, llm=None):
         super().__init__(
             role="Risk Assessor",
-            system_instruction="You are a genetic counselor and internal medicine specialist. Review the patient's demographics, genomic markers, and known risks. Identify top 3 potential future health risks. Be concise."
+            system_instruction="You are a genetic counselor and internal medicine specialist. Review the patient's demographics, genomic markers, and known risks. Identify top 3 potential future health risks. Be concise.",
+            llm=llm
         )
 
 class ScribeAgent(BaseAgent):
-    def __init__(self):
+    def __init__(self, llm=None, stream_llm=None):
         super().__init__(
             role="Medical Scribe",
-            system_instruction="You are a senior Chief Medical Officer. Synthesize the following reports from your team into a single, flowing, professional executive summary for the doctor. Focus on actionable insights. \n\nStructure:\n1. Patient Status (One sentence)\n2. Key Findings (Vitals & Labs)\n3. Risk Profile\n4. Recommendations."
+            system_instruction="You are a senior Chief Medical Officer. Synthesize the following reports from your team into a single, flowing, professional executive summary for the doctor. Focus on actionable insights. \n\nStructure:\n1. Patient Status (One sentence)\n2. Key Findings (Vitals & Labs)\n3. Risk Profile\n4. Recommendations.",
+            llm=llm,
+            stream_llm=stream_llm
         )
 
     def run(self, vitals_report, lab_report, risk_report, patient_info):
-        prompt = f"""
+        return self.llm(self.prompt(vitals_report, lab_report, risk_report, patient_info),
+                        system_prompt=self.system_instruction)
+
+    def stream(self, vitals_report, lab_report, risk_report, patient_info):
+        """run(), yielding the summary in pieces as the model writes it."""
+        return self.stream_llm(self.prompt(vitals_report, lab_report, risk_report, patient_info),
+                               system_prompt=self.system_instruction)
+
+    def prompt(self, vitals_report, lab_report, risk_report, patient_info):
+        return f"""
         Patient Context: {patient_info}
         
         [REPORT FROM VITALS ANALYST]
@@ -52,4 +73,8 @@ class ScribeAgent(BaseAgent):
         
         Please synthesize these into a final health summary.
         """
-        return query_ollama(prompt, system_prompt=self.system_instruction)
+
+def _single_piece(llm):
+    def stream(prompt, system_prompt=None):
+        yield llm(prompt, system_prompt=system_prompt)
+    return stream
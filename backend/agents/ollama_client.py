@@ -1,56 +1,125 @@
+import asyncio
 import os
+import threading
 from dotenv import load_dotenv
-from groq import Groq
+from backend.agents.llm_cache import LLMResponseCache, DEFAULT_CACHE_PATH, DEFAULT_TTL, DEFAULT_MAX_ENTRIES
+from backend.agents.llm_client import (LLMClient, LLMError, DEFAULT_RPM, DEFAULT_TPM, DEFAULT_MAX_CONCURRENCY,
+                                       DEFAULT_TIMEOUT, DEFAULT_MAX_RETRIES)
 
 # Load environment variables
 load_dotenv()
 
-# Initialize Groq client
-api_key = os.getenv("GROQ_API_KEY")
-if not api_key:
-    raise ValueError("GROQ_API_KEY not found in environment variables")
-
-client = Groq(api_key=api_key)
-
 MODEL_NAME = "llama-3.3-70b-versatile"
 
-def query_ollama(prompt, system_prompt=None):
-    """
-    Sends a prompt to Groq API using Llama 3.3
-    """
-    messages = []
-    
-    # Add system prompt if provided
-    if system_prompt:
-        messages.append({
-            "role": "system",
-            "content": system_prompt
-        })
-    
-    # Add user prompt
-    messages.append({
-        "role": "user",
-        "content": prompt
-    })
+_client = None
+_client_lock = threading.Lock()
+_cache = None
 
-    try:
-        response = client.chat.completions.create(
-            model=MODEL_NAME,
-            messages=messages,
-            temperature=0.3,  # Keep it factual
-            max_tokens=500    # Concise summaries
+def get_cache():
+    """Shared on-disk response cache, or None when LLM_CACHE_ENABLED=0."""
+    global _cache
+    if os.getenv("LLM_CACHE_ENABLED", "1") == "0":
+        return None
+    if _cache is None:
+        _cache = LLMResponseCache(
+            path=os.getenv("LLM_CACHE_PATH", DEFAULT_CACHE_PATH),
+            ttl=float(os.getenv("LLM_CACHE_TTL", DEFAULT_TTL)),
+            max_entries=int(os.getenv("LLM_CACHE_MAX_ENTRIES", DEFAULT_MAX_ENTRIES))
         )
-        
-        return response.choices[0].message.content.strip()
-    
-    except Exception as e:
-        return f"Error querying Groq: {str(e)}"
+    return _cache
+
+def get_client():
+    """
+    Shared LLMClient (pooled, rate-limited, retrying), created on first use
+    so agents can be imported (and tested) without an API key.
+    LLM_BASE_URL points it at another server, e.g. backend/agents/fake_server.py.
+    """
+    global _client
+    with _client_lock:
+        if _client is None:
+            api_key = os.getenv("GROQ_API_KEY")
+            if not api_key:
+                raise ValueError("GROQ_API_KEY not found in environment variables")
+            _client = LLMClient(
+                api_key=api_key,
+                base_url=os.getenv("LLM_BASE_URL") or None,
+                model=MODEL_NAME,
+                rpm=int(os.getenv("LLM_RPM", DEFAULT_RPM)),
+                tpm=int(os.getenv("LLM_TPM", DEFAULT_TPM)),
+                max_concurrency=int(os.getenv("LLM_MAX_CONCURRENCY", DEFAULT_MAX_CONCURRENCY)),
+                timeout=float(os.getenv("LLM_TIMEOUT", DEFAULT_TIMEOUT)),
+                max_retries=int(os.getenv("LLM_MAX_RETRIES", DEFAULT_MAX_RETRIES))
+            )
+        return _client
+
+def client_stats():
+    """Latency/usage stats of the shared client, or None before the first request."""
+    return _client.stats() if _client is not None else None
+
+def query_ollama(prompt, system_prompt=None, temperature=0.3, max_tokens=500, use_cache=True):
+    """
+    Sends a prompt to Groq API using Llama 3.3.
+    Identical requests are answered from the on-disk response cache.
+    Raises LLMError if the request fails after retries.
+    """
+    cache = get_cache() if use_cache else None
+    if cache is not None:
+        cache_key = cache.make_key(MODEL_NAME, system_prompt, prompt, temperature, max_tokens)
+        cached = cache.get(cache_key)
+        if cached is not None:
+            return cached
+
+    content = get_client().complete(prompt, system_prompt=system_prompt, temperature=temperature, max_tokens=max_tokens)
+    if cache is not None:
+        cache.set(cache_key, content, model=MODEL_NAME)
+    return content
+
+async def query_ollama_async(prompt, system_prompt=None, temperature=0.3, max_tokens=500, use_cache=True):
+    """
+    query_ollama for async callers; requests share the same client, pool and rate limits.
+    The cache is SQLite, so its reads and writes run on a worker thread, off the event loop.
+    """
+    cache = get_cache() if use_cache else None
+    if cache is not None:
+        cache_key = cache.make_key(MODEL_NAME, system_prompt, prompt, temperature, max_tokens)
+        cached = await asyncio.to_thread(cache.get, cache_key)
+        if cached is not None:
+            return cached
+
+    content = await get_client().acomplete(prompt, system_prompt=system_prompt, temperature=temperature, max_tokens=max_tokens)
+    if cache is not None:
+        await asyncio.to_thread(cache.set, cache_key, content, model=MODEL_NAME)
+    return content
+
+def stream_ollama(prompt, system_prompt=None, temperature=0.3, max_tokens=500, use_cache=True):
+    """
+    query_ollama as a generator of reply pieces, for showing the reply as it
+    is written. A cached reply comes back as a single piece; a streamed one
+    is cached once it is complete.
+    """
+    cache = get_cache() if use_cache else None
+    if cache is not None:
+        cache_key = cache.make_key(MODEL_NAME, system_prompt, prompt, temperature, max_tokens)
+        cached = cache.get(cache_key)
+        if cached is not None:
+            yield cached
+            return
+
+    pieces = []
+    for piece in get_client().stream(prompt, system_prompt=system_prompt, temperature=temperature, max_tokens=max_tokens):
+        pieces.append(piece)
+        yield piece
+    if cache is not None:
+        cache.set(cache_key, "".join(pieces).strip(), model=MODEL_NAME)
 
 
 # Test it
 if __name__ == "__main__":
-    result = query_ollama(
-        prompt="What is Python?",
-        system_prompt="You are a helpful programming assistant. Answer concisely."
-    )
-    print(result)
\ No newline at end of file
+    try:
+        result = query_ollama(
+            prompt="What is Python?",
+            system_prompt="You are a helpful programming assistant. Answer concisely."
+        )
+    except LLMError as e:
+        result = f"Error querying Groq: {e}"
+    print(result)
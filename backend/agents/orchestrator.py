@@ -0,0 +1,225 @@
+import hashlib
+import queue
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError, as_completed
+from backend.agents.medical_agents import VitalsAgent, LabAgent, RiskAgent, ScribeAgent
+
+# Seconds each agent may take before its report is replaced with a placeholder
+AGENT_TIMEOUT = 60
+
+# Independent specialists, keyed as they appear in AIAnalysis.agent_details
+SPECIALISTS = (
+    ("vitals", VitalsAgent),
+    ("labs", LabAgent),
+    ("risks", RiskAgent),
+)
+
+class AgentOrchestrator:
+    """
+    Runs the specialist agents concurrently on a thread pool, then feeds
+    their reports to the ScribeAgent.
+
+    `llm` is any callable with query_ollama's signature (defaults to it),
+    so the whole pipeline can run against a fake client in tests.
+    `stream_llm` is the streaming counterpart (stream_ollama) used by stream().
+    """
+    def __init__(self, llm=None, timeout=AGENT_TIMEOUT, stream_llm=None):
+        self.llm = llm
+        self.stream_llm = stream_llm
+        self.timeout = timeout
+
+    def run_specialists(self, inputs):
+        """
+        inputs: {"vitals": ..., "labs": ..., "risks": ...} agent input text.
+        Returns (reports, latency_ms, failed) where failed lists the agents that
+        timed out or errored and got a placeholder report.
+        """
+        reports, latency_ms, failed = {}, {}, set()
+        for key, report, ms, ok in self.iter_specialists(inputs):
+            reports[key], latency_ms[key] = report, ms
+            if not ok:
+                failed.add(key)
+        return reports, latency_ms, [key for key, _ in SPECIALISTS if key in failed]
+
+    def iter_specialists(self, inputs):
+        """
+        Runs the specialists concurrently and yields (key, report, latency_ms, ok)
+        as each one finishes. Agents that error or miss the shared deadline
+        yield a placeholder report with ok=False.
+        """
+        agents = {key: agent_cls(llm=self.llm) for key, agent_cls in SPECIALISTS if key in inputs}
+        executor = ThreadPoolExecutor(max_workers=max(len(agents), 1), thread_name_prefix="agent")
+        try:
+            futures = {executor.submit(_timed, agent.run, inputs[key]): key for key, agent in agents.items()}
+            pending = set(agents)
+            try:
+                # All agents start together, so they share one deadline
+                for future in as_completed(futures, timeout=self.timeout):
+                    key = futures[future]
+                    pending.discard(key)
+                    try:
+                        report, ms = future.result()
+                    except Exception as e:
+                        yield key, f"{agents[key].role} failed: {e}", None, False
+                    else:
+                        yield key, report, ms, True
+            except TimeoutError:
+                for key in agents:
+                    if key in pending:
+                        yield key, f"{agents[key].role} did not respond within {self.timeout}s.", round(self.timeout * 1000), False
+        finally:
+            # Don't block on a hung agent; its thread finishes in the background
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    def run_scribe(self, reports, patient_info):
+        """Returns (summary, latency_ms). Raises TimeoutError if the scribe overruns, LLMError if it fails."""
+        scribe = ScribeAgent(llm=self.llm)
+        executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="agent")
+        try:
+            future = executor.submit(
+                _timed, scribe.run,
+                reports.get("vitals"), reports.get("labs"), reports.get("risks"), patient_info
+            )
+            try:
+                return future.result(timeout=self.timeout)
+            except TimeoutError:
+                raise TimeoutError(f"{scribe.role} did not respond within {self.timeout}s")
+        finally:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    def stream_scribe(self, reports, patient_info):
+        """
+        Yields the scribe's summary in pieces as the model writes it. The
+        timeout covers the whole reply: TimeoutError if it overruns, LLMError if it fails.
+        """
+        scribe = ScribeAgent(llm=self.llm, stream_llm=self.stream_llm)
+        pieces = queue.Queue()
+        stopped = threading.Event()
+
+        def produce():
+            stream = scribe.stream(reports.get("vitals"), reports.get("labs"), reports.get("risks"), patient_info)
+            try:
+                for piece in stream:
+                    if stopped.is_set():
+                        stream.close()
+                        return
+                    pieces.put((piece, None))
+            except Exception as e:
+                pieces.put((None, e))
+            else:
+                pieces.put((None, None))
+
+        executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="agent")
+        try:
+            executor.submit(produce)
+            deadline = time.monotonic() + self.timeout
+            while True:
+                try:
+                    piece, error = pieces.get(timeout=max(deadline - time.monotonic(), 0))
+                except queue.Empty:
+                    raise TimeoutError(f"{scribe.role} did not respond within {self.timeout}s")
+                if error is not None:
+                    raise error
+                if piece is None:
+                    return
+                yield piece
+        finally:
+            # Reader gone or timed out: the producer drops the request at its next piece
+            stopped.set()
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    def run(self, inputs, patient_info, previous_details=None, previous_fingerprint=None):
+        """
+        Full pipeline. Returns (final_summary, agent_details, fingerprint).
+
+        agent_details carries each specialist report plus per-agent latency.
+        When the previous analysis' details and fingerprint are given, only
+        specialists whose input changed are re-run; the rest reuse their
+        earlier report (listed under agent_details["reused"]).
+        """
+        fingerprint = fingerprint_inputs(inputs, patient_info)
+        reused = reusable_reports(fingerprint, previous_details, previous_fingerprint)
+
+        reports, latency_ms, failed = self.run_specialists(
+            {key: data for key, data in inputs.items() if key not in reused}
+        )
+        reports.update(reused)
+        final_summary, latency_ms["scribe"] = self.run_scribe(reports, patient_info)
+        return final_summary, _agent_details(reports, latency_ms, reused, failed, fingerprint), fingerprint
+
+    def stream(self, inputs, patient_info, previous_details=None, previous_fingerprint=None):
+        """
+        run() as a generator of (event, data) pairs, sent as soon as each is known:
+
+          ("agent", {"agent", "role", "report", "latency_ms", "reused"/"failed"})
+              once per specialist: reused reports first, then in finishing order
+          ("token", text)  each piece of the scribe's summary
+          ("done", (final_summary, agent_details, fingerprint))  what run() returns
+        """
+        fingerprint = fingerprint_inputs(inputs, patient_info)
+        reused = reusable_reports(fingerprint, previous_details, previous_fingerprint)
+        roles = {key: agent_cls(llm=self.llm).role for key, agent_cls in SPECIALISTS}
+
+        reports, latency_ms, failed = dict(reused), {}, []
+        for key, report in reused.items():
+            yield "agent", {"agent": key, "role": roles[key], "report": report, "latency_ms": None, "reused": True}
+
+        for key, report, ms, ok in self.iter_specialists({key: data for key, data in inputs.items() if key not in reused}):
+            reports[key], latency_ms[key] = report, ms
+            event = {"agent": key, "role": roles[key], "report": report, "latency_ms": ms}
+            if not ok:
+                failed.append(key)
+                event["failed"] = True
+            yield "agent", event
+
+        pieces = []
+        start = time.perf_counter()
+        for piece in self.stream_scribe(reports, patient_info):
+            pieces.append(piece)
+            yield "token", piece
+        latency_ms["scribe"] = round((time.perf_counter() - start) * 1000)
+
+        failed = [key for key, _ in SPECIALISTS if key in failed]
+        agent_details = _agent_details(reports, latency_ms, reused, failed, fingerprint)
+        yield "done", ("".join(pieces).strip(), agent_details, fingerprint)
+
+def fingerprint_inputs(inputs, patient_info):
+    """Hash of each agent's input text, plus the patient context the scribe sees."""
+    fingerprint = {key: _sha256(data) for key, data in inputs.items()}
+    fingerprint["patient"] = _sha256(patient_info)
+    return fingerprint
+
+def reusable_reports(fingerprint, previous_details, previous_fingerprint):
+    """Reports from the previous analysis whose agent input is unchanged."""
+    if not previous_details or not previous_fingerprint:
+        return {}
+    return {
+        key: previous_details[key]
+        for key, _ in SPECIALISTS
+        if key in fingerprint
+        and previous_fingerprint.get(key) == fingerprint[key]
+        and key in previous_details
+    }
+
+def _agent_details(reports, latency_ms, reused, failed, fingerprint):
+    """AIAnalysis.agent_details for a finished run. Drops failed agents from `fingerprint`."""
+    # Failed agents keep no fingerprint so the next run retries them
+    for key in failed:
+        fingerprint.pop(key, None)
+
+    agent_details = {key: reports[key] for key, _ in SPECIALISTS if key in reports}
+    agent_details["latency_ms"] = latency_ms
+    if reused:
+        agent_details["reused"] = sorted(reused)
+    if failed:
+        agent_details["failed"] = failed
+    return agent_details
+
+def _sha256(text):
+    return hashlib.sha256(str(text).encode('utf-8')).hexdigest()
+
+def _timed(fn, *args):
+    start = time.perf_counter()
+    result = fn(*args)
+    return result, round((time.perf_counter() - start) * 1000)
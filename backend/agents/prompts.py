@@ -0,0 +1,208 @@
+"""
+Compact input for the AI summary agents.
+
+Clinical data is written as small pipe-separated tables: dates as
+YYYY-MM-DD, no ids, no repeated keys. Each agent's input is held to a
+token budget (estimate_tokens, the same local estimate the LLM client
+rate-limits with). When a table doesn't fit, the rows that matter least
+are dropped first:
+
+  - vitals: the latest readings, then abnormal ones, then the newest of the rest
+  - labs: each test's latest result, then abnormal results, then the newest
+  - genomics: pathogenic variants, then uncertain ones, then benign
+
+Dropped rows are counted in one line per table ("(+120 more omitted)"), so
+the model still knows the history is longer than what it sees.
+"""
+from backend.agents.llm_client import estimate_tokens
+
+# Tokens per agent input
+DEFAULT_BUDGETS = {"vitals": 400, "labs": 700, "risks": 600}
+# Readings always kept ahead of older abnormal ones
+RECENT_VITALS = 3
+
+# Vitals outside these ranges count as abnormal
+SYSTOLIC_RANGE = (90, 139)
+DIASTOLIC_RANGE = (60, 89)
+HEART_RATE_RANGE = (50, 100)
+
+# Variant significance, most important first; anything else ranks last
+SIGNIFICANCE_RANK = {"pathogenic": 3, "likely pathogenic": 2, "uncertain significance": 1, "vus": 1}
+
+class Table:
+    """
+    Rows of one table with a priority each. render() keeps the
+    highest-priority rows that fit and prints them in the order they were added.
+    """
+    def __init__(self, title, columns):
+        self.title = title
+        self.columns = columns
+        self.rows = [] # (priority, position, text, kind)
+
+    def add(self, values, priority=(), kind=None):
+        # Later rows win ties, so rows are added oldest first
+        self.rows.append((priority, len(self.rows), "|".join(_cell(v) for v in values), kind))
+
+    def lines(self, kept):
+        """Header, the kept rows, and a count of the rest."""
+        lines = [f"{self.title}:", "|".join(self.columns)]
+        lines.extend(row[2] for row in self.rows if row[1] in kept)
+        omitted = _omitted(_count_kinds(row for row in self.rows if row[1] not in kept))
+        if omitted:
+            lines.append(omitted)
+        return lines
+
+def render(parts, budget):
+    """
+    Joins `parts` (lines, always kept, and Tables) into text of at most
+    `budget` tokens by estimate_tokens.
+    """
+    max_chars = 4 * budget - 1 # estimate_tokens(text) <= budget
+    tables = [part for part in parts if isinstance(part, Table) and part.rows]
+    kept = {id(table): set() for table in tables}
+    # Dropped rows per table, counted by kind, for the "(+N more omitted)" line
+    dropped = {id(table): _count_kinds(table.rows) for table in tables}
+
+    def omitted_size(table):
+        omitted = _omitted(dropped[id(table)])
+        return len(omitted) + 1 if omitted else 0
+
+    # Every line counts its newline; the last one has none, hence size - 1
+    size = sum(len(part) + 1 for part in parts if not isinstance(part, Table))
+    size += sum(len(line) + 1 for table in tables for line in table.lines(set()))
+
+    ranked = sorted(((row, table) for table in tables for row in table.rows),
+                    key=lambda item: item[0][:2], reverse=True)
+    for row, table in ranked:
+        counts = dropped[id(table)]
+        before = omitted_size(table)
+        counts[row[3]] -= 1
+        grown = size + len(row[2]) + 1 - before + omitted_size(table)
+        if grown - 1 > max_chars:
+            counts[row[3]] += 1
+            continue
+        kept[id(table)].add(row[1])
+        size = grown
+
+    lines = []
+    for part in parts:
+        if not isinstance(part, Table):
+            lines.append(part)
+        elif part.rows:
+            lines.extend(part.lines(kept[id(part)]))
+    text = "\n".join(lines)
+    if estimate_tokens(text) > budget:
+        # Only when the lines that are always kept don't fit on their own
+        text = text[:max_chars]
+    return text
+
+def vitals_input(data, trends, budget=DEFAULT_BUDGETS["vitals"]):
+    parts = []
+    bp = trends.get('blood_pressure')
+    if bp:
+        previous = f", previous {bp['previous']}" if bp.get('previous') else ""
+        parts.append(f"Blood pressure trend: {bp['status']} (latest {bp['current']}{previous})")
+
+    table = Table("Vitals, oldest first", ["date", "bp", "hr", "temp"])
+    records = data.medical_records
+    recent_from = len(records) - RECENT_VITALS
+    for i, r in enumerate(records):
+        bp_text = f"{_cell(r.systolic_bp)}/{_cell(r.diastolic_bp)}" if r.diastolic_bp is not None else _cell(r.systolic_bp)
+        table.add([_date(r.date), bp_text, r.heart_rate, r.temperature],
+                  priority=(i >= recent_from, _abnormal_vitals(r)))
+    parts.append(table)
+    if not records:
+        parts.append("No vitals recorded.")
+    return render(parts, budget)
+
+def labs_input(data, trends, budget=DEFAULT_BUDGETS["labs"]):
+    labs = data.lab_results
+    latest = {}
+    for i, lab in enumerate(labs):
+        latest[lab.test_type] = i
+
+    current = Table("Latest result per test", ["test", "value", "unit", "flag", "ref", "trend", "date"])
+    lab_trends = trends.get('labs') or {}
+    for test_type, i in sorted(latest.items(), key=lambda item: item[1]):
+        lab = labs[i]
+        trend = lab_trends.get(test_type, {}).get('status')
+        current.add([test_type, lab.result_value, lab.unit, lab.flag, lab.reference_range, trend, _date(lab.date)],
+                    priority=(True, _abnormal_flag(lab.flag)))
+
+    earlier = Table("Earlier results, oldest first", ["date", "test", "value", "flag"])
+    latest_rows = set(latest.values())
+    for i, lab in enumerate(labs):
+        if i not in latest_rows:
+            earlier.add([_date(lab.date), lab.test_type, lab.result_value, lab.flag],
+                        priority=(False, _abnormal_flag(lab.flag)))
+
+    parts = [current, earlier]
+    if not labs:
+        parts.append("No lab results recorded.")
+    return render(parts, budget)
+
+def risks_input(data, predictions, budget=DEFAULT_BUDGETS["risks"]):
+    flags = Table("Rule-based risk flags", ["condition", "probability", "severity", "reason"])
+    for prediction in predictions:
+        flags.add([prediction['condition'], prediction['probability'], prediction['severity'], prediction['reason']],
+                  priority=(4,))
+
+    variants = Table("Genomic variants", ["gene", "variant", "significance", "risk"])
+    for g in data.genomic_data:
+        rank = SIGNIFICANCE_RANK.get((g.significance or "").strip().lower(), 0)
+        variants.add([g.gene_marker, g.variant, g.significance, g.risk_association], priority=(rank,),
+                     kind=g.significance or "unknown")
+
+    parts = [flags, variants]
+    if not predictions:
+        parts.insert(0, "No rule-based risk flags.")
+    if not data.genomic_data:
+        parts.append("No genomic variants recorded.")
+    return render(parts, budget)
+
+def build_agent_inputs(analyzer, budgets=None):
+    """{"vitals", "labs", "risks"} input text for the specialist agents of a HealthAnalyzer's patient."""
+    budgets = {**DEFAULT_BUDGETS, **(budgets or {})}
+    trends = analyzer.analyze_trends()
+    return {
+        "vitals": vitals_input(analyzer.data, trends, budgets["vitals"]),
+        "labs": labs_input(analyzer.data, trends, budgets["labs"]),
+        "risks": risks_input(analyzer.data, analyzer.predict_risks(), budgets["risks"])
+    }
+
+def _count_kinds(rows):
+    counts = {}
+    for row in rows:
+        counts[row[3]] = counts.get(row[3], 0) + 1
+    return counts
+
+def _omitted(counts):
+    """'(+N more omitted)' for dropped rows counted by kind, broken down when they have one."""
+    total = sum(counts.values())
+    if not total:
+        return None
+    kinds = sorted(((count, kind) for kind, count in counts.items() if kind is not None and count),
+                   key=lambda item: -item[0])
+    if kinds:
+        return f"(+{total} more omitted: {', '.join(f'{count} {kind}' for count, kind in kinds)})"
+    return f"(+{total} more omitted)"
+
+def _abnormal_vitals(r):
+    return any(
+        value is not None and not low <= value <= high
+        for value, (low, high) in ((r.systolic_bp, SYSTOLIC_RANGE), (r.diastolic_bp, DIASTOLIC_RANGE),
+                                   (r.heart_rate, HEART_RATE_RANGE))
+    )
+
+def _abnormal_flag(flag):
+    return bool(flag) and flag.strip().lower() not in ("normal", "n")
+
+def _date(value):
+    return value.strftime("%Y-%m-%d") if value is not None else ""
+
+def _cell(value):
+    if value is None:
+        return ""
+    if isinstance(value, float):
+        return f"{value:g}"
+    return str(value).replace("|", "/").replace("\n", " ")
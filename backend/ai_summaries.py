@@ -0,0 +1,315 @@
+"""
+AI summaries outside a single request: the agents' input for a patient
+(shared with the /ai_summary endpoints) and cohort batch runs.
+
+A batch regenerates summaries for a cohort with the same agents and
+orchestrator as POST /api/patient/<id>/ai_summary, but schedules the agent
+calls of many patients at once:
+
+  - at most `max_concurrency` agent calls in flight across all patients
+  - an optional per-run token budget: a patient is only started while its
+    estimated cost still fits, the rest wait for the next run
+  - patients whose inputs are unchanged since their last analysis are
+    skipped without calling the model
+  - every finished patient is checkpointed (its AIAnalysis plus its
+    SummaryBatchItem) in one commit, so an interrupted or paused run is
+    resumed where it stopped
+
+Database work stays on the calling thread; the pool threads only run the
+agent pipelines.
+
+Usage (from the repo root):
+    python -m backend.ai_summaries --all --concurrency 8 --token-budget 2000000
+    python -m backend.ai_summaries --patients 3 7 12
+    python -m backend.ai_summaries --resume 5
+"""
+import argparse
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from datetime import datetime
+
+from backend.db import db, Patient, AIAnalysis, SummaryBatch, SummaryBatchItem
+from backend.agents.llm_client import estimate_tokens
+
+DEFAULT_CONCURRENCY = 8
+# query_ollama's max_tokens, what every agent reply is budgeted at until it is known
+REPLY_TOKENS = 500
+# ScribeAgent's prompt template around the three reports
+SCRIBE_TEMPLATE_TOKENS = 60
+
+def summary_inputs(patient):
+    """(agent_inputs, patient_info) for the AI summary agents."""
+    from backend.analysis import HealthAnalyzer
+    from backend.agents.prompts import build_agent_inputs
+    # Compact tables held to a token budget per agent, see backend/agents/prompts.py
+    agent_inputs = build_agent_inputs(HealthAnalyzer(patient.id))
+    patient_info = f"{patient.name}, {patient.age}y, {patient.gender}"
+    return agent_inputs, patient_info
+
+def latest_analysis(patient_id):
+    return AIAnalysis.query.filter_by(patient_id=patient_id).order_by(AIAnalysis.date.desc()).first()
+
+class CallLimiter:
+    """
+    Wraps the agents' llm callable for a batch: at most `max_concurrency`
+    calls in flight across every patient, and a running (estimated) count
+    of the tokens they used.
+    """
+    def __init__(self, llm, max_concurrency):
+        self.llm = llm
+        self.tokens = 0
+        self.calls = 0
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self._slots = threading.BoundedSemaphore(max_concurrency)
+        self._lock = threading.Lock()
+
+    def __call__(self, prompt, system_prompt=None):
+        with self._slots:
+            with self._lock:
+                self.in_flight += 1
+                self.max_in_flight = max(self.max_in_flight, self.in_flight)
+            try:
+                reply = self.llm(prompt, system_prompt=system_prompt)
+            finally:
+                with self._lock:
+                    self.in_flight -= 1
+        with self._lock:
+            self.calls += 1
+            self.tokens += estimate_tokens(system_prompt) + estimate_tokens(prompt) + estimate_tokens(reply)
+        return reply
+
+def estimate_cost(agent_inputs, patient_info, rerun):
+    """Tokens a patient's pipeline may use: the specialists in `rerun` plus the scribe, at full-length replies."""
+    from backend.agents.orchestrator import SPECIALISTS
+    from backend.agents.medical_agents import ScribeAgent
+    tokens = 0
+    for key, agent_cls in SPECIALISTS:
+        if key in rerun:
+            tokens += _system_tokens(agent_cls) + estimate_tokens(agent_inputs[key]) + REPLY_TOKENS
+    # The scribe reads three reports and writes one
+    tokens += _system_tokens(ScribeAgent) + estimate_tokens(patient_info) + SCRIBE_TEMPLATE_TOKENS + 4 * REPLY_TOKENS
+    return tokens
+
+def create_batch(patient_ids=None, max_concurrency=DEFAULT_CONCURRENCY, token_budget=None):
+    """A queued batch over `patient_ids` (every patient when None)."""
+    if patient_ids is None:
+        patient_ids = [patient_id for (patient_id,) in db.session.query(Patient.id).order_by(Patient.id)]
+    else:
+        # Unknown ids are dropped, duplicates collapse
+        known = {patient_id for (patient_id,) in db.session.query(Patient.id).filter(Patient.id.in_(patient_ids))}
+        patient_ids = [patient_id for patient_id in dict.fromkeys(patient_ids) if patient_id in known]
+
+    batch = SummaryBatch(status="queued", max_concurrency=max_concurrency, token_budget=token_budget)
+    db.session.add(batch)
+    db.session.flush()
+    if patient_ids:
+        db.session.execute(db.insert(SummaryBatchItem), [
+            {"batch_id": batch.id, "patient_id": patient_id, "status": "pending"} for patient_id in patient_ids
+        ])
+    db.session.commit()
+    return batch
+
+def run_batch(batch_id, llm=None, agent_timeout=None, token_budget=None, retry_failed=True, log=print):
+    """
+    Works through the batch's pending (and, with retry_failed, failed) patients:
+    a first run, or a resumed one after an interruption or a full token budget.
+    `llm` is a query_ollama-compatible callable (the default), so a stub
+    can stand in for the model. `token_budget` overrides the batch's own for
+    this run. Returns this run's report: counts, tokens, patients_per_minute.
+    """
+    from backend.agents.ollama_client import query_ollama
+    from backend.agents.orchestrator import AgentOrchestrator, fingerprint_inputs, reusable_reports
+
+    batch = db.session.get(SummaryBatch, batch_id)
+    if batch is None:
+        raise ValueError(f"Summary batch {batch_id} not found")
+    budget = token_budget if token_budget is not None else batch.token_budget
+    max_concurrency = batch.max_concurrency or DEFAULT_CONCURRENCY
+
+    statuses = ("pending", "failed") if retry_failed else ("pending",)
+    item_ids = [item_id for (item_id,) in db.session.query(SummaryBatchItem.id)
+                .filter(SummaryBatchItem.batch_id == batch_id, SummaryBatchItem.status.in_(statuses))
+                .order_by(SummaryBatchItem.id)]
+
+    batch.status = "running"
+    batch.started_at = datetime.utcnow()
+    batch.finished_at = None
+    batch.error = None
+    db.session.commit()
+
+    limiter = CallLimiter(llm or query_ollama, max_concurrency)
+    # No per-agent deadline: waiting for a slot is expected here, and the
+    # LLM client's own timeout and retries bound every call
+    orchestrator = AgentOrchestrator(llm=limiter, timeout=agent_timeout)
+    counts = dict.fromkeys(("done", "unchanged", "failed"), 0)
+    tokens_before = batch.tokens_used or 0
+    start = time.perf_counter()
+    out_of_budget = False
+
+    def checkpoint(item, status, analysis=None, error=None):
+        item.status = status
+        item.analysis_id = analysis.id if analysis is not None else None
+        item.error = error
+        item.finished_at = datetime.utcnow()
+        counts[status] += 1
+        batch.tokens_used = tokens_before + limiter.tokens
+        batch.patients_per_minute = _per_minute(sum(counts.values()), time.perf_counter() - start)
+        db.session.commit()
+
+    # Every patient's pipeline starts at most 3 calls at once, and the
+    # limiter holds them to max_concurrency overall; this many patients in
+    # flight keeps it busy while some are waiting on their scribe
+    pool = ThreadPoolExecutor(max_workers=max_concurrency, thread_name_prefix="summary-batch")
+    in_flight = {} # future -> (item, reserved tokens)
+    queue = iter(item_ids)
+    next_id = next(queue, None)
+    try:
+        while next_id is not None or in_flight:
+            while next_id is not None and len(in_flight) < max_concurrency and not out_of_budget:
+                item = db.session.get(SummaryBatchItem, next_id)
+                patient = db.session.get(Patient, item.patient_id)
+                try:
+                    agent_inputs, patient_info = summary_inputs(patient)
+                except Exception as e:
+                    db.session.rollback()
+                    checkpoint(item, "failed", error=f"Could not build agent input: {e}")
+                    next_id = next(queue, None)
+                    continue
+
+                latest = latest_analysis(patient.id)
+                fingerprint = fingerprint_inputs(agent_inputs, patient_info)
+                if latest and latest.input_fingerprint == fingerprint:
+                    checkpoint(item, "unchanged", analysis=latest)
+                    next_id = next(queue, None)
+                    continue
+
+                previous_details = latest.agent_details if latest else None
+                previous_fingerprint = latest.input_fingerprint if latest else None
+                reused = reusable_reports(fingerprint, previous_details, previous_fingerprint)
+                cost = estimate_cost(agent_inputs, patient_info, set(agent_inputs) - set(reused))
+                if budget is not None and cost > budget:
+                    # Would never fit, not even in a fresh run; waiting for it would stall the batch
+                    checkpoint(item, "failed", error=f"Estimated {cost} tokens exceeds token budget of {budget}")
+                    log(f"Patient {item.patient_id}: estimated {cost} tokens exceeds token budget of {budget}")
+                    next_id = next(queue, None)
+                    continue
+                # Tokens already used plus the worst case of everything still running
+                if budget is not None and limiter.tokens + sum(c for _, c in in_flight.values()) + cost > budget:
+                    out_of_budget = True
+                    break
+
+                future = pool.submit(orchestrator.run, agent_inputs, patient_info,
+                                     previous_details=previous_details, previous_fingerprint=previous_fingerprint)
+                in_flight[future] = (item, cost)
+                next_id = next(queue, None)
+
+            if not in_flight:
+                break
+            finished, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+            for future in finished:
+                item, _ = in_flight.pop(future)
+                try:
+                    final_summary, agent_details, fingerprint = future.result()
+                except Exception as e:
+                    checkpoint(item, "failed", error=str(e))
+                    log(f"Patient {item.patient_id}: summary failed: {e}")
+                    continue
+                analysis = AIAnalysis(patient_id=item.patient_id, summary=final_summary,
+                                      agent_details=agent_details, input_fingerprint=fingerprint)
+                db.session.add(analysis)
+                db.session.flush()
+                checkpoint(item, "done", analysis=analysis)
+    finally:
+        # On an interrupt the patients in flight stay pending and are redone on resume
+        pool.shutdown(wait=False, cancel_futures=True)
+
+    seconds = time.perf_counter() - start
+    batch.status = "paused" if out_of_budget else "finished"
+    if out_of_budget:
+        batch.error = f"Token budget of {budget} reached; resume to continue"
+    batch.finished_at = datetime.utcnow()
+    db.session.commit()
+
+    processed = sum(counts.values())
+    report = {
+        "batch_id": batch_id,
+        "status": batch.status,
+        **counts,
+        "remaining": len(item_ids) - processed,
+        "llm_calls": limiter.calls,
+        "max_calls_in_flight": limiter.max_in_flight,
+        "tokens": limiter.tokens,
+        "seconds": round(seconds, 2),
+        "patients_per_minute": _per_minute(processed, seconds)
+    }
+    log(f"Summary batch {batch_id}: {processed} patient(s) in {report['seconds']}s "
+        f"({report['patients_per_minute']} patients/min), {counts['done']} summarized, "
+        f"{counts['unchanged']} unchanged, {counts['failed']} failed, {report['remaining']} remaining")
+    return report
+
+class SummaryBatchRunner:
+    """Runs batches started from the API one at a time on a background thread."""
+    def __init__(self):
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="summary-batch-runner")
+        self._active = set()
+        self._lock = threading.Lock()
+
+    def start(self, app, batch_id, **options):
+        """Queues the batch; False if it is already queued or running in this process."""
+        with self._lock:
+            if batch_id in self._active:
+                return False
+            self._active.add(batch_id)
+        self._executor.submit(self._run, app, batch_id, options)
+        return True
+
+    def _run(self, app, batch_id, options):
+        with app.app_context():
+            try:
+                run_batch(batch_id, **options)
+            except Exception as e:
+                db.session.rollback()
+                batch = db.session.get(SummaryBatch, batch_id)
+                if batch is not None:
+                    batch.error = str(e)
+                    db.session.commit()
+                print(f"Summary batch {batch_id} failed: {e}")
+            finally:
+                with self._lock:
+                    self._active.discard(batch_id)
+
+batch_runner = SummaryBatchRunner()
+
+def _system_tokens(agent_cls):
+    return estimate_tokens(agent_cls().system_instruction)
+
+def _per_minute(patients, seconds):
+    return round(patients * 60 / seconds, 1) if seconds > 0 else None
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Regenerate AI summaries for a cohort of patients.")
+    cohort = parser.add_mutually_exclusive_group(required=True)
+    cohort.add_argument("--all", action="store_true", help="every patient")
+    cohort.add_argument("--patients", type=int, nargs="+", metavar="ID")
+    cohort.add_argument("--resume", type=int, metavar="BATCH_ID",
+                        help="continue an interrupted or paused batch, retrying failed patients")
+    parser.add_argument("--concurrency", type=int, default=DEFAULT_CONCURRENCY, help="agent calls in flight")
+    parser.add_argument("--token-budget", type=int, help="stop starting patients once this run's tokens would exceed it")
+    args = parser.parse_args()
+
+    from backend.app import app
+
+    with app.app_context():
+        if args.resume is not None:
+            batch_id = args.resume
+        else:
+            batch = create_batch(None if args.all else args.patients, max_concurrency=args.concurrency,
+                                 token_budget=args.token_budget)
+            batch_id = batch.id
+            print(f"Summary batch {batch_id}: {len(batch.items)} patient(s)")
+        try:
+            run_batch(batch_id, token_budget=args.token_budget if args.resume is not None else None)
+        except KeyboardInterrupt:
+            print(f"Interrupted; continue with: python -m backend.ai_summaries --resume {batch_id}")
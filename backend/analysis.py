@@ -1,19 +1,25 @@
 from datetime import datetime
-from backend.db import Patient, MedicalRecord, LabResult, ImagingRecord, GenomicData, DoctorNote
+from backend.patient_data import load_patient_data, last_matching
+from backend.trends import compute_lab_trends, DEFAULT_LAB_RULES
 
 class HealthAnalyzer:
-    def __init__(self, patient_id):
-        self.patient = Patient.query.get(patient_id)
-        if not self.patient:
+    def __init__(self, patient_id, lab_rules=DEFAULT_LAB_RULES):
+        # All clinical rows are loaded up front, already sorted by date, and
+        # shared by every analysis method below.
+        self.data = load_patient_data(patient_id)
+        if not self.data:
             raise ValueError("Patient not found")
+        self.patient = self.data.patient
+        # Trend rules for labs; the first one decides each test's 'status'
+        self.lab_rules = lab_rules
 
     def analyze_trends(self):
         """Analyze trends for Vitals and Lab Results."""
         trends = {}
         
         # Blood Pressure Trend
-        # Filter where at least systolic is present to show partial data
-        records = sorted([r for r in self.patient.medical_records if r.systolic_bp], key=lambda x: x.date)
+        # Last two readings where at least systolic is present, to show partial data
+        records = last_matching(self.data.medical_records, 2, lambda r: r.systolic_bp)
         if len(records) >= 2:
             last = records[-1]
             prev = records[-2]
@@ -39,37 +45,8 @@ class HealthAnalyzer:
                 'previous': None
             }
         
-        # Lab Trends (A1C, Cholesterol)
-        labs = sorted(self.patient.lab_results, key=lambda x: x.date)
-        lab_types = set(l.test_type for l in labs)
-        trends['labs'] = {}
-        
-        for l_type in lab_types:
-            type_labs = [l for l in labs if l.test_type == l_type]
-            if not type_labs:
-                continue
-                
-            if len(type_labs) >= 2:
-                last = type_labs[-1]
-                prev = type_labs[-2]
-                trend = "Stable"
-                if last.result_value > prev.result_value * 1.05:
-                    trend = "Rising"
-                elif last.result_value < prev.result_value * 0.95:
-                    trend = "Falling"
-                
-                trends['labs'][l_type] = {
-                    'status': trend,
-                    'current': f"{last.result_value} {last.unit}",
-                    'flag': last.flag
-                }
-            else:
-                last = type_labs[0]
-                trends['labs'][l_type] = {
-                    'status': "Stable",
-                    'current': f"{last.result_value} {last.unit}",
-                    'flag': last.flag
-                }
+        # Lab Trends (A1C, Cholesterol), grouped per test type in one pass
+        trends['labs'] = compute_lab_trends(self.data.lab_results, self.lab_rules)
                 
         return trends
 
@@ -78,10 +55,10 @@ class HealthAnalyzer:
         predictions = []
         
         # 1. Diabetes Risk
-        labs = self.patient.lab_results
-        a1c_levels = [l for l in labs if "A1C" in l.test_type]
+        labs = self.data.lab_results
+        a1c_levels = last_matching(labs, 1, lambda l: "A1C" in l.test_type)
         if a1c_levels:
-            latest_a1c = sorted(a1c_levels, key=lambda x: x.date)[-1]
+            latest_a1c = a1c_levels[-1]
             if latest_a1c.result_value > 6.4:
                 predictions.append({
                     "condition": "Diabetes",
@@ -98,12 +75,12 @@ class HealthAnalyzer:
                 })
 
         # 2. Cardiovascular Risk
-        records = self.patient.medical_records
+        records = self.data.medical_records
         if records:
-            # Filter for records with actual BP data
-            bp_records = [r for r in records if r.systolic_bp is not None]
+            # Latest record with actual BP data
+            bp_records = last_matching(records, 1, lambda r: r.systolic_bp is not None)
             if bp_records:
-                latest_bp = sorted(bp_records, key=lambda x: x.date)[-1]
+                latest_bp = bp_records[-1]
                 if latest_bp.systolic_bp > 140:
                     predictions.append({
                         "condition": "Hypertension",
@@ -113,7 +90,7 @@ class HealthAnalyzer:
                     })
 
         # 3. Cancer Risk (Genomics + Imaging)
-        genomics = self.patient.genomic_data
+        genomics = self.data.genomic_data
         cancer_risk_genes = [g for g in genomics if g.significance == "Pathogenic"]
         
         if cancer_risk_genes:
@@ -129,11 +106,11 @@ class HealthAnalyzer:
 
     def analyze_notes(self):
         """Extract insights from doctor notes."""
-        notes = self.patient.doctor_notes
+        notes = self.data.doctor_notes
         if not notes:
             return []
             
-        recent_notes = sorted(notes, key=lambda x: x.date, reverse=True)[:3]
+        recent_notes = notes[::-1][:3]
         insights = []
         for note in recent_notes:
             insights.append({
@@ -144,31 +121,21 @@ class HealthAnalyzer:
             })
         return insights
 
-    def get_history(self):
-        """Get historical data for charts."""
-        # Vitals History
-        records = sorted(self.patient.medical_records, key=lambda x: x.date)
-        vitals_history = [{
-            'date': r.date.isoformat(),
-            'systolic_bp': r.systolic_bp,
-            'diastolic_bp': r.diastolic_bp,
-            'heart_rate': r.heart_rate
-        } for r in records]
-        
-        # LAB History (grouped by type)
-        labs = sorted(self.patient.lab_results, key=lambda x: x.date)
-        # We need to pivot this for the chart if we want multiple lines, or just return list of objects
-        # For simplicity, let's return a flat list and let frontend filter
-        labs_history = [{
-            'date': l.date.isoformat(),
-            'test_type': l.test_type,
-            'value': l.result_value,
-            'unit': l.unit
-        } for l in labs]
-        
+    def summarize_history(self):
+        """Size and date span of the history; the rows themselves come from /history (backend/history.py)."""
+        records, labs = self.data.medical_records, self.data.lab_results
         return {
-            'vitals': vitals_history,
-            'labs': labs_history
+            'vitals': {
+                'count': len(records),
+                'first': records[0].date.isoformat() if records else None,
+                'last': records[-1].date.isoformat() if records else None
+            },
+            'labs': {
+                'count': len(labs),
+                'first': labs[0].date.isoformat() if labs else None,
+                'last': labs[-1].date.isoformat() if labs else None,
+                'test_types': labs.distinct('test_type') if hasattr(labs, 'distinct') else sorted({l.test_type for l in labs if l.test_type})
+            }
         }
 
     def generate_comprehensive_summary(self):
@@ -177,5 +144,5 @@ class HealthAnalyzer:
             "trends": self.analyze_trends(),
             "predictions": self.predict_risks(),
             "recent_clinical_notes": self.analyze_notes(),
-            "history": self.get_history()
+            "history_summary": self.summarize_history()
         }
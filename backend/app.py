@@ -1,38 +1,90 @@
-from flask import Flask, jsonify, request
+import json
+import os
+import uuid
+from flask import Flask, Response, jsonify, request, stream_with_context
 from flask_cors import CORS
-from backend.db import db, Patient
+from backend.db import db, Patient, upgrade_schema
+from backend import search
+from backend.config import init_db
+from backend.ingestion import already_ingested, file_fingerprint, is_dicom_file
 
 def create_app():
     app = Flask(__name__)
     CORS(app, resources={r"/*": {"origins": "*"}})
     
-    # Configure SQLite database
-    app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///health.db'
     app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    # Max concurrent background ingestion jobs
+    app.config['INGEST_WORKERS'] = int(os.getenv('INGEST_WORKERS', 2))
+    # Parser processes per batch (multi-file) ingestion job
+    app.config['INGEST_PROCESSES'] = int(os.getenv('INGEST_PROCESSES', os.cpu_count() or 1))
+    # When set, each ingestion job's stage timings and counters are dumped here as job-<id>.json
+    app.config['INGEST_PROFILE_DIR'] = os.getenv('INGEST_PROFILE_DIR')
+    # Pages read per ingested PDF (unset: all of them); caps the cost of very long scans
+    pdf_max_pages = os.getenv('PDF_MAX_PAGES')
+    app.config['PDF_MAX_PAGES'] = int(pdf_max_pages) if pdf_max_pages else None
+    # Per-agent timeout (seconds) for the AI summary pipeline
+    app.config['AGENT_TIMEOUT'] = float(os.getenv('AGENT_TIMEOUT', 60))
+    # Cohort AI summary batches: agent calls in flight, and tokens per run (unset: no limit)
+    app.config['SUMMARY_BATCH_CONCURRENCY'] = int(os.getenv('SUMMARY_BATCH_CONCURRENCY', 8))
+    token_budget = os.getenv('SUMMARY_BATCH_TOKEN_BUDGET')
+    app.config['SUMMARY_BATCH_TOKEN_BUDGET'] = int(token_budget) if token_budget else None
     
-    db.init_app(app)
+    # Database URL, pool size and SQLite pragmas (WAL etc.), see backend/config.py
+    init_db(app)
     
-    from backend.analysis import HealthAnalyzer
+    from backend.snapshots import get_analysis
 
     @app.route('/api/health', methods=['GET'])
     def health_check():
         return jsonify({"status": "ok", "message": "Backend is connected!"})
 
+    @app.route('/metrics', methods=['GET'])
+    def metrics_endpoint():
+        # Ingestion counters and stage timings for Prometheus, see backend/metrics.py
+        from backend.metrics import registry
+        return registry.render(), 200, {'Content-Type': 'text/plain; version=0.0.4; charset=utf-8'}
+
     @app.route('/api/patient/<int:patient_id>/analysis', methods=['GET'])
     def get_patient_analysis(patient_id):
         try:
-            analyzer = HealthAnalyzer(patient_id)
-            analysis = analyzer.generate_comprehensive_summary()
-            return jsonify(analysis)
+            from backend.risk_batch import patient_risks
+
+            # Materialized per patient; rebuilt only after ingestion touched it.
+            # The batch risk scores change on their own schedule, so they're read fresh
+            return jsonify({**get_analysis(patient_id), "population_risks": patient_risks(patient_id)})
         except ValueError as e:
             return jsonify({"error": str(e)}), 404
         except Exception as e:
             return jsonify({"error": str(e)}), 500
 
+    @app.route('/api/patient/<int:patient_id>/history/<kind>', methods=['GET'])
+    def get_patient_history(patient_id, kind):
+        """
+        kind: vitals | labs. Query args: start, end (YYYY-MM-DD), test_type,
+        cursor + limit for pages, or points (+ method=lttb|bucket) for charts.
+        """
+        from backend.history import get_history, parse_date_range
+
+        if not db.session.get(Patient, patient_id):
+            return jsonify({"error": "Patient not found"}), 404
+        try:
+            start, end = parse_date_range(request.args.get('start'), request.args.get('end'))
+            return jsonify(get_history(
+                patient_id, kind, start=start, end=end,
+                cursor=request.args.get('cursor'),
+                limit=request.args.get('limit', 500, type=int),
+                test_type=request.args.get('test_type'),
+                points=request.args.get('points', type=int),
+                method=request.args.get('method', 'lttb')
+            ))
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+
 
     from werkzeug.utils import secure_filename
     from backend.upload_config import UPLOAD_FOLDER, allowed_file
-    import os
+
+    from backend.jobs import job_queue
 
     app.config['UPLOAD_FOLDER'] = UPLOAD_FOLDER
     os.makedirs(UPLOAD_FOLDER, exist_ok=True)
@@ -49,7 +101,11 @@ def create_app():
             
         if file and allowed_file(file.filename):
             filename = secure_filename(file.filename)
-            filepath = os.path.join(app.config['UPLOAD_FOLDER'], filename)
+            # A folder per upload, so a same-named file can't overwrite one still queued.
+            # The name itself is kept: PDF/image parsers read the patient name from it.
+            upload_dir = os.path.join(app.config['UPLOAD_FOLDER'], f"upload-{uuid.uuid4().hex[:12]}")
+            os.makedirs(upload_dir)
+            filepath = os.path.join(upload_dir, filename)
             file.save(filepath)
             
             # If patient_id is provided, we can link logic here if needed
@@ -61,18 +117,115 @@ def create_app():
                 # This is a placeholder for that logic
                 pass
             
-            # Trigger Ingestion (Mainly for CSVs)
-            from backend.ingestion import process_file
-            success = process_file(filepath)
-            
-            if success:
-                return jsonify({'message': 'File uploaded and processed successfully', 'filename': filename}), 201
-            else:
-                # Even if parsing failed, the file is saved. If we had patient_id, we might consider it "Linked" 
-                return jsonify({'message': 'File uploaded.', 'filename': filename}), 201
+            # Parsing runs on the ingestion worker pool; poll /api/jobs/<id> for status.
+            # A file we already have is hashed there too and ends as a "duplicate" job.
+            job = job_queue.submit(filepath, filename)
+            return jsonify({
+                'message': 'File uploaded. Ingestion queued.',
+                'filename': filename,
+                'job_id': job.id,
+                'status_url': f"/api/jobs/{job.id}"
+            }), 202
         
         return jsonify({'error': 'File type not allowed'}), 400
 
+    @app.route('/api/upload/batch', methods=['POST'])
+    def upload_batch():
+        files = [f for f in request.files.getlist('files') if f.filename]
+        if not files:
+            return jsonify({'error': 'No files'}), 400
+        rejected = [f.filename for f in files if not allowed_file(f.filename)]
+        if rejected:
+            return jsonify({'error': 'File type not allowed', 'files': rejected}), 400
+
+        # One folder per batch; the job parses it on a process pool (backend/batch_ingest.py)
+        batch_dir = os.path.join(app.config['UPLOAD_FOLDER'], f"batch-{uuid.uuid4().hex[:12]}")
+        os.makedirs(batch_dir)
+        for i, file in enumerate(files):
+            # Prefixed so two uploads with the same name don't overwrite each other
+            file.save(os.path.join(batch_dir, f"{i:05d}-{secure_filename(file.filename)}"))
+
+        job = job_queue.submit(batch_dir, f"{len(files)} files")
+        return jsonify({
+            'message': 'Files uploaded. Batch ingestion queued.',
+            'files': len(files),
+            'job_id': job.id,
+            'status_url': f"/api/jobs/{job.id}"
+        }), 202
+
+    from backend import chunked_upload
+    from backend.chunked_upload import UploadError
+
+    # Resumable chunked uploads for very large files, see backend/chunked_upload.py
+    app.config['CHUNKED_UPLOAD_FOLDER'] = os.path.join(UPLOAD_FOLDER, 'chunked')
+    os.makedirs(app.config['CHUNKED_UPLOAD_FOLDER'], exist_ok=True)
+
+    def upload_state(state):
+        return {k: v for k, v in state.items() if k != 'path'}
+
+    @app.errorhandler(UploadError)
+    def upload_error(e):
+        body = {"error": str(e)}
+        if e.state:
+            body["upload"] = upload_state(e.state)
+        return jsonify(body), e.status
+
+    @app.route('/api/uploads', methods=['POST'])
+    def init_upload():
+        data = request.get_json(silent=True) or {}
+        if not allowed_file(data.get('filename') or ''):
+            return jsonify({'error': 'File type not allowed'}), 400
+        root = app.config['CHUNKED_UPLOAD_FOLDER']
+        state = chunked_upload.create_upload(root, data.get('filename'), size=data.get('size'),
+                                             sha256=data.get('sha256'), stream=data.get('stream'))
+        if state['stream']:
+            # CSV/VCF: parsing starts now and follows the chunks as they arrive
+            job = job_queue.submit(state['path'], state['filename'])
+            state = chunked_upload.set_job(root, state['upload_id'], job.id)
+        return jsonify({**upload_state(state), 'chunk_size': chunked_upload.CHUNK_SIZE}), 201
+
+    @app.route('/api/uploads/<upload_id>', methods=['GET'])
+    def get_upload(upload_id):
+        return jsonify(upload_state(chunked_upload.get_upload(app.config['CHUNKED_UPLOAD_FOLDER'], upload_id)))
+
+    @app.route('/api/uploads/<upload_id>', methods=['PUT'])
+    def put_upload_chunk(upload_id):
+        # Raw body (application/octet-stream), read straight from the socket
+        state = chunked_upload.write_chunk(
+            app.config['CHUNKED_UPLOAD_FOLDER'], upload_id,
+            request.args.get('offset', type=int), request.stream,
+            chunk_sha256=request.headers.get('X-Chunk-SHA256')
+        )
+        return jsonify(upload_state(state))
+
+    @app.route('/api/uploads/<upload_id>', methods=['DELETE'])
+    def abort_upload(upload_id):
+        state = chunked_upload.fail_upload(app.config['CHUNKED_UPLOAD_FOLDER'], upload_id, "Aborted by client")
+        return jsonify(upload_state(state))
+
+    @app.route('/api/uploads/<upload_id>/complete', methods=['POST'])
+    def complete_upload(upload_id):
+        data = request.get_json(silent=True) or {}
+        state, sha256 = chunked_upload.complete_upload(app.config['CHUNKED_UPLOAD_FOLDER'], upload_id, data.get('sha256'))
+        # Same fingerprint ingestion uses; for most files that's the sha256 just verified
+        fingerprint = file_fingerprint(state['path']) if is_dicom_file(state['path']) else sha256
+        duplicate = bool(already_ingested([fingerprint]))
+
+        job_id = state['job_id']
+        if job_id is None and not duplicate:
+            job_id = job_queue.submit(state['path'], state['filename']).id
+        body = {**upload_state(state), 'job_id': job_id, 'duplicate': duplicate}
+        if job_id is None:
+            return jsonify({**body, 'message': 'File already ingested.'}), 200
+        return jsonify({**body, 'status_url': f"/api/jobs/{job_id}"}), 202
+
+    @app.route('/api/jobs/<int:job_id>', methods=['GET'])
+    def get_job(job_id):
+        job = job_queue.get(job_id)
+        if job is None:
+            return jsonify({"error": "Job not found"}), 404
+        return jsonify(job)
+
     @app.route('/api/patients/create', methods=['POST'])
     def create_patient():
         data = request.json
@@ -96,11 +249,77 @@ def create_app():
         query = request.args.get('query', '')
         if not query:
             return jsonify([])
+        limit = min(max(request.args.get('limit', 10, type=int), 1), 100)
+        offset = max(request.args.get('offset', 0, type=int), 0)
         
-        # Case insensitive search
-        patients = Patient.query.filter(Patient.name.ilike(f'%{query}%')).limit(10).all()
+        # Ranked prefix + typo-tolerant matches from the FTS5 name index
+        patients = search.search_patients(query, limit=limit, offset=offset)
         return jsonify([p.to_dict() for p in patients])
 
+    @app.route('/api/notes/<int:note_id>/text', methods=['GET'])
+    def get_note_text(note_id):
+        # note_content is a preview for ingested PDFs, the whole document is stored compressed
+        from backend.db import DoctorNote
+        note = db.session.get(DoctorNote, note_id)
+        if note is None:
+            return jsonify({"error": "Note not found"}), 404
+        return jsonify({"id": note.id, "text": note.full_text()})
+
+    @app.route('/api/ai/cache_stats', methods=['GET'])
+    def ai_cache_stats():
+        from backend.agents.ollama_client import get_cache
+        cache = get_cache()
+        if cache is None:
+            return jsonify({"enabled": False})
+        return jsonify({"enabled": True, **cache.stats()})
+
+    @app.route('/api/ai/llm_stats', methods=['GET'])
+    def ai_llm_stats():
+        # Requests, retries, rate limiting, token usage and latency of the shared LLM client
+        from backend.agents.ollama_client import client_stats
+        stats = client_stats()
+        if stats is None:
+            return jsonify({"active": False})
+        return jsonify({"active": True, **stats})
+
+    @app.route('/api/ai/summary_batches', methods=['POST'])
+    def create_summary_batch():
+        # Regenerate AI summaries for a cohort in the background, see backend/ai_summaries.py
+        from backend.ai_summaries import create_batch, batch_runner
+        data = request.get_json(silent=True) or {}
+        patient_ids = data.get('patient_ids')
+        if not data.get('all') and not patient_ids:
+            return jsonify({"error": "Give patient_ids or all: true"}), 400
+        batch = create_batch(
+            None if data.get('all') else patient_ids,
+            max_concurrency=data.get('max_concurrency') or app.config['SUMMARY_BATCH_CONCURRENCY'],
+            token_budget=data.get('token_budget', app.config['SUMMARY_BATCH_TOKEN_BUDGET'])
+        )
+        batch_runner.start(app, batch.id)
+        return jsonify({**batch.to_dict(), 'status_url': f"/api/ai/summary_batches/{batch.id}"}), 202
+
+    @app.route('/api/ai/summary_batches/<int:batch_id>', methods=['GET'])
+    def get_summary_batch(batch_id):
+        from backend.db import SummaryBatch
+        batch = db.session.get(SummaryBatch, batch_id)
+        if batch is None:
+            return jsonify({"error": "Batch not found"}), 404
+        return jsonify(batch.to_dict())
+
+    @app.route('/api/ai/summary_batches/<int:batch_id>/resume', methods=['POST'])
+    def resume_summary_batch(batch_id):
+        # Continues an interrupted or paused (token budget) batch and retries failed
+        # patients; the ones already summarized are skipped
+        from backend.db import SummaryBatch
+        from backend.ai_summaries import batch_runner
+        batch = db.session.get(SummaryBatch, batch_id)
+        if batch is None:
+            return jsonify({"error": "Batch not found"}), 404
+        data = request.get_json(silent=True) or {}
+        if not batch_runner.start(app, batch_id, token_budget=data.get('token_budget')):
+            return jsonify({"error": "Batch is already running", "batch": batch.to_dict()}), 409
+        return jsonify({**batch.to_dict(), 'status_url': f"/api/ai/summary_batches/{batch_id}"}), 202
+
     @app.route('/api/patient/<int:patient_id>/ai_summary', methods=['GET'])
     def get_ai_summary(patient_id):
         from backend.db import AIAnalysis
@@ -116,8 +335,8 @@ def create_app():
     def generate_ai_summary(patient_id):
         # Gather Data
         from backend.db import Patient, AIAnalysis
-        from backend.analysis import HealthAnalyzer
-        from backend.agents.medical_agents import VitalsAgent, LabAgent, RiskAgent, ScribeAgent
+        from backend.agents.orchestrator import AgentOrchestrator, fingerprint_inputs
+        from backend.ai_summaries import summary_inputs
         
         patient = Patient.query.get(patient_id)
         if not patient:
@@ -125,44 +344,31 @@ def create_app():
             
         try:
             print(f"Generating summary for patient {patient_id}...")
-            analyzer = HealthAnalyzer(patient_id)
-            analysis_data = analyzer.generate_comprehensive_summary()
-            
-            # Format data for agents
-            vitals_data = str(analysis_data['trends'].get('blood_pressure')) + "\n" + str(analysis_data['history']['vitals'][-5:])
-            labs_data = str(analysis_data['trends'].get('labs')) + "\n" + str(analysis_data['history']['labs'][-5:])
-            risk_data = str(analysis_data['predictions']) + "\nGenomics: " + str([g.to_dict() for g in patient.genomic_data])
-
-            # Run Agents
-            print("Running Vitals Agent...")
-            vitals_report = VitalsAgent().run(vitals_data)
-            
-            print("Running Lab Agent...")
-            lab_report = LabAgent().run(labs_data)
-            
-            print("Running Risk Agent...")
-            risk_report = RiskAgent().run(risk_data)
-            
-            print("Running Scribe Agent...")
-            final_summary = ScribeAgent().run(
-                vitals_report, 
-                lab_report, 
-                risk_report, 
-                f"{patient.name}, {patient.age}y, {patient.gender}"
-            )
-            print("AI Analysis Complete.")
+            agent_inputs, patient_info = summary_inputs(patient)
+
+            # Nothing changed since the last analysis: skip the LLM entirely
+            latest = AIAnalysis.query.filter_by(patient_id=patient_id).order_by(AIAnalysis.date.desc()).first()
+            if latest and latest.input_fingerprint == fingerprint_inputs(agent_inputs, patient_info):
+                print("Inputs unchanged, returning stored AI Analysis.")
+                return jsonify({**latest.to_dict(), "unchanged": True})
 
-            agent_details = {
-                "vitals": vitals_report,
-                "labs": lab_report,
-                "risks": risk_report
-            }
+            # Run the specialists whose input changed concurrently, then the scribe
+            print("Running Vitals, Lab and Risk Agents...")
+            orchestrator = AgentOrchestrator(timeout=app.config['AGENT_TIMEOUT'])
+            final_summary, agent_details, fingerprint = orchestrator.run(
+                agent_inputs,
+                patient_info,
+                previous_details=latest.agent_details if latest else None,
+                previous_fingerprint=latest.input_fingerprint if latest else None
+            )
+            print(f"AI Analysis Complete. Latency (ms): {agent_details['latency_ms']}")
             
             # Save to DB
             new_analysis = AIAnalysis(
                 patient_id=patient_id,
                 summary=final_summary,
-                agent_details=agent_details
+                agent_details=agent_details,
+                input_fingerprint=fingerprint
             )
             db.session.add(new_analysis)
             db.session.commit()
@@ -172,12 +378,78 @@ def create_app():
         except Exception as e:
             print(f"AI Error: {e}")
             return jsonify({"error": str(e), "summary": "AI Analysis Unavailable"}), 500
-            
+
+    @app.route('/api/patient/<int:patient_id>/ai_summary/stream', methods=['POST'])
+    def stream_ai_summary(patient_id):
+        """
+        The POST above as server-sent events, so the page fills in while the
+        agents work:
+          agent    each specialist report as soon as it is ready
+          token    pieces of the scribe's summary as the model writes them
+          summary  the saved AIAnalysis (with "unchanged": true if nothing was re-run)
+          error    the pipeline failed; nothing is saved
+        """
+        from backend.db import Patient, AIAnalysis
+        from backend.agents.orchestrator import AgentOrchestrator, fingerprint_inputs
+        from backend.ai_summaries import summary_inputs
+
+        patient = Patient.query.get(patient_id)
+        if not patient:
+            return jsonify({"error": "Patient not found"}), 404
+        try:
+            agent_inputs, patient_info = summary_inputs(patient)
         except Exception as e:
+            print(f"AI Error: {e}")
             return jsonify({"error": str(e), "summary": "AI Analysis Unavailable"}), 500
+        latest = AIAnalysis.query.filter_by(patient_id=patient_id).order_by(AIAnalysis.date.desc()).first()
+
+        def sse(event, data):
+            return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+        def events():
+            if latest and latest.input_fingerprint == fingerprint_inputs(agent_inputs, patient_info):
+                yield sse("summary", {**latest.to_dict(), "unchanged": True})
+                return
+            try:
+                orchestrator = AgentOrchestrator(timeout=app.config['AGENT_TIMEOUT'])
+                for event, data in orchestrator.stream(
+                    agent_inputs,
+                    patient_info,
+                    previous_details=latest.agent_details if latest else None,
+                    previous_fingerprint=latest.input_fingerprint if latest else None
+                ):
+                    if event == "token":
+                        yield sse("token", {"text": data})
+                    elif event == "agent":
+                        yield sse("agent", data)
+                    else:
+                        final_summary, agent_details, fingerprint = data
+
+                # Saved once the scribe has finished; a client that disconnects earlier saves nothing
+                new_analysis = AIAnalysis(
+                    patient_id=patient_id,
+                    summary=final_summary,
+                    agent_details=agent_details,
+                    input_fingerprint=fingerprint
+                )
+                db.session.add(new_analysis)
+                db.session.commit()
+                print(f"AI Analysis streamed. Latency (ms): {agent_details['latency_ms']}")
+                yield sse("summary", new_analysis.to_dict())
+            except Exception as e:
+                print(f"AI Error: {e}")
+                db.session.rollback()
+                yield sse("error", {"error": str(e), "summary": "AI Analysis Unavailable"})
+
+        return Response(stream_with_context(events()), mimetype='text/event-stream',
+                        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
 
     with app.app_context():
         db.create_all()
+        upgrade_schema()
+        search.ensure_search_index()
+
+    job_queue.init_app(app)
 
     return app
 
@@ -0,0 +1,172 @@
+"""
+Batch ingestion of many files, e.g. a clinic's folder of PDFs and DICOMs,
+or a whole CT/MRI study folder (DICOM slices are grouped into one
+ImagingRecord per series, extensionless DICOM files included).
+
+PDF text extraction and DICOM header parsing are CPU-bound, so those files
+are parsed in a process pool (ingestion.parse_file, no database access) and
+the parsed records are funnelled back to this process, the single writer,
+which stores them in batches: one patient lookup/insert and one INSERT per
+model for every BATCH_COMMIT_SIZE files, then a commit. CSV and VCF files
+already stream into the database in bulk and are ingested by the writer
+directly.
+
+Usage (from the repo root):
+    python -m backend.batch_ingest path/to/folder [more files or folders] --workers 4
+"""
+import argparse
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from backend import metrics
+from backend.db import db
+from backend.ingestion import (IngestProgress, already_ingested, file_fingerprint, is_dicom_file, parse_file,
+                               process_file, record_ingested, record_parser, store_records_bulk,
+                               _mark_dirty, _report_progress)
+from backend.upload_config import allowed_file
+
+# Parsed files stored per writer transaction
+BATCH_COMMIT_SIZE = 100
+
+def collect_files(paths, recursive=True):
+    """Expands files and directories into a sorted list of ingestible files."""
+    files = []
+    for path in paths:
+        if os.path.isdir(path):
+            for root, dirs, names in os.walk(path):
+                paths_here = [os.path.join(root, name) for name in names]
+                files += [p for p in paths_here if allowed_file(p) or is_dicom_file(p)]
+                if not recursive:
+                    dirs.clear()
+        elif os.path.isfile(path):
+            files.append(path)
+    return sorted(files)
+
+def default_workers():
+    return int(os.getenv('INGEST_PROCESSES', os.cpu_count() or 1))
+
+def ingest_paths(paths, workers=None, batch_size=BATCH_COMMIT_SIZE, progress=None):
+    """
+    Ingests every file under `paths`. Returns a summary dict: files,
+    succeeded, skipped (already ingested), failed (list of {"file",
+    "error"}) and seconds. Must run in an app context. `progress` (an
+    IngestProgress) counts files done and collects the patients touched.
+    """
+    start = time.perf_counter()
+    files = collect_files(paths)
+    parallel = [f for f in files if record_parser(f)]
+    streamed = [f for f in files if not record_parser(f)]
+    summary = {"files": len(files), "succeeded": 0, "skipped": 0, "failed": []}
+
+    def report():
+        _report_progress(progress, summary["succeeded"] + summary["skipped"] + len(summary["failed"]))
+
+    def count(key, n=1):
+        summary[key] += n
+        report()
+
+    def fail(filepath, error):
+        summary["failed"].append({"file": filepath, "error": str(error)})
+        report()
+
+    batch = []
+    # Time spent waiting on the parser processes counts as the parse stage
+    for filepath, fingerprint, record, error in metrics.timed(_parse_all(parallel, workers or default_workers()), "parse"):
+        if error is not None:
+            metrics.count("files", status="failed")
+            fail(filepath, error)
+            continue
+        batch.append((filepath, fingerprint, record))
+        if len(batch) >= batch_size:
+            _flush(batch, count, fail, progress)
+            batch = []
+    if batch:
+        _flush(batch, count, fail, progress)
+
+    for filepath in streamed:
+        file_progress = IngestProgress()
+        if process_file(filepath, progress=file_progress):
+            if progress is not None:
+                progress.patient_ids.update(file_progress.patient_ids)
+            count("succeeded")
+        else:
+            fail(filepath, "Ingestion failed")
+
+    summary["seconds"] = round(time.perf_counter() - start, 3)
+    return summary
+
+def _parse_all(files, workers):
+    """Yields (filepath, fingerprint, record, error) as files finish parsing, in completion order."""
+    if workers <= 1 or len(files) <= 1:
+        for filepath in files:
+            yield _parse_one(filepath)
+        return
+
+    # spawn: the app process has threads (job queue, SQLAlchemy pool) that fork can't copy safely
+    context = multiprocessing.get_context("spawn")
+    # Each worker pays ~1s importing the backend, so never start more than there are files
+    with ProcessPoolExecutor(max_workers=min(workers, len(files)), mp_context=context) as executor:
+        futures = [executor.submit(_parse_one, filepath) for filepath in files]
+        for future in as_completed(futures):
+            yield future.result()
+
+def _parse_one(filepath):
+    try:
+        return filepath, file_fingerprint(filepath), parse_file(filepath), None
+    except Exception as e:
+        return filepath, None, None, f"{e.__class__.__name__}: {e}"
+
+def _flush(batch, count, fail, progress=None):
+    """
+    Stores a batch in one transaction together with its ledger entries; if
+    that fails, retries file by file to isolate the bad one.
+    """
+    seen = already_ingested(fingerprint for _, fingerprint, _ in batch if fingerprint)
+    new = {}
+    for filepath, fingerprint, record in batch:
+        if fingerprint and fingerprint in seen:
+            metrics.count("files", status="duplicate")
+            count("skipped")
+            continue
+        if fingerprint:
+            seen.add(fingerprint) # same file twice in one batch
+        new[fingerprint or filepath] = (filepath, fingerprint, record)
+    if not new:
+        return
+
+    try:
+        with metrics.stage("flush"):
+            _mark_dirty(progress, store_records_bulk([record for _, _, record in new.values()]))
+            record_ingested({fingerprint: filepath for filepath, fingerprint, _ in new.values() if fingerprint})
+        with metrics.stage("commit"):
+            db.session.commit()
+        metrics.count("rows_parsed", len(new))
+        metrics.count("files", len(new), status="succeeded")
+        count("succeeded", len(new))
+        return
+    except Exception as e:
+        db.session.rollback()
+        if len(new) == 1:
+            metrics.count("files", status="failed")
+            fail(next(iter(new.values()))[0], e)
+            return
+    for item in new.values():
+        _flush([item], count, fail, progress)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Ingest files and folders with a process pool of parsers.")
+    parser.add_argument("paths", nargs="+")
+    parser.add_argument("--workers", type=int, default=default_workers())
+    parser.add_argument("--batch-size", type=int, default=BATCH_COMMIT_SIZE)
+    args = parser.parse_args()
+
+    from backend.app import app
+
+    with app.app_context():
+        result = ingest_paths(args.paths, workers=args.workers, batch_size=args.batch_size)
+    print(f"Ingested {result['succeeded']}/{result['files']} files ({result['skipped']} already ingested) "
+          f"in {result['seconds']}s with {args.workers} worker(s)")
+    for failure in result["failed"]:
+        print(f"  failed: {failure['file']}: {failure['error']}")
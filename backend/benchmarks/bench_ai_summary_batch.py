@@ -0,0 +1,91 @@
+"""
+Cohort AI summaries: one patient after another, as looping over
+POST /api/patient/<id>/ai_summary does, against the batch runner in
+backend/ai_summaries.py.
+
+Both go through the shared LLMClient to the fake Groq endpoint, which
+takes `--latency` seconds per reply, so the numbers show scheduling rather
+than model speed.
+
+Usage (from the repo root):
+    python -m backend.benchmarks.bench_ai_summary_batch --patients 40 --concurrency 8
+"""
+import argparse
+import os
+import random
+import tempfile
+from datetime import datetime, timedelta
+
+from sqlalchemy import insert
+from backend.benchmarks.common import make_app, timer
+from backend.db import db, Patient, MedicalRecord, LabResult, AIAnalysis
+from backend.agents.fake_server import FakeLLMServer
+from backend.agents.llm_client import LLMClient
+from backend.agents.orchestrator import AgentOrchestrator
+from backend.ai_summaries import create_batch, run_batch, summary_inputs
+
+def seed_cohort(patients):
+    db.session.execute(insert(Patient), [
+        {"name": f"Patient {i}", "age": random.randint(20, 90), "gender": "Female"} for i in range(patients)
+    ])
+    start = datetime(2023, 1, 1)
+    ids = range(1, patients + 1)
+    db.session.execute(insert(LabResult), [
+        {"patient_id": pid, "date": start + timedelta(days=random.randint(0, 365)),
+         "test_type": random.choice(["Hemoglobin A1C", "Glucose", "LDL Cholesterol"]),
+         "result_value": round(random.uniform(4.5, 9.5), 1), "unit": "%", "flag": "Normal"}
+        for pid in ids for _ in range(4)
+    ])
+    db.session.execute(insert(MedicalRecord), [
+        # Distinct days: one record per (patient, date)
+        {"patient_id": pid, "date": start + timedelta(days=day), "systolic_bp": random.randint(100, 170),
+         "diastolic_bp": random.randint(60, 100), "heart_rate": random.randint(55, 100)}
+        for pid in ids for day in random.sample(range(366), 4)
+    ])
+    db.session.commit()
+
+def sequential(patient_ids, client):
+    # What a loop of POST /ai_summary requests does, minus HTTP
+    orchestrator = AgentOrchestrator(llm=client.complete)
+    for patient_id in patient_ids:
+        agent_inputs, patient_info = summary_inputs(db.session.get(Patient, patient_id))
+        summary, details, fingerprint = orchestrator.run(agent_inputs, patient_info)
+        db.session.add(AIAnalysis(patient_id=patient_id, summary=summary, agent_details=details,
+                                  input_fingerprint=fingerprint))
+        db.session.commit()
+
+def run(patients, concurrency, latency):
+    results = {}
+    with FakeLLMServer(latency=latency) as server, tempfile.TemporaryDirectory() as tmpdir:
+        client = LLMClient(api_key="bench", base_url=server.url, model="fake", rpm=0, tpm=0,
+                           max_concurrency=concurrency)
+        app = make_app(os.path.join(tmpdir, "bench.db"))
+        try:
+            with app.app_context():
+                seed_cohort(patients)
+                patient_ids = [pid for (pid,) in db.session.query(Patient.id)]
+
+                with timer("sequential", results):
+                    sequential(patient_ids, client)
+                db.session.query(AIAnalysis).delete()
+                db.session.commit()
+
+                batch = create_batch(patient_ids, max_concurrency=concurrency)
+                with timer("batch", results):
+                    report = run_batch(batch.id, llm=client.complete, log=lambda *a: None)
+                db.session.remove()
+        finally:
+            client.close()
+
+    print(f"{patients} patients, 4 agent calls each, {latency * 1000:.0f} ms per call")
+    print(f"  one after another: {results['sequential']:.2f}s ({patients * 60 / results['sequential']:.1f} patients/min)")
+    print(f"  batch, {concurrency} calls in flight: {results['batch']:.2f}s ({report['patients_per_minute']} patients/min), "
+          f"{report['done']} summarized, peak {report['max_calls_in_flight']} calls in flight")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--patients", type=int, default=40)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--latency", type=float, default=0.2)
+    args = parser.parse_args()
+    run(args.patients, args.concurrency, args.latency)
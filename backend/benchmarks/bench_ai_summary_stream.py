@@ -0,0 +1,63 @@
+"""
+Time to first useful content of an AI summary: the blocking pipeline
+(AgentOrchestrator.run, what POST /ai_summary waits for) against the
+streaming one (AgentOrchestrator.stream, behind POST /ai_summary/stream).
+
+Both run against the fake Groq endpoint, which takes `--latency` seconds
+to the first token and `--token-latency` seconds per word after that, so
+a reply of `--words` words takes about latency + words * token_latency.
+
+Usage (from the repo root):
+    python -m backend.benchmarks.bench_ai_summary_stream --runs 3
+"""
+import argparse
+import time
+
+from backend.agents.fake_server import FakeLLMServer
+from backend.agents.llm_client import LLMClient
+from backend.agents.orchestrator import AgentOrchestrator
+
+INPUTS = {"vitals": "BP 142/91, 138/88, 145/93", "labs": "A1C 6.4, LDL 162", "risks": "BRCA1 c.68_69del, age 54"}
+
+def run(runs, latency, token_latency, words):
+    reply = lambda messages: " ".join(["finding"] * words)
+    with FakeLLMServer(latency=latency, token_latency=token_latency, reply=reply) as server:
+        client = LLMClient(api_key="bench", base_url=server.url, model="fake", rpm=0, tpm=0)
+        orchestrator = AgentOrchestrator(llm=client.complete, stream_llm=client.stream)
+        print(f"{runs} summaries, {latency * 1000:.0f} ms to first token, {words} words per reply "
+              f"at {token_latency * 1000:.0f} ms each")
+        try:
+            blocking = []
+            for _ in range(runs):
+                start = time.perf_counter()
+                orchestrator.run(INPUTS, "Jane Roe, 54y, Female")
+                blocking.append(time.perf_counter() - start)
+
+            first_report, first_token, total = [], [], []
+            for _ in range(runs):
+                start = time.perf_counter()
+                seen = set()
+                for event, _ in orchestrator.stream(INPUTS, "Jane Roe, 54y, Female"):
+                    if event not in seen:
+                        seen.add(event)
+                        if event == "agent":
+                            first_report.append(time.perf_counter() - start)
+                        elif event == "token":
+                            first_token.append(time.perf_counter() - start)
+                total.append(time.perf_counter() - start)
+        finally:
+            client.close()
+
+    avg = lambda values: sum(values) / len(values)
+    print(f"  blocking:  first content {avg(blocking):.2f}s (the whole pipeline)")
+    print(f"  streaming: first report {avg(first_report):.2f}s, first summary token {avg(first_token):.2f}s, "
+          f"done {avg(total):.2f}s")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--latency", type=float, default=0.5)
+    parser.add_argument("--token-latency", type=float, default=0.02)
+    parser.add_argument("--words", type=int, default=150)
+    args = parser.parse_args()
+    run(args.runs, args.latency, args.token_latency, args.words)
@@ -0,0 +1,91 @@
+"""
+Query-count and wall-time benchmark for HealthAnalyzer on a long-history patient.
+
+Usage (from the repo root):
+    python -m backend.benchmarks.bench_analysis --records 10000 [--columnar]
+
+--columnar also times the memory-mapped read path (backend/columnar.py).
+"""
+import argparse
+import os
+import random
+import tempfile
+from datetime import datetime, timedelta
+
+from sqlalchemy import event, insert
+from backend.benchmarks.common import make_app, timer
+from backend.db import db, Patient, MedicalRecord, LabResult, GenomicData, DoctorNote
+from backend.analysis import HealthAnalyzer
+
+LAB_TYPES = ["Hemoglobin A1C", "Glucose", "LDL Cholesterol", "HDL Cholesterol", "Triglycerides", "Creatinine", "Sodium", "Potassium"]
+
+def seed_patient(records):
+    patient = Patient(name="Benchmark Patient", age=64, gender="Female")
+    db.session.add(patient)
+    db.session.commit()
+
+    start = datetime(2010, 1, 1)
+    dates = [start + timedelta(hours=6 * i) for i in range(records)]
+    random.shuffle(dates) # insertion order != date order
+    db.session.execute(insert(MedicalRecord), [
+        {"patient_id": patient.id, "date": d, "systolic_bp": random.randint(100, 170), "diastolic_bp": random.randint(60, 100), "heart_rate": random.randint(55, 110)}
+        for d in dates
+    ])
+    db.session.execute(insert(LabResult), [
+        {"patient_id": patient.id, "date": d, "test_type": random.choice(LAB_TYPES), "result_value": round(random.uniform(3, 250), 1), "unit": "mg/dL", "flag": "Normal"}
+        for d in dates
+    ])
+    db.session.execute(insert(DoctorNote), [
+        {"patient_id": patient.id, "date": d, "doctor_name": "Dr. Bench", "note_content": "Routine follow-up. " * 10, "sentiment": "Stable"}
+        for d in dates[: records // 10]
+    ])
+    db.session.execute(insert(GenomicData), [
+        {"patient_id": patient.id, "gene_marker": f"chr1:{1000 + i}", "variant": "A>G", "risk_association": "Unknown", "significance": "Benign"}
+        for i in range(records // 10)
+    ])
+    db.session.commit()
+    return patient.id
+
+def run(records, repeat, columnar=False):
+    with tempfile.TemporaryDirectory() as tmpdir:
+        app = make_app(os.path.join(tmpdir, "bench.db"), COLUMNAR_DIR=os.path.join(tmpdir, "columnar"))
+        with app.app_context():
+            patient_id = seed_patient(records)
+
+            statements = []
+            event.listen(db.engine, "before_cursor_execute", lambda *args: statements.append(args[2]))
+
+            results = {}
+            for i in range(repeat):
+                db.session.expunge_all() # cold identity map each run
+                with timer(i, results):
+                    HealthAnalyzer(patient_id).generate_comprehensive_summary()
+            queries = len(statements) // repeat
+
+            columnar_results = {}
+            if columnar:
+                app.config['COLUMNAR_STORE'] = True
+                with timer("build", columnar_results):
+                    HealthAnalyzer(patient_id) # first load writes the columns
+                for i in range(repeat):
+                    db.session.expunge_all()
+                    with timer(i, columnar_results):
+                        HealthAnalyzer(patient_id).generate_comprehensive_summary()
+            db.session.remove()
+
+    best = min(results.values())
+    print(f"Patient with {records} vitals + {records} labs + {records // 10} notes/variants")
+    print(f"Queries per analysis: {queries}")
+    print(f"Wall time: best {best * 1000:.1f} ms over {repeat} runs")
+    if columnar:
+        build = columnar_results.pop("build")
+        print(f"Columnar: best {min(columnar_results.values()) * 1000:.1f} ms over {repeat} runs "
+              f"(one-off column build {build * 1000:.0f} ms)")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--records", type=int, default=10000)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--columnar", action="store_true")
+    args = parser.parse_args()
+    run(args.records, args.repeat, args.columnar)
@@ -0,0 +1,111 @@
+"""
+Throughput of batch (multi-file) ingestion with 1, 2, 4 and 8 parser processes.
+
+Usage (from the repo root):
+    python -m backend.benchmarks.bench_batch_ingest --pdfs 400 --dicoms 400 --pages 5
+"""
+import argparse
+import os
+import random
+import tempfile
+
+from pydicom.dataset import FileDataset, FileMetaDataset
+from pydicom.uid import ExplicitVRLittleEndian, generate_uid
+
+from backend.batch_ingest import ingest_paths
+from backend.benchmarks.common import make_app
+from backend.db import db, DoctorNote, ImagingRecord
+
+NAMES = ["Jane Roe", "John Doe", "Ana Silva", "Wei Chen", "Omar Haddad", "Maria Rossi"]
+
+def write_pdf(path, patient_name, pages, scanned_pages=0):
+    """
+    Minimal uncompressed PDF with a few lines of text per page, followed by
+    `scanned_pages` pages that only hold an image (no text layer).
+    """
+    objects = ["<< /Type /Catalog /Pages 2 0 R >>", None,
+               "<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>",
+               "<< /Type /XObject /Subtype /Image /Width 1 /Height 1 /ColorSpace /DeviceGray "
+               "/BitsPerComponent 8 /Length 1 >>\nstream\n\x80\nendstream"]
+    kids = []
+    for page in range(pages):
+        lines = [f"Patient Name: {patient_name}", f"Visit note page {page + 1}"]
+        lines += [f"Observation {i}: blood pressure {random.randint(100, 160)}/{random.randint(60, 100)} stable" for i in range(30)]
+        text = "BT /F1 10 Tf 12 TL 40 800 Td " + " ".join(f"({line}) Tj T*" for line in lines) + " ET"
+        objects.append(f"<< /Length {len(text)} >>\nstream\n{text}\nendstream")
+        objects.append(f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 595 842] "
+                       f"/Resources << /Font << /F1 3 0 R >> >> /Contents {len(objects)} 0 R >>")
+        kids.append(f"{len(objects)} 0 R")
+    for page in range(scanned_pages):
+        draw = "q 595 0 0 842 0 0 cm /Im0 Do Q"
+        objects.append(f"<< /Length {len(draw)} >>\nstream\n{draw}\nendstream")
+        objects.append(f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 595 842] "
+                       f"/Resources << /XObject << /Im0 4 0 R >> >> /Contents {len(objects)} 0 R >>")
+        kids.append(f"{len(objects)} 0 R")
+    objects[1] = f"<< /Type /Pages /Kids [{' '.join(kids)}] /Count {len(kids)} >>"
+
+    body, offsets = "%PDF-1.4\n", []
+    for number, obj in enumerate(objects, start=1):
+        offsets.append(len(body))
+        body += f"{number} 0 obj\n{obj}\nendobj\n"
+    xref = len(body)
+    body += f"xref\n0 {len(objects) + 1}\n0000000000 65535 f \n"
+    body += "".join(f"{offset:010d} 00000 n \n" for offset in offsets)
+    body += f"trailer\n<< /Size {len(objects) + 1} /Root 1 0 R >>\nstartxref\n{xref}\n%%EOF\n"
+    with open(path, "w", encoding="latin-1") as f:
+        f.write(body)
+
+def write_dicom(path, patient_name, size=128, study_uid=None, series_uid=None):
+    meta = FileMetaDataset()
+    meta.MediaStorageSOPClassUID = "1.2.840.10008.5.1.4.1.1.2"
+    meta.MediaStorageSOPInstanceUID = generate_uid()
+    meta.TransferSyntaxUID = ExplicitVRLittleEndian
+    ds = FileDataset(path, {}, file_meta=meta, preamble=b"\0" * 128)
+    ds.PatientName = patient_name.replace(" ", "^")
+    ds.Modality = random.choice(["CT", "MR", "XR"])
+    ds.BodyPartExamined = random.choice(["CHEST", "HEAD", "KNEE"])
+    ds.StudyDate = f"2024{random.randint(1, 12):02d}{random.randint(1, 28):02d}"
+    ds.StudyInstanceUID = study_uid or generate_uid()
+    ds.SeriesInstanceUID = series_uid or generate_uid()
+    ds.Rows = ds.Columns = size
+    ds.BitsAllocated = ds.BitsStored = 16
+    ds.HighBit = 15
+    ds.SamplesPerPixel = 1
+    ds.PixelRepresentation = 0
+    ds.PhotometricInterpretation = "MONOCHROME2"
+    ds.PixelData = os.urandom(size * size * 2)
+    ds.save_as(path, enforce_file_format=True)
+
+def run(pdfs, dicoms, pages, worker_counts):
+    with tempfile.TemporaryDirectory() as tmpdir:
+        folder = os.path.join(tmpdir, "uploads")
+        os.makedirs(folder)
+        for i in range(pdfs):
+            write_pdf(os.path.join(folder, f"note_{i}.pdf"), NAMES[i % len(NAMES)], pages)
+        for i in range(dicoms):
+            write_dicom(os.path.join(folder, f"scan_{i}.dcm"), NAMES[i % len(NAMES)])
+        files = pdfs + dicoms
+        print(f"{pdfs} PDFs ({pages} pages each) + {dicoms} DICOMs, {os.cpu_count()} CPU(s) available")
+
+        baseline = None
+        for workers in worker_counts:
+            app = make_app(os.path.join(tmpdir, f"bench-{workers}.db"))
+            with app.app_context():
+                result = ingest_paths([folder], workers=workers)
+                if result["failed"]:
+                    raise SystemExit(f"Batch ingestion failed: {result['failed'][:3]}")
+                stored = DoctorNote.query.count() + ImagingRecord.query.count()
+                db.session.remove()
+                db.engine.dispose()
+            baseline = baseline or result["seconds"]
+            print(f"  {workers} worker(s): {result['seconds']:.2f}s -> {files / result['seconds']:,.0f} files/s "
+                  f"(x{baseline / result['seconds']:.2f}), {stored} records stored")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--pdfs", type=int, default=400)
+    parser.add_argument("--dicoms", type=int, default=400)
+    parser.add_argument("--pages", type=int, default=5)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4, 8])
+    args = parser.parse_args()
+    run(args.pdfs, args.dicoms, args.pages, args.workers)
@@ -0,0 +1,106 @@
+"""
+Concurrent load test: dashboard reads while a bulk CSV ingest is writing.
+
+Reader threads keep loading patient data and searching patients while one
+thread ingests a large CSV. Runs once with SQLite's defaults (what the app
+used before backend/config.py) and once with the configured storage
+settings, comparing read throughput, latency and "database is locked" errors.
+
+Usage (from the repo root):
+    python -m backend.benchmarks.bench_concurrent_reads --rows 300000 --readers 4
+"""
+import argparse
+import os
+import random
+import statistics
+import tempfile
+import threading
+import time
+
+from generate_test_csv import generate_csv
+from backend.benchmarks.common import make_app
+from backend.db import db, Patient
+from backend.patient_data import load_patient_data
+
+def reader(app, patient_ids, stop, stats):
+    latencies, errors = [], 0
+    rng = random.Random()
+    with app.app_context():
+        while not stop.is_set():
+            start = time.perf_counter()
+            try:
+                load_patient_data(rng.choice(patient_ids))
+                Patient.query.filter(Patient.name >= "M").order_by(Patient.name).limit(10).all()
+                latencies.append(time.perf_counter() - start)
+            except Exception as e:
+                errors += 1
+                print(f"  read failed: {e.__class__.__name__}: {str(e).splitlines()[0]}")
+            finally:
+                db.session.remove()
+    stats.append((latencies, errors))
+
+MODES = {
+    # Rollback journal, ~2 MB page cache, pysqlite's 5 s lock timeout
+    "defaults": dict(SQLITE_WAL=False, SQLITE_SYNCHRONOUS="FULL", SQLITE_CACHE_SIZE_KB=2000,
+                     SQLITE_MMAP_SIZE=0, SQLITE_BUSY_TIMEOUT_MS=5000),
+    "configured": {},
+}
+
+def run_mode(csv_path, seed_path, config, readers):
+    from backend.ingestion import _process_csv
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        app = make_app(os.path.join(tmpdir, "bench.db"), **config)
+        with app.app_context():
+            # Existing dashboard data to read
+            _process_csv(seed_path)
+            patient_ids = [pid for (pid,) in db.session.query(Patient.id)]
+            db.session.remove()
+
+        stop, stats = threading.Event(), []
+        threads = [threading.Thread(target=reader, args=(app, patient_ids, stop, stats)) for _ in range(readers)]
+        for t in threads:
+            t.start()
+
+        with app.app_context():
+            start = time.perf_counter()
+            _process_csv(csv_path)
+            ingest_s = time.perf_counter() - start
+            db.session.remove()
+
+        stop.set()
+        for t in threads:
+            t.join()
+
+    latencies = sorted(l for ls, _ in stats for l in ls)
+    errors = sum(e for _, e in stats)
+    return {
+        "ingest_s": ingest_s,
+        "reads_per_s": len(latencies) / ingest_s,
+        "p50_ms": statistics.median(latencies) * 1000 if latencies else float("nan"),
+        "p99_ms": latencies[int(len(latencies) * 0.99) - 1] * 1000 if latencies else float("nan"),
+        "max_ms": latencies[-1] * 1000 if latencies else float("nan"),
+        "errors": errors,
+    }
+
+def run(rows, readers):
+    with tempfile.TemporaryDirectory() as tmpdir:
+        seed_path = os.path.join(tmpdir, "seed.csv")
+        csv_path = os.path.join(tmpdir, "ingest.csv")
+        generate_csv(filename=seed_path, num_records=5000)
+        generate_csv(filename=csv_path, num_records=rows)
+
+        results = {mode: run_mode(csv_path, seed_path, config, readers) for mode, config in MODES.items()}
+
+    print(f"{rows} row ingest, {readers} reader threads")
+    print(f"{'mode':<12}{'ingest s':>10}{'reads/s':>10}{'p50 ms':>9}{'p99 ms':>9}{'max ms':>10}{'errors':>8}")
+    for mode, r in results.items():
+        print(f"{mode:<12}{r['ingest_s']:>10.2f}{r['reads_per_s']:>10.0f}{r['p50_ms']:>9.1f}"
+              f"{r['p99_ms']:>9.1f}{r['max_ms']:>10.1f}{r['errors']:>8}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rows", type=int, default=300000)
+    parser.add_argument("--readers", type=int, default=4)
+    args = parser.parse_args()
+    run(args.rows, args.readers)
@@ -0,0 +1,40 @@
+"""
+Rows-per-second benchmark for bulk CSV ingestion.
+
+Usage (from the repo root):
+    python -m backend.benchmarks.bench_csv_ingestion --rows 50000
+"""
+import argparse
+import os
+import tempfile
+
+from generate_test_csv import generate_csv
+from backend.benchmarks.common import make_app, timer
+from backend.db import db, LabResult, MedicalRecord, Patient
+from backend.ingestion import _process_csv
+
+def run(rows):
+    results = {}
+    with tempfile.TemporaryDirectory() as tmpdir:
+        csv_path = os.path.join(tmpdir, "bench.csv")
+        generate_csv(filename=csv_path, num_records=rows)
+        app = make_app(os.path.join(tmpdir, "bench.db"))
+
+        with app.app_context():
+            with timer("ingest", results):
+                ok = _process_csv(csv_path)
+            if not ok:
+                raise SystemExit("CSV ingestion failed")
+
+            print(f"Patients: {Patient.query.count()}, Labs: {LabResult.query.count()}, Vitals records: {MedicalRecord.query.count()}")
+            db.session.remove()
+
+    elapsed = results["ingest"]
+    print(f"Ingested {rows} rows in {elapsed:.2f}s -> {rows / elapsed:,.0f} rows/s")
+    return rows / elapsed
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rows", type=int, default=50000)
+    args = parser.parse_args()
+    run(args.rows)
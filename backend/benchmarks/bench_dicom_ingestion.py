@@ -0,0 +1,64 @@
+"""
+Header-only DICOM reads and per-series grouping on a synthetic CT study.
+
+Usage (from the repo root):
+    python -m backend.benchmarks.bench_dicom_ingestion --slices 500 --series 2
+"""
+import argparse
+import os
+import tempfile
+
+import pydicom
+from pydicom.uid import generate_uid
+
+from backend.batch_ingest import ingest_paths
+from backend.benchmarks.bench_batch_ingest import write_dicom
+from backend.benchmarks.common import make_app, timer
+from backend.db import db, ImagingRecord
+from backend.ingestion import DICOM_TAGS
+
+def write_study(folder, slices, series_count, size):
+    study_uid = generate_uid()
+    series_uids = [generate_uid() for _ in range(series_count)]
+    for i in range(slices):
+        # Extensionless, like most scanner exports
+        write_dicom(os.path.join(folder, f"IM{i:05d}"), "Jane Roe", size=size,
+                    study_uid=study_uid, series_uid=series_uids[i % series_count])
+
+def run(slices, series_count, size):
+    results = {}
+    with tempfile.TemporaryDirectory() as tmpdir:
+        folder = os.path.join(tmpdir, "study")
+        os.makedirs(folder)
+        write_study(folder, slices, series_count, size)
+        files = sorted(os.path.join(folder, name) for name in os.listdir(folder))
+        study_mb = sum(os.path.getsize(f) for f in files) / (1024 * 1024)
+        print(f"{slices} slices of {size}x{size} in {series_count} series, {study_mb:.0f} MB")
+
+        # Warm page cache on this machine, so the time gap understates cold (PACS/NFS) reads
+        for label, options in (("full read", {}),
+                               ("header-only read", {"stop_before_pixels": True, "specific_tags": DICOM_TAGS})):
+            read = 0
+            with timer(label, results):
+                for f in files:
+                    with open(f, "rb") as fp:
+                        pydicom.dcmread(fp, **options)
+                        read += fp.tell()
+            print(f"  {label:<17} {results[label]:.2f}s ({slices / results[label]:,.0f} files/s), "
+                  f"{read / (1024 * 1024):.1f} MB read")
+
+        app = make_app(os.path.join(tmpdir, "bench.db"))
+        with app.app_context():
+            result = ingest_paths([folder], workers=1)
+            records = [(r.series_uid[-6:], r.instance_count) for r in ImagingRecord.query]
+            db.session.remove()
+        print(f"  ingest study folder: {result['seconds']:.2f}s, {len(records)} ImagingRecord(s) "
+              f"(was {slices}): {records}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--slices", type=int, default=500)
+    parser.add_argument("--series", type=int, default=2)
+    parser.add_argument("--size", type=int, default=512)
+    args = parser.parse_args()
+    run(args.slices, args.series, args.size)
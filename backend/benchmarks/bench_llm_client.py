@@ -0,0 +1,89 @@
+"""
+Agent calls against a rate-limited fake Groq endpoint: the old per-call
+synchronous SDK client against the shared LLMClient.
+
+The fake server allows `--limit` requests per `--window` seconds (the
+provider's RPM, scaled down so the run stays short) and answers the rest
+with 429 + Retry-After.
+
+Usage (from the repo root):
+    python -m backend.benchmarks.bench_llm_client --patients 20 --threads 32
+"""
+import argparse
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import groq
+
+from backend.agents.fake_server import FakeLLMServer
+from backend.agents.llm_client import LLMClient, LLMError
+
+SYSTEM_PROMPTS = ["You are a cardiologist.", "You are a pathologist.", "You are a genetic counselor.", "You are a CMO."]
+
+def calls(patients):
+    return [(system, f"Analyze this data:\npatient {i}") for i in range(patients) for system in SYSTEM_PROMPTS]
+
+def before(server, work, threads):
+    # What query_ollama did: one shared Groq client, SDK defaults, errors returned as strings
+    client = groq.Groq(api_key="bench", base_url=server.url)
+
+    def call(item):
+        system, prompt = item
+        try:
+            response = client.chat.completions.create(
+                model="fake", max_tokens=500, temperature=0.3,
+                messages=[{"role": "system", "content": system}, {"role": "user", "content": prompt}])
+            return response.choices[0].message.content
+        except Exception as e:
+            return f"Error querying Groq: {e}"
+
+    with ThreadPoolExecutor(max_workers=threads) as executor:
+        return [r for r in executor.map(call, work) if r.startswith("Error querying Groq")]
+
+def after(server, work, threads, limit, window):
+    client = LLMClient(api_key="bench", base_url=server.url, model="fake",
+                       rpm=limit * 60 / window, tpm=0, max_concurrency=threads)
+    # The fake server's window is scaled down, so is the burst the client allows
+    client.request_bucket.capacity = client.request_bucket.tokens = limit
+
+    def call(item):
+        system, prompt = item
+        try:
+            return client.complete(prompt, system_prompt=system)
+        except LLMError as e:
+            return e
+
+    try:
+        with ThreadPoolExecutor(max_workers=threads) as executor:
+            return [r for r in executor.map(call, work) if isinstance(r, LLMError)], client.stats()
+    finally:
+        client.close()
+
+def run(patients, threads, limit, window, latency):
+    work = calls(patients)
+    print(f"{len(work)} agent calls from {threads} threads, server allows {limit} per {window}s, {latency * 1000:.0f} ms each")
+
+    with FakeLLMServer(latency=latency, limit=limit, window=window) as server:
+        start = time.perf_counter()
+        failed = before(server, work, threads)
+        seconds = time.perf_counter() - start
+        print(f"  before: {seconds:.2f}s, {len(work) - len(failed)} ok, {len(failed)} error strings stored, "
+              f"{server.rejected} 429s from the server")
+
+    with FakeLLMServer(latency=latency, limit=limit, window=window) as server:
+        start = time.perf_counter()
+        failed, stats = after(server, work, threads, limit, window)
+        seconds = time.perf_counter() - start
+        print(f"  after:  {seconds:.2f}s, {len(work) - len(failed)} ok, {len(failed)} raised, "
+              f"{server.rejected} 429s from the server, {stats['throttled_seconds']:.1f}s waited in the limiter (summed over calls), "
+              f"p95 {stats['latency_ms']['p95']} ms")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--patients", type=int, default=20)
+    parser.add_argument("--threads", type=int, default=12)
+    parser.add_argument("--limit", type=int, default=10)
+    parser.add_argument("--window", type=float, default=2.0)
+    parser.add_argument("--latency", type=float, default=0.2)
+    args = parser.parse_args()
+    run(args.patients, args.threads, args.limit, args.window, args.latency)
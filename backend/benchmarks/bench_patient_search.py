@@ -0,0 +1,76 @@
+"""
+Patient search latency: FTS5 prefix/fuzzy search vs the old ILIKE scan.
+
+Usage (from the repo root):
+    python -m backend.benchmarks.bench_patient_search --patients 1000000
+"""
+import argparse
+import os
+import random
+import tempfile
+import time
+
+from sqlalchemy import insert
+from backend.benchmarks.common import make_app
+from backend.db import db, Patient
+from backend.search import search_patients
+
+SYLLABLES = ["an", "bel", "cor", "da", "el", "fin", "gar", "ha", "is", "jo", "ka", "lin", "mar", "na", "or",
+             "pe", "qui", "ra", "sol", "ta", "ul", "vi", "wen", "xa", "yo", "zu", "ber", "chi", "don", "mi"]
+# Real name spellings are far more varied than a few dozen common names;
+# a few thousand synthetic first/last names keep the match sets realistic
+QUERIES = ["dia", "john smi", "jhon smiht", "garc", "priya sharma", "ivanvoa"]
+KNOWN = ["John Smith", "Diana Bush", "Priya Sharma", "Olga Ivanova", "Carlos Garcia"]
+
+def name_pool(rng, size):
+    pool = set()
+    while len(pool) < size:
+        pool.add("".join(rng.choice(SYLLABLES) for _ in range(rng.randint(2, 3))).capitalize())
+    return sorted(pool)
+
+def seed(patients, batch=50000):
+    rng = random.Random(7)
+    first, last = name_pool(rng, 3000), name_pool(rng, 8000)
+    for start in range(0, patients, batch):
+        rows = [
+            {"name": f"{rng.choice(first)} {rng.choice(last)}", "age": rng.randint(18, 90), "gender": "Female"}
+            for _ in range(start, min(start + batch, patients))
+        ]
+        if start == 0:
+            rows += [{"name": name, "age": 50, "gender": "Female"} for name in KNOWN]
+        db.session.execute(insert(Patient), rows)
+        db.session.commit()
+
+def ilike(query):
+    return Patient.query.filter(Patient.name.ilike(f'%{query}%')).limit(10).all()
+
+def measure(fn, query, repeat):
+    times = []
+    for _ in range(repeat):
+        db.session.expunge_all()
+        start = time.perf_counter()
+        results = fn(query)
+        times.append(time.perf_counter() - start)
+    return min(times) * 1000, len(results)
+
+def run(patients, repeat):
+    with tempfile.TemporaryDirectory() as tmpdir:
+        app = make_app(os.path.join(tmpdir, "bench.db"))
+        with app.app_context():
+            start = time.perf_counter()
+            seed(patients)
+            print(f"Seeded + indexed {patients} patients in {time.perf_counter() - start:.1f}s")
+
+            print(f"{'query':<16}{'fts ms':>10}{'hits':>6}{'ilike ms':>10}{'hits':>6}")
+            for query in QUERIES:
+                fts_ms, fts_hits = measure(search_patients, query, repeat)
+                ilike_ms, ilike_hits = measure(ilike, query, repeat)
+                print(f"{query:<16}{fts_ms:>10.1f}{fts_hits:>6}{ilike_ms:>10.1f}{ilike_hits:>6}")
+            db.session.remove()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--patients", type=int, default=1000000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+    run(args.patients, args.repeat)
@@ -0,0 +1,70 @@
+"""
+PDF text extraction: the old page-by-page loop against backend/pdf_text.py
+on one long document with scanned pages.
+
+Usage (from the repo root):
+    python -m backend.benchmarks.bench_pdf_extraction --pages 400 --scanned 100 --workers 4
+
+The last line is extract_pdf(max_pages=...), reading just the pages that
+name detection and the preview need.
+"""
+import argparse
+import os
+import tempfile
+
+import pypdf
+
+from backend.pdf_text import extract_pdf
+
+def extract_sequential(filepath):
+    """The extraction loop _parse_pdf used before, kept here for comparison."""
+    reader = pypdf.PdfReader(filepath)
+    text_content = ""
+    for page in reader.pages:
+        try:
+            page_text = page.extract_text(extraction_mode="layout")
+        except:
+            page_text = page.extract_text()
+        if page_text:
+            text_content += page_text + "\n"
+    return text_content.strip()[:5000]
+
+def run(pages, scanned, workers, head_pages=2):
+    # Imported here: spawned workers re-import this module and shouldn't pay for the app's imports
+    from backend.benchmarks.bench_batch_ingest import write_pdf
+    from backend.benchmarks.common import timer
+
+    results = {}
+    with tempfile.TemporaryDirectory() as tmpdir:
+        path = os.path.join(tmpdir, "discharge.pdf")
+        write_pdf(path, "Jane Roe", pages, scanned_pages=scanned)
+        total = pages + scanned
+        print(f"{pages} text pages + {scanned} scanned pages, {os.path.getsize(path) / 1024:.0f} KB")
+
+        with timer("before", results):
+            kept = extract_sequential(path)
+        print(f"  {'before':<24} {results['before']:.2f}s ({total / results['before']:,.0f} pages/s), "
+              f"{len(kept):,} chars kept")
+
+        for n in sorted({1, workers}):
+            label = f"pdf_text, {n} worker(s)"
+            with timer(label, results):
+                extracted = extract_pdf(path, workers=n)
+            stored = sum(len(chunk["data"]) for chunk in extracted.chunks)
+            print(f"  {label:<24} {results[label]:.2f}s ({total / results[label]:,.0f} pages/s), "
+                  f"{extracted.chars:,} chars kept in {len(extracted.chunks)} chunks ({stored / 1024:.0f} KB compressed), "
+                  f"{extracted.textless_pages} scanned pages skipped")
+
+        # What a caller that only needs the patient name / preview pays
+        with timer("head", results):
+            extracted = extract_pdf(path, max_pages=head_pages)
+        print(f"  {f'first {head_pages} pages only':<24} {results['head']:.2f}s, "
+              f"name line: {extracted.head_lines[0] if extracted.head_lines else None!r}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--pages", type=int, default=400)
+    parser.add_argument("--scanned", type=int, default=100)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    args = parser.parse_args()
+    run(args.pages, args.scanned, args.workers)
@@ -0,0 +1,68 @@
+"""
+Vectorized population risk scoring vs the per-patient predict_risks loop.
+
+Usage (from the repo root):
+    python -m backend.benchmarks.bench_risk_batch --patients 5000
+"""
+import argparse
+import os
+import random
+import tempfile
+from datetime import datetime, timedelta
+
+from sqlalchemy import insert
+from backend.benchmarks.common import make_app, timer
+from backend.db import db, Patient, MedicalRecord, LabResult, GenomicData
+from backend.analysis import HealthAnalyzer
+from backend.risk_batch import score_population, predictions_by_patient
+
+def seed_population(patients):
+    db.session.execute(insert(Patient), [
+        {"name": f"Patient {i}", "age": random.randint(20, 90), "gender": "Female"} for i in range(patients)
+    ])
+    start = datetime(2022, 1, 1)
+    ids = range(1, patients + 1)
+    db.session.execute(insert(LabResult), [
+        {"patient_id": pid, "date": start + timedelta(days=random.randint(0, 700)),
+         "test_type": random.choice(["Hemoglobin A1C", "Glucose", "LDL Cholesterol"]),
+         "result_value": round(random.uniform(4.5, 9.5), 1), "unit": "%", "flag": "Normal"}
+        for pid in ids for _ in range(6)
+    ])
+    db.session.execute(insert(MedicalRecord), [
+        # Distinct days: one record per (patient, date)
+        {"patient_id": pid, "date": start + timedelta(days=day), "systolic_bp": random.randint(100, 170)}
+        for pid in ids for day in random.sample(range(701), 6)
+    ])
+    db.session.execute(insert(GenomicData), [
+        {"patient_id": pid, "gene_marker": f"chr1:{pid}", "variant": "A>G", "risk_association": "Cancer Susceptibility",
+         "significance": "Pathogenic" if random.random() < 0.05 else "Benign"}
+        for pid in ids
+    ])
+    db.session.commit()
+
+def run(patients):
+    results = {}
+    with tempfile.TemporaryDirectory() as tmpdir:
+        app = make_app(os.path.join(tmpdir, "bench.db"))
+        with app.app_context():
+            seed_population(patients)
+            patient_ids = [pid for (pid,) in db.session.query(Patient.id)]
+
+            with timer("loop", results):
+                expected = {pid: HealthAnalyzer(pid).predict_risks() for pid in patient_ids}
+            db.session.expunge_all()
+            with timer("vectorized", results):
+                batch = predictions_by_patient(score_population())
+            db.session.remove()
+
+    mismatches = sum(1 for pid, preds in expected.items() if batch.get(pid, []) != preds)
+    print(f"{patients} patients, {mismatches} mismatches against predict_risks")
+    print(f"Per-patient loop: {results['loop']:.2f}s ({patients / results['loop']:,.0f} patients/s)")
+    print(f"Vectorized batch: {results['vectorized']:.2f}s ({patients / results['vectorized']:,.0f} patients/s)")
+    print(f"Speedup: {results['loop'] / results['vectorized']:.1f}x")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--patients", type=int, default=5000)
+    args = parser.parse_args()
+    run(args.patients)
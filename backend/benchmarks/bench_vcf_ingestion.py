@@ -0,0 +1,58 @@
+"""
+Throughput and peak-RSS benchmark for streaming VCF ingestion.
+
+Usage (from the repo root):
+    python -m backend.benchmarks.bench_vcf_ingestion --variants 1000000 --gzip
+"""
+import argparse
+import gzip
+import os
+import random
+import resource
+import tempfile
+
+from backend.benchmarks.common import make_app, timer
+from backend.db import db, GenomicData
+from backend.ingestion import _process_vcf
+
+def write_vcf(path, variants, compress=False):
+    opener = gzip.open if compress else open
+    with opener(path, "wt") as f:
+        f.write("##fileformat=VCFv4.2\n")
+        f.write("#CHROM\tPOS\tID\tREF\tALT\tQUAL\tFILTER\tINFO\tFORMAT\tBENCH_SAMPLE\n")
+        for i in range(variants):
+            info = "GENE=BRCA2;Risk=High" if random.random() < 0.001 else f"DP={random.randint(5, 80)}"
+            f.write(f"chr{1 + i % 22}\t{10000 + i}\t.\tA\tG\t60\tPASS\t{info}\tGT\t0/1\n")
+
+def peak_rss_mb():
+    # ru_maxrss is reported in KiB on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+def run(variants, compress):
+    results = {}
+    with tempfile.TemporaryDirectory() as tmpdir:
+        vcf_path = os.path.join(tmpdir, "bench.vcf.gz" if compress else "bench.vcf")
+        write_vcf(vcf_path, variants, compress)
+        size_mb = os.path.getsize(vcf_path) / (1024 * 1024)
+        app = make_app(os.path.join(tmpdir, "bench.db"))
+
+        with app.app_context():
+            rss_before = peak_rss_mb()
+            with timer("ingest", results):
+                ok = _process_vcf(vcf_path)
+            if not ok:
+                raise SystemExit("VCF ingestion failed")
+            stored = GenomicData.query.count()
+            db.session.remove()
+
+    elapsed = results["ingest"]
+    print(f"File: {size_mb:.1f} MB ({'gzip' if compress else 'plain'}), variants stored: {stored}")
+    print(f"Ingested {variants} variants in {elapsed:.2f}s -> {variants / elapsed:,.0f} variants/s")
+    print(f"Peak RSS: {rss_before:.1f} MB before ingest, {peak_rss_mb():.1f} MB after")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--variants", type=int, default=200000)
+    parser.add_argument("--gzip", action="store_true")
+    args = parser.parse_args()
+    run(args.variants, args.gzip)
@@ -0,0 +1,26 @@
+import os
+import time
+from contextlib import contextmanager
+from flask import Flask
+from backend.config import init_db
+from backend.db import db
+
+def make_app(db_path, **config):
+    """
+    Minimal app bound to a throwaway SQLite file, so benchmarks never touch
+    health.db. Uses the app's storage settings unless overridden in `config`.
+    """
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = f"sqlite:///{os.path.abspath(db_path)}"
+    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    app.config.update(config)
+    init_db(app)
+    with app.app_context():
+        db.create_all()
+    return app
+
+@contextmanager
+def timer(label, results):
+    start = time.perf_counter()
+    yield
+    results[label] = time.perf_counter() - start
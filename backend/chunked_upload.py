@@ -0,0 +1,269 @@
+"""
+Resumable, chunked uploads for files too large for a single multipart POST
+(multi-GB VCFs, DICOM archives).
+
+    POST   /api/uploads                    {"filename", "size"?, "sha256"?, "stream"?}
+    PUT    /api/uploads/<id>?offset=N      raw chunk bytes, optional X-Chunk-SHA256 header
+    GET    /api/uploads/<id>               state, "received" tells a client where to resume
+    POST   /api/uploads/<id>/complete      {"sha256"?} -> verifies, then queues ingestion
+    DELETE /api/uploads/<id>               abort
+
+Chunks are streamed from the request body straight into the target file,
+so nothing is spooled to memory or a temp file. Each upload lives in
+<UPLOAD_FOLDER>/chunked/<id>/ next to an upload.json holding its state,
+which is all that's needed to resume after a dropped connection or a
+restart.
+
+Line-oriented formats (CSV, VCF, .vcf.gz) are ingested while they arrive:
+the job is queued at init, and the parser reads the file through
+open_upload(), which blocks at the end of the verified bytes until more
+chunks arrive, and only returns EOF once the upload is complete and its
+checksum matched. Parsed rows are spooled to disk until then and only
+written to the database after it (ingestion._spooled): if the upload fails
+its checksum or is aborted, the read raises and the job fails with nothing
+stored, and no write lock is held while the client is still sending.
+"""
+import hashlib
+import io
+import json
+import os
+import threading
+import time
+import uuid
+from datetime import datetime
+
+from werkzeug.utils import secure_filename
+
+STREAMABLE = ('.csv', '.vcf', '.vcf.gz')
+CHUNK_SIZE = 8 * 1024 * 1024 # suggested to clients
+READ_SIZE = 1024 * 1024
+STATE_FILE = "upload.json"
+# A streaming parser gives up if the upload makes no progress for this long
+IDLE_TIMEOUT = float(os.getenv('UPLOAD_IDLE_TIMEOUT', 3600))
+
+_locks = {}
+_locks_guard = threading.Lock()
+
+class UploadError(Exception):
+    """Raised for bad upload requests; `status` is the HTTP status to answer with."""
+    def __init__(self, message, status=400, state=None):
+        super().__init__(message)
+        self.status = status
+        self.state = state
+
+def create_upload(root, filename, size=None, sha256=None, stream=None):
+    filename = secure_filename(filename or "")
+    if not filename:
+        raise UploadError("filename is required")
+    if size is not None and (not isinstance(size, int) or size < 0):
+        raise UploadError("size must be a non-negative integer")
+
+    upload_id = uuid.uuid4().hex
+    directory = os.path.join(root, upload_id)
+    os.makedirs(directory)
+    path = os.path.join(directory, filename)
+    open(path, "wb").close()
+
+    # Only line-oriented formats can be parsed before the whole file is there
+    streamable = filename.lower().endswith(STREAMABLE)
+    stream = streamable if stream is None else bool(stream) and streamable
+    state = {
+        "upload_id": upload_id,
+        "filename": filename,
+        "path": path,
+        "size": size,
+        "sha256": sha256.lower() if sha256 else None,
+        "stream": stream,
+        "received": 0,
+        "status": "uploading", # uploading | complete | failed
+        "error": None,
+        "job_id": None,
+        "updated_at": _now()
+    }
+    _save(directory, state)
+    return state
+
+def get_upload(root, upload_id):
+    return _load(_upload_dir(root, upload_id))
+
+def write_chunk(root, upload_id, offset, stream, chunk_sha256=None):
+    """
+    Writes the request body `stream` at `offset`. A chunk may restart at
+    an earlier offset (a retry) but must not leave a gap; bytes already
+    received are compared, never rewritten, since a streaming parser may
+    have read them. New bytes only become visible once the chunk checksum
+    matched.
+    """
+    directory = _upload_dir(root, upload_id)
+    with _lock(upload_id):
+        state = _load(directory)
+        if state["status"] != "uploading":
+            raise UploadError(f"Upload is {state['status']}", 409, state)
+        if offset is None or offset < 0 or offset > state["received"]:
+            raise UploadError(f"Expected offset <= {state['received']}", 409, state)
+
+        received = state["received"]
+        digest = hashlib.sha256()
+        position = offset
+        with open(state["path"], "r+b") as f:
+            try:
+                while True:
+                    block = stream.read(READ_SIZE)
+                    if not block:
+                        break
+                    digest.update(block)
+                    end = position + len(block)
+                    if state["size"] is not None and end > state["size"]:
+                        raise UploadError(f"Chunk runs past the declared size of {state['size']} bytes", 400, state)
+                    overlap = max(0, min(end, received) - position)
+                    if overlap:
+                        f.seek(position)
+                        if f.read(overlap) != block[:overlap]:
+                            raise UploadError("Chunk conflicts with bytes already received", 409, state)
+                    if overlap < len(block):
+                        f.seek(position + overlap)
+                        f.write(block[overlap:])
+                    position = end
+                if chunk_sha256 and digest.hexdigest() != chunk_sha256.lower():
+                    raise UploadError("Chunk checksum mismatch", 422, state)
+            except Exception:
+                f.truncate(received) # drop the unverified tail
+                raise
+            f.flush()
+            os.fsync(f.fileno())
+
+        state["received"] = max(received, position)
+        state["updated_at"] = _now()
+        _save(directory, state)
+        return state
+
+def complete_upload(root, upload_id, sha256=None):
+    """Verifies size and whole-file checksum; returns (state, content sha256)."""
+    directory = _upload_dir(root, upload_id)
+    with _lock(upload_id):
+        state = _load(directory)
+        if state["status"] != "uploading":
+            raise UploadError(f"Upload is {state['status']}", 409, state)
+
+        expected = (sha256 or state["sha256"] or "").lower() or None
+        if state["size"] is not None and state["received"] != state["size"]:
+            raise UploadError(f"Received {state['received']} of {state['size']} bytes", 409, state)
+        actual = _file_sha256(state["path"], state["received"])
+        if expected and actual != expected:
+            _finish(directory, state, "failed", "Checksum mismatch")
+            raise UploadError("Checksum mismatch", 422, state)
+
+        with open(state["path"], "r+b") as f:
+            f.truncate(state["received"])
+        _finish(directory, state, "complete")
+        return state, actual
+
+def fail_upload(root, upload_id, error):
+    """Aborts an upload; a parser reading it fails on its next read."""
+    directory = _upload_dir(root, upload_id)
+    with _lock(upload_id):
+        state = _load(directory)
+        if state["status"] == "uploading":
+            _finish(directory, state, "failed", error)
+        return state
+
+def set_job(root, upload_id, job_id):
+    directory = _upload_dir(root, upload_id)
+    with _lock(upload_id):
+        state = _load(directory)
+        state["job_id"] = job_id
+        _save(directory, state)
+        return state
+
+def is_streaming(filepath):
+    """True while `filepath` is a chunked upload that is still arriving."""
+    state = _state_for(filepath)
+    return state is not None and state["status"] == "uploading"
+
+def open_upload(filepath):
+    """Binary file object for an upload, growing with it until it completes."""
+    return io.BufferedReader(GrowingFile(filepath), buffer_size=READ_SIZE)
+
+class GrowingFile(io.RawIOBase):
+    """
+    Reads an upload's verified bytes as they arrive. At the end of what has
+    been received it waits for more; EOF only once the upload is complete.
+    """
+    def __init__(self, filepath, poll=0.2):
+        self.filepath = filepath
+        self.poll = poll
+        self._file = open(filepath, "rb")
+        self._pos = 0
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        waited_since = time.monotonic()
+        while True:
+            state = _state_for(self.filepath)
+            available = (state["received"] if state else os.path.getsize(self.filepath)) - self._pos
+            if available > 0:
+                self._file.seek(self._pos)
+                data = self._file.read(min(len(buffer), available))
+                buffer[:len(data)] = data
+                self._pos += len(data)
+                return len(data)
+            if state is None or state["status"] == "complete":
+                return 0
+            if state["status"] == "failed":
+                raise IOError(f"Upload failed: {state['error']}")
+            if time.monotonic() - waited_since > IDLE_TIMEOUT:
+                raise IOError(f"Upload stalled for {IDLE_TIMEOUT:.0f}s")
+            time.sleep(self.poll)
+
+    def close(self):
+        self._file.close()
+        super().close()
+
+def _state_for(filepath):
+    try:
+        return _load(os.path.dirname(os.path.abspath(filepath)))
+    except UploadError:
+        return None
+
+def _upload_dir(root, upload_id):
+    if not upload_id or not all(c in "0123456789abcdef" for c in upload_id):
+        raise UploadError("Upload not found", 404)
+    return os.path.join(root, upload_id)
+
+def _load(directory):
+    try:
+        with open(os.path.join(directory, STATE_FILE)) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        raise UploadError("Upload not found", 404)
+
+def _save(directory, state):
+    # Atomic, a parser polling the state never sees a half-written file
+    tmp = os.path.join(directory, f"{STATE_FILE}.{uuid.uuid4().hex}")
+    with open(tmp, "w") as f:
+        json.dump(state, f)
+    os.replace(tmp, os.path.join(directory, STATE_FILE))
+
+def _finish(directory, state, status, error=None):
+    state.update(status=status, error=error, updated_at=_now())
+    _save(directory, state)
+
+def _file_sha256(path, length):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        while length > 0:
+            block = f.read(min(READ_SIZE, length))
+            if not block:
+                break
+            digest.update(block)
+            length -= len(block)
+    return digest.hexdigest()
+
+def _lock(upload_id):
+    with _locks_guard:
+        return _locks.setdefault(upload_id, threading.Lock())
+
+def _now():
+    return datetime.utcnow().isoformat()
@@ -0,0 +1,198 @@
+"""
+Optional columnar store for a patient's vitals and labs.
+
+Each patient's MedicalRecord and LabResult rows are kept as one NumPy array
+per column (.npy files, opened memory-mapped), so analysis can read a long
+history without building a Python object per row:
+
+    <COLUMNAR_DIR>/<patient_id>/current      -> "7" (version being served)
+    <COLUMNAR_DIR>/<patient_id>/v7/vitals.date.npy, labs.result_value.npy, ...
+
+Files are stamped with the patient's AnalysisSnapshot.version, which every
+ingestion parser bumps through mark_dirty(). A stale or missing copy is
+rebuilt from SQL on the next load, and the ingestion worker's snapshot
+rebuild does that right after each job, so the store follows ingestion
+without a separate sync step. Enabled with COLUMNAR_STORE=1.
+
+Encoding: integer columns with NULLs and float columns are float64 (NaN =
+NULL), dates are datetime64[us], strings are fixed-width unicode ('' = NULL).
+"""
+import os
+import shutil
+import uuid
+from collections import namedtuple
+
+import numpy as np
+from flask import current_app
+
+from backend.db import db, MedicalRecord, LabResult, AnalysisSnapshot
+
+TABLES = {'vitals': MedicalRecord, 'labs': LabResult}
+
+class SeriesTable:
+    """
+    Read-only, date-ordered columns of one table for one patient. Behaves
+    like the list of rows load_patient_data returns (len, indexing, slicing,
+    iteration, row.<column>), but rows are only built for the indices that
+    are actually accessed.
+    """
+    def __init__(self, model, columns):
+        self.model = model
+        self.columns = columns
+        self.names = [c.name for c in model.__table__.columns if c.name != 'patient_id']
+        self.row_type = namedtuple(f"{model.__name__}Row", self.names)
+        self._ints = {c.name for c in model.__table__.columns if isinstance(c.type, db.Integer)}
+        self._length = len(columns['id'])
+
+    def __len__(self):
+        return self._length
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self._row(i) for i in range(*index.indices(self._length))]
+        if index < 0:
+            index += self._length
+        if not 0 <= index < self._length:
+            raise IndexError(index)
+        return self._row(index)
+
+    def __iter__(self):
+        for i in range(self._length):
+            yield self._row(i)
+
+    def __reversed__(self):
+        for i in range(self._length - 1, -1, -1):
+            yield self._row(i)
+
+    def column(self, name):
+        return self.columns[name]
+
+    def distinct(self, name):
+        """Sorted distinct non-NULL values of a column."""
+        return [_decode(value, False) for value in np.unique(self.columns[name]) if _decode(value, False) is not None]
+
+    def tail_by(self, name, n):
+        """{value of `name`: its last n rows, oldest first}, grouped with NumPy."""
+        keys, inverse = np.unique(self.columns[name], return_inverse=True)
+        # One stable sort groups the rows by key, each group still in row order
+        order = np.argsort(inverse.ravel(), kind="stable")
+        ends = np.searchsorted(inverse.ravel(), np.arange(1, len(keys) + 1), sorter=order)
+        starts = np.concatenate(([0], ends[:-1]))
+        tails = {}
+        for key, start, end in zip(keys, starts, ends):
+            tails[_decode(key, False)] = [self._row(i) for i in order[max(end - n, start):end]]
+        return tails
+
+    def _row(self, i):
+        return self.row_type(*[_decode(self.columns[name][i], name in self._ints) for name in self.names])
+
+def enabled():
+    return bool(current_app.config.get('COLUMNAR_STORE'))
+
+def load_series(patient_id):
+    """
+    {'vitals': SeriesTable, 'labs': SeriesTable} for the patient, memory-mapped
+    from disk and rebuilt first if ingestion changed the patient since.
+    """
+    version = _current_version(patient_id)
+    path = _version_dir(patient_id, version)
+    if _served_version(patient_id) != version or not os.path.isdir(path):
+        write_series(patient_id, version)
+    try:
+        return {kind: _read_table(path, kind, model) for kind, model in TABLES.items()}
+    except FileNotFoundError:
+        # A newer version replaced this one between the check and the read
+        return load_series(patient_id)
+
+def write_series(patient_id, version=None):
+    """Writes the patient's columns from SQL as `version` and makes it the served copy."""
+    if version is None:
+        version = _current_version(patient_id)
+    root = _patient_dir(patient_id)
+    os.makedirs(root, exist_ok=True)
+
+    # Build in a scratch dir, then flip the "current" pointer atomically
+    scratch = os.path.join(root, f"tmp-{uuid.uuid4().hex}")
+    os.makedirs(scratch)
+    for kind, model in TABLES.items():
+        for name, array in _query_columns(model, patient_id).items():
+            np.save(os.path.join(scratch, f"{kind}.{name}.npy"), array, allow_pickle=False)
+
+    target = _version_dir(patient_id, version)
+    try:
+        os.replace(scratch, target)
+    except OSError:
+        # Another worker already wrote this version
+        shutil.rmtree(scratch, ignore_errors=True)
+        if not os.path.isdir(target):
+            raise
+    pointer = os.path.join(root, f"current.{uuid.uuid4().hex}")
+    with open(pointer, "w") as f:
+        f.write(str(version))
+    os.replace(pointer, os.path.join(root, "current"))
+
+    # Older versions are no longer served; open memory maps stay valid after unlink
+    for entry in os.listdir(root):
+        if entry.startswith("v") and entry != f"v{version}":
+            shutil.rmtree(os.path.join(root, entry), ignore_errors=True)
+
+def _query_columns(model, patient_id):
+    columns = [c for c in model.__table__.columns if c.name != 'patient_id']
+    rows = db.session.execute(
+        db.select(*columns).where(model.patient_id == patient_id).order_by(model.date, model.id)
+    ).all()
+    values = list(zip(*rows)) if rows else [()] * len(columns)
+    return {column.name: _encode(column, data) for column, data in zip(columns, values)}
+
+def _encode(column, values):
+    if column.name == 'id':
+        return np.array(values, dtype=np.int64)
+    if isinstance(column.type, db.DateTime):
+        return np.array([np.datetime64(v, 'us') if v is not None else np.datetime64('NaT') for v in values], dtype='datetime64[us]')
+    if isinstance(column.type, (db.Integer, db.Float)):
+        return np.array([np.nan if v is None else v for v in values], dtype=np.float64)
+    return np.array(['' if v is None else v for v in values], dtype=str if values else '<U1')
+
+def _decode(value, as_int):
+    if isinstance(value, np.datetime64):
+        return None if np.isnat(value) else value.astype('datetime64[us]').item()
+    if isinstance(value, np.floating):
+        if np.isnan(value):
+            return None
+        return int(value) if as_int else float(value)
+    if isinstance(value, np.integer):
+        return int(value)
+    if isinstance(value, np.str_):
+        return str(value) or None
+    return value
+
+def _read_table(path, kind, model):
+    names = [c.name for c in model.__table__.columns if c.name != 'patient_id']
+    return SeriesTable(model, {name: _load(os.path.join(path, f"{kind}.{name}.npy")) for name in names})
+
+def _load(filename):
+    try:
+        return np.load(filename, mmap_mode='r')
+    except ValueError:
+        # Zero-length arrays can't be memory-mapped
+        return np.load(filename)
+
+def _current_version(patient_id):
+    # A patient ingestion never touched has no snapshot row yet: version 0
+    version = db.session.execute(
+        db.select(AnalysisSnapshot.version).where(AnalysisSnapshot.patient_id == patient_id)
+    ).scalar()
+    return version or 0
+
+def _served_version(patient_id):
+    try:
+        with open(os.path.join(_patient_dir(patient_id), "current")) as f:
+            return int(f.read().strip())
+    except (OSError, ValueError):
+        return None
+
+def _patient_dir(patient_id):
+    return os.path.join(current_app.config['COLUMNAR_DIR'], str(int(patient_id)))
+
+def _version_dir(patient_id, version):
+    return os.path.join(_patient_dir(patient_id), f"v{version}")
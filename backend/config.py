@@ -0,0 +1,78 @@
+"""
+Storage configuration: database URL, connection pool and SQLite pragmas.
+
+Every setting has a default here and can be overridden through the
+environment (or by setting the app.config key before init_db). With the
+defaults, SQLite runs in WAL mode so dashboard reads keep working while an
+ingest job is committing, and writers wait on a lock (busy timeout) instead
+of failing with "database is locked".
+"""
+import os
+from sqlalchemy import event
+from sqlalchemy.engine import make_url
+from backend.db import db
+
+def storage_config():
+    """Defaults for the storage keys of app.config."""
+    return {
+        'SQLALCHEMY_DATABASE_URI': os.getenv('DATABASE_URL', 'sqlite:///health.db'),
+        # WAL lets readers run alongside the single writer; off = rollback journal
+        'SQLITE_WAL': os.getenv('SQLITE_WAL', '1') != '0',
+        # NORMAL is durable across app crashes in WAL mode, only an OS crash can lose the last commit
+        'SQLITE_SYNCHRONOUS': os.getenv('SQLITE_SYNCHRONOUS', 'NORMAL'),
+        'SQLITE_CACHE_SIZE_KB': int(os.getenv('SQLITE_CACHE_SIZE_KB', 64 * 1024)),
+        'SQLITE_MMAP_SIZE': int(os.getenv('SQLITE_MMAP_SIZE', 256 * 1024 * 1024)),
+        'SQLITE_BUSY_TIMEOUT_MS': int(os.getenv('SQLITE_BUSY_TIMEOUT_MS', 15000)),
+        # Request threads + ingestion workers each hold a connection while busy
+        'DB_POOL_SIZE': int(os.getenv('DB_POOL_SIZE', 10)),
+        'DB_MAX_OVERFLOW': int(os.getenv('DB_MAX_OVERFLOW', 10)),
+        'DB_POOL_TIMEOUT': int(os.getenv('DB_POOL_TIMEOUT', 30)),
+        # Memory-mapped per-patient vitals/labs columns (backend/columnar.py)
+        'COLUMNAR_STORE': os.getenv('COLUMNAR_STORE', '0') == '1',
+        'COLUMNAR_DIR': os.getenv('COLUMNAR_DIR'),
+    }
+
+def engine_options(config):
+    """SQLALCHEMY_ENGINE_OPTIONS for the configured database."""
+    url = make_url(config['SQLALCHEMY_DATABASE_URI'])
+    if url.get_backend_name() == 'sqlite' and url.database in (None, '', ':memory:'):
+        # In-memory databases live in a single connection; keep SQLAlchemy's pool
+        return {}
+    return {
+        'pool_size': config['DB_POOL_SIZE'],
+        'max_overflow': config['DB_MAX_OVERFLOW'],
+        'pool_timeout': config['DB_POOL_TIMEOUT'],
+        'pool_pre_ping': url.get_backend_name() != 'sqlite',
+    }
+
+def sqlite_pragmas(config):
+    """PRAGMA statements run on every new SQLite connection."""
+    return [
+        # First, so switching journal_mode also waits out a writer's lock
+        f"PRAGMA busy_timeout={config['SQLITE_BUSY_TIMEOUT_MS']}",
+        f"PRAGMA journal_mode={'WAL' if config['SQLITE_WAL'] else 'DELETE'}",
+        f"PRAGMA synchronous={config['SQLITE_SYNCHRONOUS']}",
+        f"PRAGMA cache_size={-config['SQLITE_CACHE_SIZE_KB']}", # negative = KiB
+        f"PRAGMA mmap_size={config['SQLITE_MMAP_SIZE']}",
+        "PRAGMA temp_store=MEMORY",
+    ]
+
+def init_db(app):
+    """db.init_app(app) with the storage settings applied (app.config values win over defaults)."""
+    for key, value in storage_config().items():
+        app.config.setdefault(key, value)
+    if not app.config['COLUMNAR_DIR']:
+        app.config['COLUMNAR_DIR'] = os.path.join(app.instance_path, 'columnar')
+    app.config.setdefault('SQLALCHEMY_ENGINE_OPTIONS', engine_options(app.config))
+    db.init_app(app)
+
+    with app.app_context():
+        if db.engine.dialect.name == 'sqlite':
+            pragmas = sqlite_pragmas(app.config)
+
+            @event.listens_for(db.engine, "connect")
+            def _apply_pragmas(dbapi_connection, connection_record):
+                cursor = dbapi_connection.cursor()
+                for pragma in pragmas:
+                    cursor.execute(pragma)
+                cursor.close()
@@ -1,9 +1,13 @@
+import hashlib
 from flask_sqlalchemy import SQLAlchemy
 from datetime import datetime
 
 db = SQLAlchemy()
 
 class Patient(db.Model):
+    __table_args__ = (
+        db.Index('ix_patient_name', 'name'), # ingestion matches patients by name
+    )
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String(100), nullable=False)
     age = db.Column(db.Integer, nullable=False)
@@ -30,6 +34,11 @@ class Patient(db.Model):
         }
 
 class MedicalRecord(db.Model):
+    __table_args__ = (
+        # Natural key: one record per visit, ingestion merges vitals into it
+        # (ON CONFLICT DO UPDATE). Also serves the per-patient date range reads.
+        db.Index('uq_medical_record_visit', 'patient_id', 'date', unique=True),
+    )
     id = db.Column(db.Integer, primary_key=True)
     patient_id = db.Column(db.Integer, db.ForeignKey('patient.id'), nullable=False)
     date = db.Column(db.DateTime, default=datetime.utcnow)
@@ -49,6 +58,12 @@ class MedicalRecord(db.Model):
         }
 
 class LabResult(db.Model):
+    __table_args__ = (
+        db.Index('ix_lab_result_patient_date', 'patient_id', 'date'),
+        # Natural key: re-ingesting a lab is a no-op (ON CONFLICT DO NOTHING).
+        # Also serves the per-test (patient_id, test_type, date) lookups.
+        db.Index('uq_lab_result_natural', 'patient_id', 'test_type', 'date', 'result_value', unique=True),
+    )
     id = db.Column(db.Integer, primary_key=True)
     patient_id = db.Column(db.Integer, db.ForeignKey('patient.id'), nullable=False)
     date = db.Column(db.DateTime, default=datetime.utcnow)
@@ -69,6 +84,10 @@ class LabResult(db.Model):
         }
 
 class ImagingRecord(db.Model):
+    __table_args__ = (
+        db.Index('ix_imaging_record_patient_date', 'patient_id', 'date'),
+        db.Index('uq_imaging_record_series', 'patient_id', 'series_uid', unique=True),
+    )
     id = db.Column(db.Integer, primary_key=True)
     patient_id = db.Column(db.Integer, db.ForeignKey('patient.id'), nullable=False)
     date = db.Column(db.DateTime, default=datetime.utcnow)
@@ -76,6 +95,10 @@ class ImagingRecord(db.Model):
     body_part = db.Column(db.String(50))
     image_url = db.Column(db.String(200)) # Placeholder URL
     radiologist_report = db.Column(db.Text)
+    # DICOM: one record per series, counting its instances (slices)
+    study_uid = db.Column(db.String(64))
+    series_uid = db.Column(db.String(64))
+    instance_count = db.Column(db.Integer, default=1)
 
     def to_dict(self):
         return {
@@ -84,10 +107,17 @@ class ImagingRecord(db.Model):
             'modality': self.modality,
             'body_part': self.body_part,
             'image_url': self.image_url,
-            'radiologist_report': self.radiologist_report
+            'radiologist_report': self.radiologist_report,
+            'study_uid': self.study_uid,
+            'series_uid': self.series_uid,
+            'instance_count': self.instance_count
         }
 
 class GenomicData(db.Model):
+    __table_args__ = (
+        db.Index('ix_genomic_data_patient', 'patient_id'),
+        db.Index('uq_genomic_data_variant', 'patient_id', 'gene_marker', 'variant', unique=True),
+    )
     id = db.Column(db.Integer, primary_key=True)
     patient_id = db.Column(db.Integer, db.ForeignKey('patient.id'), nullable=False)
     gene_marker = db.Column(db.String(50))
@@ -105,12 +135,33 @@ class GenomicData(db.Model):
         }
 
 class DoctorNote(db.Model):
+    __table_args__ = (
+        db.Index('ix_doctor_note_patient_date', 'patient_id', 'date'),
+        db.Index('uq_doctor_note_content', 'patient_id', 'content_hash', unique=True),
+    )
     id = db.Column(db.Integer, primary_key=True)
     patient_id = db.Column(db.Integer, db.ForeignKey('patient.id'), nullable=False)
     date = db.Column(db.DateTime, default=datetime.utcnow)
     doctor_name = db.Column(db.String(100))
     note_content = db.Column(db.Text)
     sentiment = db.Column(db.String(50)) # "Stable", "Deteriorating", "Improving" (Predicted or Manual)
+    # hash_content() of the document's full extracted text, set by ingestion: the same
+    # text is the same document. NULL for notes entered otherwise, where repeated wording
+    # is legitimate, and for scans with no text.
+    content_hash = db.Column(db.String(64))
+
+    @staticmethod
+    def hash_content(note_content):
+        return hashlib.sha256((note_content or "").encode("utf-8")).hexdigest()
+
+    def full_text(self):
+        """The whole extracted document for ingested PDFs; note_content only holds its start."""
+        from backend.pdf_text import decompress_chunks
+        if self.content_hash:
+            chunks = NoteTextChunk.query.filter_by(content_hash=self.content_hash).order_by(NoteTextChunk.chunk_index).all()
+            if chunks:
+                return decompress_chunks(chunks)
+        return self.note_content
 
     def to_dict(self):
         return {
@@ -121,12 +172,32 @@ class DoctorNote(db.Model):
             'sentiment': self.sentiment
         }
 
+class NoteTextChunk(db.Model):
+    """
+    Full text of an ingested PDF, zlib-compressed in page-aligned chunks
+    (see backend/pdf_text.py). Keyed by the note's content_hash, so the
+    same document is only stored once.
+    """
+    __table_args__ = (
+        db.Index('uq_note_text_chunk', 'content_hash', 'chunk_index', unique=True),
+    )
+    id = db.Column(db.Integer, primary_key=True)
+    content_hash = db.Column(db.String(64), nullable=False)
+    chunk_index = db.Column(db.Integer, nullable=False)
+    page_start = db.Column(db.Integer) # 0-based, inclusive
+    page_end = db.Column(db.Integer)
+    data = db.Column(db.LargeBinary, nullable=False)
+
 class AIAnalysis(db.Model):
+    __table_args__ = (
+        db.Index('ix_ai_analysis_patient_date', 'patient_id', 'date'),
+    )
     id = db.Column(db.Integer, primary_key=True)
     patient_id = db.Column(db.Integer, db.ForeignKey('patient.id'), nullable=False)
     date = db.Column(db.DateTime, default=datetime.utcnow)
     summary = db.Column(db.Text)
     agent_details = db.Column(db.JSON)
+    input_fingerprint = db.Column(db.JSON) # agent key -> hash of the input it was given
 
     def to_dict(self):
         return {
@@ -135,3 +206,189 @@ class AIAnalysis(db.Model):
             'summary': self.summary,
             'agent_details': self.agent_details
         }
+
+class IngestionJob(db.Model):
+    __table_args__ = (
+        db.Index('ix_ingestion_job_status', 'status'),
+    )
+    id = db.Column(db.Integer, primary_key=True)
+    filename = db.Column(db.String(200))
+    filepath = db.Column(db.String(500), nullable=False)
+    status = db.Column(db.String(20), default="queued") # "queued", "running", "succeeded", "failed", "duplicate"
+    progress = db.Column(db.Integer, default=0) # rows / pages / variants done
+    error = db.Column(db.Text)
+    warning = db.Column(db.Text) # succeeded, but not everything was stored (e.g. undated rows)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    started_at = db.Column(db.DateTime)
+    finished_at = db.Column(db.DateTime)
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'filename': self.filename,
+            'status': self.status,
+            'progress': self.progress,
+            'error': self.error,
+            'warning': self.warning,
+            'created_at': self.created_at.isoformat() if self.created_at else None,
+            'started_at': self.started_at.isoformat() if self.started_at else None,
+            'finished_at': self.finished_at.isoformat() if self.finished_at else None
+        }
+
+class IngestedFile(db.Model):
+    """Every file ingested, by content hash, so a re-upload or retry is skipped."""
+    id = db.Column(db.Integer, primary_key=True)
+    content_hash = db.Column(db.String(64), nullable=False, unique=True)
+    filename = db.Column(db.String(200))
+    ingested_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+class PatientRisk(db.Model):
+    """Population risk scores written by the nightly batch in backend/risk_batch.py."""
+    id = db.Column(db.Integer, primary_key=True)
+    patient_id = db.Column(db.Integer, db.ForeignKey('patient.id'), nullable=False, index=True)
+    condition = db.Column(db.String(100))
+    probability = db.Column(db.String(20))
+    reason = db.Column(db.String(300))
+    severity = db.Column(db.String(20))
+    computed_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    def to_dict(self):
+        return {
+            'condition': self.condition,
+            'probability': self.probability,
+            'reason': self.reason,
+            'severity': self.severity,
+            'computed_at': self.computed_at.isoformat() if self.computed_at else None
+        }
+
+class AnalysisSnapshot(db.Model):
+    """
+    Materialized HealthAnalyzer summary per patient (see backend/snapshots.py).
+    Ingestion bumps `version`; the snapshot is fresh while built_version == version.
+    """
+    __table_args__ = (
+        # Partial index over stale rows only, for rebuild_dirty()
+        db.Index('ix_analysis_snapshot_dirty', 'patient_id', sqlite_where=db.text('built_version != version')),
+    )
+    patient_id = db.Column(db.Integer, db.ForeignKey('patient.id'), primary_key=True, autoincrement=False)
+    payload = db.Column(db.JSON)
+    version = db.Column(db.Integer, nullable=False, default=1)
+    built_version = db.Column(db.Integer, nullable=False, default=0)
+    payload_format = db.Column(db.Integer) # snapshots.PAYLOAD_FORMAT the payload was built with
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+class SummaryBatch(db.Model):
+    """
+    An AI summary run over a cohort (backend/ai_summaries.py). Its items are
+    the checkpoint: a resumed run only works through the ones not done yet.
+    """
+    id = db.Column(db.Integer, primary_key=True)
+    status = db.Column(db.String(20), default="queued") # "queued", "running", "paused" (token budget), "finished"
+    max_concurrency = db.Column(db.Integer) # agent calls in flight across all patients
+    token_budget = db.Column(db.Integer) # per run; None for no limit
+    tokens_used = db.Column(db.Integer, default=0) # all runs, estimated
+    patients_per_minute = db.Column(db.Float) # throughput of the latest run
+    error = db.Column(db.Text)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    started_at = db.Column(db.DateTime) # latest run
+    finished_at = db.Column(db.DateTime)
+    items = db.relationship('SummaryBatchItem', backref='batch', lazy=True)
+
+    def to_dict(self):
+        counts = dict(
+            db.session.query(SummaryBatchItem.status, db.func.count())
+            .filter(SummaryBatchItem.batch_id == self.id)
+            .group_by(SummaryBatchItem.status)
+        )
+        return {
+            'id': self.id,
+            'status': self.status,
+            'patients': sum(counts.values()),
+            'counts': counts,
+            'max_concurrency': self.max_concurrency,
+            'token_budget': self.token_budget,
+            'tokens_used': self.tokens_used,
+            'patients_per_minute': self.patients_per_minute,
+            'error': self.error,
+            'created_at': self.created_at.isoformat() if self.created_at else None,
+            'started_at': self.started_at.isoformat() if self.started_at else None,
+            'finished_at': self.finished_at.isoformat() if self.finished_at else None
+        }
+
+class SummaryBatchItem(db.Model):
+    __table_args__ = (
+        db.UniqueConstraint('batch_id', 'patient_id', name='uq_summary_batch_item'),
+        db.Index('ix_summary_batch_item_status', 'batch_id', 'status'),
+    )
+    id = db.Column(db.Integer, primary_key=True)
+    batch_id = db.Column(db.Integer, db.ForeignKey('summary_batch.id'), nullable=False)
+    patient_id = db.Column(db.Integer, db.ForeignKey('patient.id'), nullable=False)
+    status = db.Column(db.String(20), default="pending") # "pending", "done", "unchanged", "failed"
+    analysis_id = db.Column(db.Integer, db.ForeignKey('ai_analysis.id'))
+    error = db.Column(db.Text)
+    finished_at = db.Column(db.DateTime)
+
+# Columns added after a database may already exist; create_all() only creates
+# missing tables, so these are added with ALTER TABLE by upgrade_schema().
+# Indexes declared on the models are created there too.
+ADDED_COLUMNS = {
+    'ai_analysis': {'input_fingerprint': 'JSON'},
+    'analysis_snapshot': {'payload_format': 'INTEGER'},
+    'imaging_record': {'study_uid': 'VARCHAR(64)', 'series_uid': 'VARCHAR(64)', 'instance_count': 'INTEGER DEFAULT 1'},
+    'doctor_note': {'content_hash': 'VARCHAR(64)'},
+    'ingestion_job': {'warning': 'TEXT'},
+}
+# Indexes no longer declared on the models, dropped by upgrade_schema()
+DROPPED_INDEXES = ['ix_imaging_record_series'] # series are looked up by uq_imaging_record_series
+# Indexes replaced by a unique one on the same columns; dropped once that exists,
+# so a database whose duplicates block the unique index keeps the old one
+SUPERSEDED_INDEXES = {'ix_medical_record_patient_date': 'uq_medical_record_visit'}
+
+def _duplicate_rows(conn, table, index):
+    """How many rows would have to go before the unique `index` can be created."""
+    columns = ", ".join(column.name for column in index.columns)
+    not_null = " AND ".join(f"{column.name} IS NOT NULL" for column in index.columns)
+    return conn.execute(db.text(
+        f"SELECT COALESCE(SUM(n - 1), 0) FROM "
+        f"(SELECT COUNT(*) AS n FROM {table.name} WHERE {not_null} GROUP BY {columns} HAVING n > 1)"
+    )).scalar()
+
+def upgrade_schema():
+    """Brings an existing health.db up to the current models. Safe to run on every start."""
+    with db.engine.begin() as conn:
+        # Inspect on the same connection, so the inspector can't reset (roll back) it
+        inspector = db.inspect(conn)
+        for table, columns in ADDED_COLUMNS.items():
+            if not inspector.has_table(table):
+                continue
+            existing = {c['name'] for c in inspector.get_columns(table)}
+            for name, ddl in columns.items():
+                if name not in existing:
+                    conn.execute(db.text(f"ALTER TABLE {table} ADD COLUMN {name} {ddl}"))
+        for name in DROPPED_INDEXES:
+            conn.execute(db.text(f"DROP INDEX IF EXISTS {name}"))
+
+        indexes = set()
+        for table in db.metadata.sorted_tables:
+            if not inspector.has_table(table.name):
+                continue
+            existing = {index['name'] for index in inspector.get_indexes(table.name)}
+            indexes.update(existing)
+            for index in table.indexes:
+                if index.name in existing:
+                    continue
+                # Existing data is never deleted here: a natural key that is already
+                # duplicated stays unindexed until the rows are cleaned up by hand
+                duplicates = _duplicate_rows(conn, table, index) if index.unique else 0
+                if duplicates:
+                    print(f"WARNING: not creating unique index {index.name}: {duplicates} duplicate "
+                          f"{table.name} row(s) on ({', '.join(c.name for c in index.columns)}). "
+                          f"Ingestion relying on this key may fail or add duplicates until they are removed.")
+                    continue
+                print(f"Creating index {index.name}...")
+                index.create(conn)
+                indexes.add(index.name)
+
+        for name, replacement in SUPERSEDED_INDEXES.items():
+            if name in indexes and replacement in indexes:
+                conn.execute(db.text(f"DROP INDEX {name}"))
@@ -0,0 +1,200 @@
+"""
+Windowed access to a patient's vitals and lab history for charts.
+
+Instead of shipping every row ever recorded inside /analysis, history is
+read per series with a date range and either
+  - keyset pagination: rows ordered by (date, id), `next_cursor` resumes
+    after the last row of a page, so deep pages cost the same as the first;
+  - downsampling to about `points` rows: LTTB (keeps the visual shape of
+    the series) or fixed time buckets with min/max/mean per field.
+"""
+import base64
+from datetime import datetime, timedelta
+from backend.db import db, MedicalRecord, LabResult
+
+MAX_PAGE_SIZE = 1000
+MAX_POINTS = 2000
+
+VITAL_FIELDS = ('systolic_bp', 'diastolic_bp', 'heart_rate', 'temperature')
+
+# kind -> (model, fields, fields LTTB picks by, in order of preference)
+SERIES = {
+    'vitals': (MedicalRecord, VITAL_FIELDS, VITAL_FIELDS),
+    'labs': (LabResult, ('result_value',), ('result_value',)),
+}
+
+def get_history(patient_id, kind, start=None, end=None, cursor=None, limit=500,
+                test_type=None, points=None, method='lttb'):
+    """
+    One page (or a downsampled view) of a patient's `kind` history ('vitals'
+    or 'labs'). start/end bound the date range (end exclusive); labs can be
+    restricted to one test_type. Raises ValueError on bad arguments.
+    """
+    if kind not in SERIES:
+        raise ValueError(f"Unknown history kind '{kind}'")
+    model, fields, primary = SERIES[kind]
+    if points is not None and points < 2:
+        raise ValueError("points must be at least 2")
+    if limit < 1:
+        raise ValueError("limit must be at least 1")
+
+    query = db.select(*[c for c in model.__table__.columns if c.name != 'patient_id']) \
+        .where(model.patient_id == patient_id)
+    if test_type and model is LabResult:
+        query = query.where(LabResult.test_type == test_type)
+    if start:
+        query = query.where(model.date >= start)
+    if end:
+        query = query.where(model.date < end)
+
+    if points is not None:
+        if method not in ('lttb', 'bucket'):
+            raise ValueError(f"Unknown downsampling method '{method}'")
+        points = min(points, MAX_POINTS)
+        rows = db.session.execute(query.order_by(model.date, model.id)).all()
+        # Lab types are separate series; each gets its own budget
+        groups = _group_by_test_type(rows) if model is LabResult else [rows]
+        items = []
+        for group in groups:
+            if method == 'lttb':
+                items += [_serialize(kind, row) for row in lttb(group, points, primary)]
+            else:
+                items += [_serialize_bucket(kind, bucket) for bucket in bucket_stats(group, points, fields)]
+        items.sort(key=lambda item: item['date'])
+        return {'items': items, 'next_cursor': None, 'downsampled': {'method': method, 'points': points, 'source_rows': len(rows)}}
+
+    limit = min(limit, MAX_PAGE_SIZE)
+    if cursor:
+        after_date, after_id = decode_cursor(cursor)
+        query = query.where(db.or_(model.date > after_date, db.and_(model.date == after_date, model.id > after_id)))
+    # One extra row tells whether another page exists
+    rows = db.session.execute(query.order_by(model.date, model.id).limit(limit + 1)).all()
+    next_cursor = encode_cursor(rows[limit - 1]) if len(rows) > limit else None
+    return {'items': [_serialize(kind, row) for row in rows[:limit]], 'next_cursor': next_cursor}
+
+def encode_cursor(row):
+    return base64.urlsafe_b64encode(f"{row.date.isoformat()}|{row.id}".encode()).decode()
+
+def decode_cursor(cursor):
+    try:
+        date, row_id = base64.urlsafe_b64decode(cursor.encode()).decode().split('|')
+        return datetime.fromisoformat(date), int(row_id)
+    except Exception:
+        raise ValueError("Invalid cursor")
+
+def parse_date_range(start, end):
+    """ISO date/datetime strings -> (start, end); a date-only end includes that whole day."""
+    def parse(value):
+        try:
+            return datetime.fromisoformat(value)
+        except (TypeError, ValueError):
+            raise ValueError(f"Invalid date '{value}', expected YYYY-MM-DD")
+
+    start_dt = parse(start) if start else None
+    end_dt = parse(end) if end else None
+    if end_dt is not None and len(end) == 10:
+        end_dt += timedelta(days=1)
+    return start_dt, end_dt
+
+def lttb(rows, threshold, field):
+    """
+    Largest-Triangle-Three-Buckets: picks `threshold` rows (x = date,
+    y = row.<field>) that best preserve the shape of the line. `field` may
+    be a tuple: y is then the first of those fields that has a value, so a
+    visit with only a heart rate still counts. Rows without any are skipped.
+    """
+    fields = field if isinstance(field, tuple) else (field,)
+    points = []
+    for row in rows:
+        y = next((getattr(row, f) for f in fields if getattr(row, f) is not None), None)
+        if y is not None:
+            points.append((row, float(y)))
+    rows = [row for row, _ in points]
+    if threshold >= len(rows):
+        return rows
+    threshold = max(threshold, 3) # first, last and at least one picked point
+
+    xs = [row.date.timestamp() for row in rows]
+    ys = [y for _, y in points]
+    selected = [rows[0]]
+    a = 0
+    every = (len(rows) - 2) / (threshold - 2)
+    for i in range(threshold - 2):
+        # Average of the next bucket is the third triangle point
+        next_start = int((i + 1) * every) + 1
+        next_end = min(int((i + 2) * every) + 1, len(rows))
+        avg_x = sum(xs[next_start:next_end]) / (next_end - next_start)
+        avg_y = sum(ys[next_start:next_end]) / (next_end - next_start)
+
+        start = int(i * every) + 1
+        end = int((i + 1) * every) + 1
+        best, best_area = start, -1.0
+        for j in range(start, end):
+            area = abs((xs[a] - avg_x) * (ys[j] - ys[a]) - (xs[a] - xs[j]) * (avg_y - ys[a]))
+            if area > best_area:
+                best, best_area = j, area
+        selected.append(rows[best])
+        a = best
+    selected.append(rows[-1])
+    return selected
+
+def bucket_stats(rows, buckets, fields):
+    """Splits the date span into `buckets` equal intervals; min/max/mean of each field per non-empty one."""
+    if not rows:
+        return []
+    first, last = rows[0].date, rows[-1].date
+    width = (last - first) / buckets or timedelta(seconds=1)
+
+    grouped = {}
+    for row in rows:
+        index = min(int((row.date - first) / width), buckets - 1)
+        grouped.setdefault(index, []).append(row)
+
+    result = []
+    for index in sorted(grouped):
+        group = grouped[index]
+        stats = {'date': first + width * index, 'count': len(group), 'sample': group[-1]}
+        for field in fields:
+            values = [getattr(row, field) for row in group if getattr(row, field) is not None]
+            stats[field] = (min(values), max(values), sum(values) / len(values)) if values else None
+        result.append(stats)
+    return result
+
+def _group_by_test_type(rows):
+    groups = {}
+    for row in rows:
+        groups.setdefault(row.test_type, []).append(row)
+    return list(groups.values())
+
+def _serialize(kind, row):
+    if kind == 'vitals':
+        return {
+            'date': row.date.isoformat(),
+            'systolic_bp': row.systolic_bp,
+            'diastolic_bp': row.diastolic_bp,
+            'heart_rate': row.heart_rate,
+            'temperature': row.temperature
+        }
+    return {
+        'date': row.date.isoformat(),
+        'test_type': row.test_type,
+        'value': row.result_value,
+        'unit': row.unit,
+        'flag': row.flag
+    }
+
+def _serialize_bucket(kind, bucket):
+    item = {'date': bucket['date'].isoformat(), 'count': bucket['count']}
+    if kind == 'labs':
+        sample = bucket['sample']
+        item.update(test_type=sample.test_type, unit=sample.unit)
+        bucket = {**bucket, 'value': bucket['result_value']}
+        fields = ('value',)
+    else:
+        fields = VITAL_FIELDS
+    for field in fields:
+        stats = bucket[field]
+        item[field] = round(stats[2], 2) if stats else None
+        item[f'{field}_min'] = stats[0] if stats else None
+        item[f'{field}_max'] = stats[1] if stats else None
+    return item
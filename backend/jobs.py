@@ -0,0 +1,157 @@
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from sqlalchemy import update
+from backend.db import db, IngestionJob
+
+ACTIVE_STATUSES = ("queued", "running")
+
+class IngestionJobQueue:
+    """
+    Runs process_file on a bounded local thread pool.
+
+    Job rows are persisted in SQLite so queued or interrupted jobs are picked
+    up again when the app restarts. Live progress is kept in memory and only
+    written back when the job finishes, because the ingesting session holds
+    SQLite's write lock for the duration of the parse.
+    """
+    def __init__(self, app=None):
+        self.app = None
+        self.executor = None
+        self._live = {} # job_id -> IngestProgress
+        self._lock = threading.Lock()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.app = app
+        self.executor = ThreadPoolExecutor(
+            max_workers=app.config.get('INGEST_WORKERS', 2),
+            thread_name_prefix="ingest"
+        )
+        app.extensions['ingestion_jobs'] = self
+        # Spawned parser processes (batch ingest, long PDFs) re-import the main module and
+        # so may build an app too; only the main process may pick up jobs
+        if multiprocessing.current_process().name != "MainProcess":
+            return
+        if app.config.get('INGEST_RESUME_ON_START', True):
+            with app.app_context():
+                self._resume_pending()
+
+    def submit(self, filepath, filename=None):
+        job = IngestionJob(
+            filepath=filepath,
+            filename=filename or os.path.basename(filepath),
+            status="queued",
+            progress=0
+        )
+        db.session.add(job)
+        db.session.commit()
+        self.executor.submit(self._run, job.id)
+        return job
+
+    def get(self, job_id):
+        job = db.session.get(IngestionJob, job_id)
+        if job is None:
+            return None
+        data = job.to_dict()
+        with self._lock:
+            live = self._live.get(job_id)
+        if live is not None:
+            data['progress'] = live.done
+        return data
+
+    def shutdown(self, wait=True):
+        self.executor.shutdown(wait=wait)
+
+    def _resume_pending(self):
+        # Anything still "running" was interrupted by a restart and is re-run from
+        # scratch. Batch jobs commit every few files, so part of it may already be
+        # stored; that's safe because rows are written against their natural keys
+        # (ON CONFLICT DO NOTHING, vitals merged per visit) and files already in
+        # the IngestedFile ledger are skipped.
+        db.session.execute(
+            update(IngestionJob)
+            .where(IngestionJob.status == "running")
+            .values(status="queued", progress=0, started_at=None)
+        )
+        db.session.commit()
+        job_ids = [job_id for (job_id,) in db.session.query(IngestionJob.id)
+                   .filter(IngestionJob.status == "queued").order_by(IngestionJob.id)]
+        for job_id in job_ids:
+            self.executor.submit(self._run, job_id)
+        if job_ids:
+            print(f"Resuming {len(job_ids)} ingestion job(s)")
+
+    def _claim(self, job_id):
+        # Conditional update so a job is only ever started by one worker
+        result = db.session.execute(
+            update(IngestionJob)
+            .where(IngestionJob.id == job_id, IngestionJob.status == "queued")
+            .values(status="running", started_at=datetime.utcnow())
+        )
+        db.session.commit()
+        return result.rowcount == 1
+
+    def _rebuild_snapshots(self, job_id, patient_ids):
+        # Warm the analysis snapshots of the patients this job touched so the
+        # next dashboard load is a plain lookup. Runs after the job's status is
+        # committed; a failure only means the rebuild happens lazily on read
+        # instead, and is noted on the job.
+        from backend.snapshots import rebuild_dirty
+        try:
+            rebuild_dirty(patient_ids=patient_ids)
+        except Exception as e:
+            db.session.rollback()
+            print(f"Snapshot rebuild failed for job {job_id}: {e}")
+            job = db.session.get(IngestionJob, job_id)
+            job.warning = "; ".join(filter(None, [job.warning, f"Snapshot rebuild failed: {e}"]))
+            db.session.commit()
+
+    def _run(self, job_id):
+        from backend.ingestion import IngestProgress, process_file
+
+        with self.app.app_context():
+            if not self._claim(job_id):
+                return
+            filepath = db.session.get(IngestionJob, job_id).filepath
+
+            progress = IngestProgress()
+            with self._lock:
+                self._live[job_id] = progress
+            try:
+                success = process_file(filepath, progress=progress)
+            except Exception as e:
+                db.session.rollback()
+                success = False
+                progress.error = str(e)
+
+            job = db.session.get(IngestionJob, job_id)
+            if progress.duplicate:
+                job.status = "duplicate"
+            else:
+                job.status = "succeeded" if success else "failed"
+            job.progress = progress.done
+            job.error = None if success else (progress.error or "Ingestion failed")
+            job.warning = progress.warning if success else None
+            job.finished_at = datetime.utcnow()
+            db.session.commit()
+            with self._lock:
+                self._live.pop(job_id, None)
+            # A failed batch may still have stored some of its files
+            if progress.patient_ids:
+                self._rebuild_snapshots(job_id, progress.patient_ids)
+            self._dump_profile(job_id, progress)
+
+    def _dump_profile(self, job_id, progress):
+        profile_dir = self.app.config.get('INGEST_PROFILE_DIR')
+        if not profile_dir or progress.profile is None:
+            return
+        try:
+            progress.profile.dump(os.path.join(profile_dir, f"job-{job_id}.json"))
+        except OSError as e:
+            print(f"Could not write ingestion profile for job {job_id}: {e}")
+
+job_queue = IngestionJobQueue()
@@ -0,0 +1,198 @@
+"""
+Ingestion instrumentation: counters and per-stage timings.
+
+Parsers wrap their stages in `stage("parse")` and bump counters with
+`count("rows_parsed", n)`. Everything is added to one process-wide
+registry, served in the Prometheus text format at GET /metrics. While a
+file is ingested under `profile()`, the same numbers also go into that
+file's IngestProfile, which the job queue dumps as JSON when
+INGEST_PROFILE_DIR is set.
+
+A stage's time excludes stages nested inside it (patients resolved while
+storing a record count as resolve_patients, not flush), so the stages of
+a file add up to the time spent in them.
+
+Stages used by backend/ingestion.py:
+    fingerprint       hashing the file for the duplicate ledger
+    parse             reading + parsing rows / pages / headers
+    resolve_patients  patient lookups and inserts
+    flush             bulk INSERT/UPDATE statements
+    commit            db.session.commit()
+"""
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+# Upper bounds (seconds) of the stage duration histogram buckets
+STAGE_BUCKETS = (0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1, 5, 10, 30, 60, 300)
+
+COUNTERS = {
+    "files": "Files ingested, by outcome",
+    "rows_parsed": "CSV rows, VCF variants and records parsed",
+    "rows_skipped": "Parsed rows not stored, by reason (invalid, invalid_date or duplicate)",
+    "patients_created": "Patients created by ingestion",
+    "bytes_read": "Bytes read from uploaded files",
+    "pdf_pages": "PDF pages extracted, by whether they had a text layer",
+}
+PREFIX = "ingest_"
+
+_local = threading.local()
+
+class MetricsRegistry:
+    """Thread-safe counters and stage histograms, keyed by metric name and labels."""
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.counters = {} # (name, labels) -> value
+            self.stages = {} # labels -> [bucket counts..., +Inf count, sum]
+
+    def inc(self, name, value=1, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self.counters[key] = self.counters.get(key, 0) + value
+
+    def observe(self, seconds, **labels):
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            series = self.stages.setdefault(key, [0] * (len(STAGE_BUCKETS) + 2))
+            for i, bound in enumerate(STAGE_BUCKETS):
+                if seconds <= bound:
+                    series[i] += 1
+            series[-2] += 1
+            series[-1] += seconds
+
+    def render(self):
+        """Prometheus text exposition format."""
+        with self._lock:
+            counters = dict(self.counters)
+            stages = {key: list(series) for key, series in self.stages.items()}
+
+        lines = []
+        for name, help_text in COUNTERS.items():
+            metric = f"{PREFIX}{name}_total"
+            lines += [f"# HELP {metric} {help_text}", f"# TYPE {metric} counter"]
+            for (counter, labels), value in sorted(counters.items()):
+                if counter == name:
+                    lines.append(f"{metric}{_labels(labels)} {value}")
+
+        metric = f"{PREFIX}stage_seconds"
+        lines += [f"# HELP {metric} Time spent per ingestion stage", f"# TYPE {metric} histogram"]
+        for labels, series in sorted(stages.items()):
+            for bound, bucket in zip(STAGE_BUCKETS, series):
+                lines.append(f"{metric}_bucket{_labels(labels + (('le', str(bound)),))} {bucket}")
+            lines.append(f"{metric}_bucket{_labels(labels + (('le', '+Inf'),))} {series[-2]}")
+            lines.append(f"{metric}_sum{_labels(labels)} {series[-1]:.6f}")
+            lines.append(f"{metric}_count{_labels(labels)} {series[-2]}")
+        return "\n".join(lines) + "\n"
+
+class IngestProfile:
+    """Stage timings and counters for one ingested file."""
+    def __init__(self, filepath, file_format):
+        self.filepath = filepath
+        self.format = file_format
+        self.started_at = time.time()
+        self.seconds = None
+        self.stages = {} # stage -> {"seconds", "calls"}
+        self.counters = {} # "name" or "name:label" -> value
+
+    def to_dict(self):
+        return {
+            "file": self.filepath,
+            "format": self.format,
+            "seconds": self.seconds,
+            "stages": {name: {"seconds": round(s["seconds"], 6), "calls": s["calls"]} for name, s in self.stages.items()},
+            "counters": dict(self.counters)
+        }
+
+    def dump(self, path):
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with open(path, "w") as f:
+            json.dump(self.to_dict(), f, indent=2)
+
+registry = MetricsRegistry()
+
+@contextmanager
+def profile(filepath, file_format):
+    """Collects the stages and counters of one file into an IngestProfile."""
+    previous = getattr(_local, "profile", None)
+    current = IngestProfile(filepath, file_format)
+    _local.profile = current
+    start = time.perf_counter()
+    try:
+        yield current
+    finally:
+        current.seconds = round(time.perf_counter() - start, 6)
+        _local.profile = previous
+
+def current_format():
+    current = getattr(_local, "profile", None)
+    return current.format if current is not None else "unknown"
+
+def count(name, value=1, **labels):
+    """Adds to a counter; the file format label comes from the active profile."""
+    if not value:
+        return
+    registry.inc(name, value, format=current_format(), **labels)
+    current = getattr(_local, "profile", None)
+    if current is not None:
+        key = ":".join([name, *labels.values()])
+        current.counters[key] = current.counters.get(key, 0) + value
+
+def record_stage(name, seconds):
+    registry.observe(seconds, stage=name, format=current_format())
+    current = getattr(_local, "profile", None)
+    if current is not None:
+        totals = current.stages.setdefault(name, {"seconds": 0.0, "calls": 0})
+        totals["seconds"] += seconds
+        totals["calls"] += 1
+
+@contextmanager
+def stage(name):
+    nested = _stage_stack()
+    nested.append(0.0) # seconds spent in stages inside this one
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        _end_stage(name, time.perf_counter() - start, nested.pop())
+
+def timed(iterable, name):
+    """Yields from `iterable`, recording the time spent producing each item as stage `name`."""
+    iterator = iter(iterable)
+    nested = _stage_stack()
+    while True:
+        nested.append(0.0)
+        start = time.perf_counter()
+        try:
+            item = next(iterator)
+        except StopIteration:
+            return
+        finally:
+            _end_stage(name, time.perf_counter() - start, nested.pop())
+        yield item
+
+def _stage_stack():
+    stack = getattr(_local, "stages", None)
+    if stack is None:
+        stack = _local.stages = []
+    return stack
+
+def _end_stage(name, seconds, nested_seconds):
+    # Counted once: as this stage, and taken out of the one it's nested in
+    stack = _stage_stack()
+    if stack:
+        stack[-1] += seconds
+    record_stage(name, seconds - nested_seconds)
+
+def _labels(labels):
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{key}="{_escape(value)}"' for key, value in labels) + "}"
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
@@ -0,0 +1,61 @@
+from backend import columnar
+from backend.db import db, Patient, MedicalRecord, LabResult, GenomicData, DoctorNote
+
+class PatientData:
+    """
+    In-memory view of one patient's clinical data, sorted oldest first.
+
+    Built by load_patient_data with a fixed number of queries (one for the
+    patient plus one per table), so analysis code never triggers lazy
+    relationship loads or needs to re-sort. Vitals, labs and notes are
+    read-only column rows rather than ORM entities, which is where most of
+    the load time went on long histories; they support the same attribute
+    access (record.date, lab.result_value, ...).
+    """
+    def __init__(self, patient, medical_records, lab_results, genomic_data, doctor_notes):
+        self.patient = patient
+        self.medical_records = medical_records
+        self.lab_results = lab_results
+        self.genomic_data = genomic_data
+        self.doctor_notes = doctor_notes
+
+def load_patient_data(patient_id):
+    """
+    Returns a PatientData for patient_id, or None if the patient doesn't exist.
+    With COLUMNAR_STORE on, vitals and labs are memory-mapped SeriesTables
+    from backend/columnar.py instead of SQL rows.
+    """
+    patient = db.session.get(Patient, patient_id)
+    if not patient:
+        return None
+
+    if columnar.enabled():
+        series = columnar.load_series(patient_id)
+        medical_records, lab_results = series['vitals'], series['labs']
+    else:
+        medical_records, lab_results = _by_date(MedicalRecord, patient_id), _by_date(LabResult, patient_id)
+
+    return PatientData(
+        patient=patient,
+        medical_records=medical_records,
+        lab_results=lab_results,
+        genomic_data=GenomicData.query.filter_by(patient_id=patient_id).order_by(GenomicData.id).all(),
+        doctor_notes=_by_date(DoctorNote, patient_id)
+    )
+
+def _by_date(model, patient_id):
+    # id breaks ties so equal dates keep insertion order
+    columns = [column for column in model.__table__.columns if column.name != 'patient_id']
+    return db.session.execute(
+        db.select(*columns).where(model.patient_id == patient_id).order_by(model.date, model.id)
+    ).all()
+
+def last_matching(rows, n, predicate):
+    """The last n rows (oldest first) for which predicate(row) is true, scanning back from the newest."""
+    found = []
+    for row in reversed(rows):
+        if predicate(row):
+            found.append(row)
+            if len(found) == n:
+                break
+    return found[::-1]
@@ -0,0 +1,164 @@
+"""
+PDF text extraction for ingestion.
+
+Pages are extracted in order and streamed into zlib-compressed,
+page-aligned chunks of about TEXT_CHUNK_CHARS characters, so the whole
+document is kept (NoteTextChunk rows) without building one big string.
+Only the first lines, used for the note preview and patient-name
+detection, are kept as text. Callers that only need those can pass
+max_pages, and nothing past that page is read.
+
+Long PDFs are split into page ranges extracted by a process pool; the
+ranges are consumed in page order, so chunking still streams. Pages
+without a text layer (scans: only image XObjects, no fonts) are detected
+from their resources and skipped, instead of running layout extraction
+on them.
+
+This module only imports pypdf, so spawned workers start quickly.
+"""
+import hashlib
+import multiprocessing
+import zlib
+from concurrent.futures import ProcessPoolExecutor
+
+import pypdf
+
+# Characters of extracted text per compressed chunk (chunks end on a page boundary)
+TEXT_CHUNK_CHARS = 64 * 1024
+# Characters kept uncompressed as the note's preview
+PREVIEW_CHARS = 5000
+# Lines searched for the patient name
+HEAD_LINES = 20
+# PDFs shorter than this are extracted in-process: a worker costs more than it saves
+PARALLEL_MIN_PAGES = 32
+PAGES_PER_TASK = 8
+
+class PdfText:
+    """Result of extract_pdf."""
+    def __init__(self):
+        self.page_count = 0
+        self.textless_pages = 0
+        self.chars = 0
+        self.head = "" # start of the text, up to PREVIEW_CHARS past any leading whitespace
+        self.chunks = [] # {"chunk_index", "page_start", "page_end", "data"}
+        self.sha256 = None # of the full text, None if there was none
+
+    @property
+    def head_lines(self):
+        return self.head.strip().split('\n')[:HEAD_LINES]
+
+    @property
+    def preview(self):
+        return self.head.strip()[:PREVIEW_CHARS]
+
+def extract_pdf(filepath, workers=1, on_page=None, max_pages=None):
+    """
+    Extracts and chunks the text of a PDF. `on_page(pages_done)` is called
+    as pages finish. With `max_pages`, only the first pages are extracted
+    (chunks and sha256 then cover just those).
+    """
+    result = PdfText()
+    digest = hashlib.sha256()
+    pending = [] # page texts of the chunk being built
+    pending_chars = 0
+    chunk_start = 0
+
+    def flush(page_end):
+        text = "".join(pending)
+        result.chunks.append({
+            "chunk_index": len(result.chunks),
+            "page_start": chunk_start,
+            "page_end": page_end,
+            "data": zlib.compress(text.encode("utf-8"))
+        })
+
+    for index, text, has_text_layer in iter_pages(filepath, workers, max_pages):
+        result.page_count += 1
+        if not has_text_layer:
+            result.textless_pages += 1
+        if text:
+            text += "\n"
+            digest.update(text.encode("utf-8"))
+            result.chars += len(text)
+            if len(result.head.lstrip()) < PREVIEW_CHARS:
+                result.head += text
+            pending.append(text)
+            pending_chars += len(text)
+        if pending_chars >= TEXT_CHUNK_CHARS:
+            flush(index)
+            pending, pending_chars, chunk_start = [], 0, index + 1
+        if on_page is not None:
+            on_page(result.page_count)
+
+    if pending:
+        flush(result.page_count - 1)
+    if result.head.strip():
+        result.sha256 = digest.hexdigest()
+    return result
+
+def decompress_chunks(chunks):
+    """Full text from stored chunks (objects or dicts with a "data" attribute/key), in chunk order."""
+    data = [chunk["data"] if isinstance(chunk, dict) else chunk.data for chunk in chunks]
+    return "".join(zlib.decompress(d).decode("utf-8") for d in data)
+
+def iter_pages(filepath, workers=1, max_pages=None):
+    """Yields (page index, text, has text layer) in page order, for up to `max_pages` pages."""
+    reader = pypdf.PdfReader(filepath)
+    page_count = len(reader.pages)
+    if max_pages is not None:
+        page_count = min(page_count, max_pages)
+    if workers <= 1 or page_count < PARALLEL_MIN_PAGES:
+        for index in range(page_count):
+            yield (index, *extract_page(reader.pages[index]))
+        return
+
+    ranges = [(start, min(start + PAGES_PER_TASK, page_count)) for start in range(0, page_count, PAGES_PER_TASK)]
+    # spawn: the app process has threads (job queue, SQLAlchemy pool) that fork can't copy safely
+    executor = ProcessPoolExecutor(max_workers=min(workers, len(ranges)),
+                                   mp_context=multiprocessing.get_context("spawn"))
+    try:
+        # All ranges are queued up front and read back in order, so pages stream in sequence
+        futures = [executor.submit(_extract_range, filepath, start, stop) for start, stop in ranges]
+        for future in futures:
+            yield from future.result()
+    finally:
+        executor.shutdown(wait=True, cancel_futures=True)
+
+def extract_page(page):
+    """(text, has text layer) for one page; layout mode, falling back to plain extraction."""
+    if not has_text_layer(page):
+        return "", False
+    try:
+        text = page.extract_text(extraction_mode="layout")
+    except Exception:
+        text = page.extract_text()
+    return text or "", True
+
+def has_text_layer(page):
+    """
+    Cheap check from the page's resources: text needs a font, either on the
+    page or inside a form XObject. A page with only image XObjects is a scan.
+    """
+    try:
+        resources = page.get("/Resources")
+        if resources is None:
+            return True
+        resources = resources.get_object()
+        if resources.get("/Font"):
+            return True
+        xobjects = resources.get("/XObject")
+        if not xobjects:
+            return False
+        xobjects = xobjects.get_object()
+        return any(xobjects[name].get_object().get("/Subtype") == "/Form" for name in xobjects)
+    except Exception:
+        return True # unusual structure: let the extractor decide
+
+# Readers opened by this worker process, one per PDF it's been given ranges of
+_readers = {}
+
+def _extract_range(filepath, start, stop):
+    reader = _readers.get(filepath)
+    if reader is None:
+        reader = _readers[filepath] = pypdf.PdfReader(filepath)
+    return [(index, *extract_page(reader.pages[index])) for index in range(start, stop)]
@@ -0,0 +1,145 @@
+"""
+Population-level risk scoring.
+
+Applies the same diabetes, hypertension and cancer rules as
+HealthAnalyzer.predict_risks, but to every patient at once: the latest A1C,
+latest systolic BP and first pathogenic variant per patient are pulled into
+columnar pandas frames and the thresholds are evaluated as NumPy masks.
+Results replace the contents of the PatientRisk table, which the analysis
+endpoint serves as `population_risks` (see patient_risks).
+
+Usage (from the repo root):
+    python -m backend.risk_batch
+"""
+import time
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+from sqlalchemy import func, insert
+
+from backend.db import db, MedicalRecord, LabResult, GenomicData, PatientRisk
+
+RISK_COLUMNS = ["patient_id", "rule", "condition", "probability", "reason", "severity"]
+
+def score_population():
+    """Returns a DataFrame of predictions (RISK_COLUMNS), ordered as predict_risks orders them."""
+    risks = _concat([_diabetes_risks(), _hypertension_risks(), _cancer_risks()])
+    return risks.sort_values(["patient_id", "rule"], kind="stable").reset_index(drop=True)
+
+def run_batch():
+    """Rescores every patient and rewrites the PatientRisk table. Returns the number of rows written."""
+    risks = score_population()
+    computed_at = datetime.utcnow()
+    rows = [
+        {**row, "computed_at": computed_at}
+        for row in risks.drop(columns="rule").to_dict("records")
+    ]
+
+    db.session.query(PatientRisk).delete()
+    if rows:
+        db.session.execute(insert(PatientRisk), rows)
+    db.session.commit()
+    return len(rows)
+
+def patient_risks(patient_id):
+    """The patient's rows from the last batch run, as PatientRisk.to_dict()s."""
+    rows = PatientRisk.query.filter_by(patient_id=patient_id).order_by(PatientRisk.id)
+    return [row.to_dict() for row in rows]
+
+def predictions_by_patient(risks):
+    """{patient_id: [prediction dicts]} in predict_risks' output format."""
+    grouped = {}
+    for row in risks.drop(columns="rule").to_dict("records"):
+        patient_id = row.pop("patient_id")
+        grouped.setdefault(patient_id, []).append(row)
+    return grouped
+
+def _latest(model, value_column, *criteria):
+    # Latest row per patient, picked in SQL so only one row per patient is
+    # loaded; (date, id) ordering matches load_patient_data, and the window
+    # walks the (patient_id, date) index
+    ranked = db.select(
+        model.patient_id, model.date, model.id, value_column.label("value"),
+        func.row_number().over(partition_by=model.patient_id, order_by=(model.date.desc(), model.id.desc())).label("rank")
+    ).where(*criteria).subquery()
+    rows = db.session.execute(
+        db.select(ranked.c.patient_id, ranked.c.date, ranked.c.id, ranked.c.value)
+        .where(ranked.c.rank == 1).order_by(ranked.c.patient_id)
+    ).all()
+    return pd.DataFrame.from_records(rows, columns=["patient_id", "date", "id", "value"])
+
+def _diabetes_risks():
+    # instr() is case-sensitive like the `"A1C" in test_type` check; LIKE is not
+    latest = _latest(LabResult, LabResult.result_value, func.instr(LabResult.test_type, "A1C") > 0)
+    if latest.empty:
+        return pd.DataFrame(columns=RISK_COLUMNS)
+
+    a1c = latest["value"].to_numpy(dtype=float)
+    very_high = a1c > 6.4
+    medium = (a1c > 5.7) & ~very_high
+
+    return _concat([
+        _frame(latest.loc[very_high], 0, "Diabetes", "Very High", "High",
+               lambda v: f"Latest A1C is {v}% (Diabetic range)"),
+        _frame(latest.loc[medium], 0, "Diabetes", "Medium", "Medium",
+               lambda v: f"Latest A1C is {v}% (Pre-diabetic)"),
+    ])
+
+def _hypertension_risks():
+    latest = _latest(MedicalRecord, MedicalRecord.systolic_bp, MedicalRecord.systolic_bp.isnot(None))
+    if latest.empty:
+        return pd.DataFrame(columns=RISK_COLUMNS)
+
+    high = latest["value"].to_numpy(dtype=np.int64) > 140
+    return _frame(latest.loc[high], 1, "Hypertension", "High", "Medium",
+                  lambda v: f"Systolic BP is consistent > 140 ({int(v)})")
+
+def _cancer_risks():
+    rows = db.session.execute(
+        db.select(GenomicData.patient_id, GenomicData.id, GenomicData.gene_marker, GenomicData.risk_association)
+        .where(GenomicData.significance == "Pathogenic")
+    ).all()
+    frame = pd.DataFrame.from_records(rows, columns=["patient_id", "id", "gene_marker", "risk_association"])
+    if frame.empty:
+        return pd.DataFrame(columns=RISK_COLUMNS)
+
+    # First pathogenic variant per patient
+    first = frame.sort_values(["patient_id", "id"], kind="stable").drop_duplicates("patient_id", keep="first")
+    reasons = [
+        f"Pathogenic variant found in {marker}: {risk}"
+        for marker, risk in zip(first["gene_marker"].tolist(), first["risk_association"].tolist())
+    ]
+    return pd.DataFrame({
+        "patient_id": first["patient_id"].to_numpy(),
+        "rule": 2,
+        "condition": "Unit Specific Cancer",
+        "probability": "High",
+        "reason": reasons,
+        "severity": "Critical",
+    }, columns=RISK_COLUMNS)
+
+def _concat(frames):
+    frames = [f for f in frames if not f.empty]
+    if not frames:
+        return pd.DataFrame(columns=RISK_COLUMNS)
+    return pd.concat(frames, ignore_index=True)
+
+def _frame(latest, rule, condition, probability, severity, reason):
+    # Only the flagged patients get a formatted reason string
+    return pd.DataFrame({
+        "patient_id": latest["patient_id"].to_numpy(),
+        "rule": rule,
+        "condition": condition,
+        "probability": probability,
+        "reason": [reason(v) for v in latest["value"].tolist()],
+        "severity": severity,
+    }, columns=RISK_COLUMNS)
+
+if __name__ == "__main__":
+    from backend.app import app
+
+    with app.app_context():
+        start = time.perf_counter()
+        written = run_batch()
+        print(f"Scored population in {time.perf_counter() - start:.2f}s ({written} risk rows)")
@@ -0,0 +1,186 @@
+"""
+Patient name search backed by SQLite FTS5.
+
+Two external-content FTS5 indexes mirror patient.name and are kept in sync
+by triggers, so every insert path (ORM, bulk CSV ingest, raw SQL) updates
+them:
+  - patient_fts (unicode61 words, prefix-indexed) answers prefix queries
+    like "jan ro" -> "Jane Roe", ranked by bm25;
+  - patient_trigram (trigram tokens) supplies typo-tolerant candidates
+    like "jhon smiht" -> "John Smith", re-ranked by edit similarity.
+On SQLite builds without FTS5 trigram support, search falls back to ILIKE.
+"""
+import re
+import sqlite3
+from sqlalchemy import event
+from backend.db import db, Patient
+
+# Prefix matches scored by bm25 (beyond this, later ids are left unranked)
+PREFIX_CANDIDATES = 1000
+# Fuzzy candidates fetched from the trigram index before re-ranking
+FUZZY_CANDIDATES = 200
+# Minimum name_similarity() for a fuzzy match
+FUZZY_THRESHOLD = 0.7
+
+SEARCH_TABLES = ("patient_fts", "patient_trigram")
+
+SEARCH_DDL = [
+    "CREATE VIRTUAL TABLE IF NOT EXISTS patient_fts USING fts5("
+    "name, content='patient', content_rowid='id', tokenize='unicode61 remove_diacritics 2', prefix='1 2 3')",
+    "CREATE VIRTUAL TABLE IF NOT EXISTS patient_trigram USING fts5("
+    "name, content='patient', content_rowid='id', tokenize='trigram')",
+    """CREATE TRIGGER IF NOT EXISTS patient_search_ai AFTER INSERT ON patient BEGIN
+        INSERT INTO patient_fts(rowid, name) VALUES (new.id, new.name);
+        INSERT INTO patient_trigram(rowid, name) VALUES (new.id, new.name);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS patient_search_ad AFTER DELETE ON patient BEGIN
+        INSERT INTO patient_fts(patient_fts, rowid, name) VALUES ('delete', old.id, old.name);
+        INSERT INTO patient_trigram(patient_trigram, rowid, name) VALUES ('delete', old.id, old.name);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS patient_search_au AFTER UPDATE OF name ON patient BEGIN
+        INSERT INTO patient_fts(patient_fts, rowid, name) VALUES ('delete', old.id, old.name);
+        INSERT INTO patient_trigram(patient_trigram, rowid, name) VALUES ('delete', old.id, old.name);
+        INSERT INTO patient_fts(rowid, name) VALUES (new.id, new.name);
+        INSERT INTO patient_trigram(rowid, name) VALUES (new.id, new.name);
+    END""",
+]
+
+def fts_available(connection):
+    if connection.dialect.name != 'sqlite' or sqlite3.sqlite_version_info < (3, 34, 0):
+        return False
+    options = {row[0] for row in connection.exec_driver_sql("PRAGMA compile_options")}
+    return "ENABLE_FTS5" in options
+
+@event.listens_for(Patient.__table__, "after_create")
+def _create_search_index(target, connection, **kw):
+    if fts_available(connection):
+        for statement in SEARCH_DDL:
+            connection.exec_driver_sql(statement)
+
+@event.listens_for(Patient.__table__, "before_drop")
+def _drop_search_index(target, connection, **kw):
+    if connection.dialect.name == 'sqlite':
+        for table in SEARCH_TABLES:
+            connection.exec_driver_sql(f"DROP TABLE IF EXISTS {table}")
+
+def ensure_search_index():
+    """Creates and back-fills the indexes on a health.db that predates them."""
+    with db.engine.begin() as conn:
+        if not fts_available(conn):
+            return False
+        exists = conn.exec_driver_sql(
+            "SELECT count(*) FROM sqlite_master WHERE name IN ('patient_fts', 'patient_trigram', 'patient_search_ai')"
+        ).scalar()
+        if exists < 3:
+            for statement in SEARCH_DDL:
+                conn.exec_driver_sql(statement)
+            for table in SEARCH_TABLES:
+                conn.exec_driver_sql(f"INSERT INTO {table}({table}) VALUES ('rebuild')")
+    return True
+
+def search_patients(query, limit=10, offset=0):
+    """
+    Ranked patients whose name matches `query`: word-prefix matches first
+    (bm25 order), then typo-tolerant matches by edit similarity.
+    """
+    tokens = re.findall(r"\w+", query.lower())
+    if not tokens:
+        return []
+    if not _index_ready():
+        return Patient.query.filter(Patient.name.ilike(f'%{query}%')) \
+            .order_by(Patient.name).offset(offset).limit(limit).all()
+
+    wanted = offset + limit
+    ranked = _prefix_matches(tokens, wanted)
+    if len(ranked) < wanted:
+        # Only pay for fuzzy matching when prefix matches don't fill the page
+        seen = set(ranked)
+        ranked += [pid for pid in _fuzzy_matches(tokens) if pid not in seen]
+
+    page = ranked[offset:offset + limit]
+    patients = {p.id: p for p in Patient.query.filter(Patient.id.in_(page))} if page else {}
+    return [patients[pid] for pid in page if pid in patients]
+
+def _index_ready():
+    return db.session.execute(db.text(
+        "SELECT count(*) FROM sqlite_master WHERE name = 'patient_fts'"
+    )).scalar() > 0 if db.engine.dialect.name == 'sqlite' else False
+
+def _prefix_matches(tokens, limit):
+    # ORDER BY rank scores every match, which is ~100ms for a one-letter
+    # prefix at 1M patients; scoring only the first candidates keeps it flat
+    match = " AND ".join(f'"{_escape(token)}"*' for token in tokens)
+    rows = db.session.execute(
+        db.text("SELECT rowid, rank FROM patient_fts WHERE patient_fts MATCH :match LIMIT :limit"),
+        {"match": match, "limit": max(limit, PREFIX_CANDIDATES)}
+    ).all()
+    rows.sort(key=lambda row: (row[1], row[0]))
+    return [rowid for rowid, _ in rows[:limit]]
+
+def _fuzzy_matches(tokens):
+    # Every token must share a trigram with the name (AND of per-token ORs)
+    groups = []
+    for token in tokens:
+        grams = set()
+        for variant in _transpositions(token):
+            grams.update(variant[i:i + 3] for i in range(len(variant) - 2))
+        if grams:
+            groups.append("(" + " OR ".join(f'"{_escape(g)}"' for g in sorted(grams)) + ")")
+    if not groups:
+        return []
+    match = " AND ".join(groups)
+    rows = db.session.execute(
+        db.text("SELECT rowid, name FROM patient_trigram WHERE patient_trigram MATCH :match ORDER BY rank LIMIT :limit"),
+        {"match": match, "limit": FUZZY_CANDIDATES}
+    )
+    scored = []
+    for rowid, name in rows:
+        score = name_similarity(tokens, name)
+        if score >= FUZZY_THRESHOLD:
+            scored.append((score, rowid))
+    scored.sort(key=lambda item: (-item[0], item[1]))
+    return [rowid for _, rowid in scored]
+
+def name_similarity(tokens, name):
+    """Mean, over query tokens, of the best edit similarity to any word of name (prefixes count as exact)."""
+    words = re.findall(r"\w+", name.lower())
+    if not words:
+        return 0.0
+    total = 0.0
+    for token in tokens:
+        best = 0.0
+        for word in words:
+            if word.startswith(token):
+                best = 1.0
+                break
+            # Compare against the whole word and prefixes near the token's length
+            targets = {word} | {word[:n] for n in (len(token) - 1, len(token), len(token) + 1) if 0 < n < len(word)}
+            for target in targets:
+                distance = _edit_distance(token, target)
+                best = max(best, 1 - distance / max(len(token), len(target)))
+        total += best
+    return total / len(tokens)
+
+def _transpositions(token):
+    # Swapped neighbours are the commonest typo and share no trigram with
+    # the intended word ("jhon" vs "john"), so their trigrams are searched too
+    variants = {token}
+    for i in range(len(token) - 1):
+        variants.add(token[:i] + token[i + 1] + token[i] + token[i + 2:])
+    return variants
+
+def _edit_distance(a, b):
+    """Optimal string alignment distance (Levenshtein plus adjacent transpositions)."""
+    prev2, prev = None, list(range(len(b) + 1))
+    for i in range(1, len(a) + 1):
+        row = [i] + [0] * len(b)
+        for j in range(1, len(b) + 1):
+            cost = 0 if a[i - 1] == b[j - 1] else 1
+            row[j] = min(prev[j] + 1, row[j - 1] + 1, prev[j - 1] + cost)
+            if i > 1 and j > 1 and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]:
+                row[j] = min(row[j], prev2[j - 2] + 1)
+        prev2, prev = prev, row
+    return prev[-1]
+
+def _escape(token):
+    return token.replace('"', '""')
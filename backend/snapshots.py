@@ -0,0 +1,88 @@
+from datetime import datetime
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from backend.db import db, AnalysisSnapshot
+
+# Bump when the shape of the analysis payload changes; older snapshots are rebuilt on read
+PAYLOAD_FORMAT = 2
+
+def mark_dirty(patient_ids):
+    """
+    Invalidates the analysis snapshot of each patient. Runs in the caller's
+    session, so the invalidation commits together with the ingested rows.
+    Returns the patient ids.
+    """
+    patient_ids = sorted({pid for pid in patient_ids if pid is not None})
+    if not patient_ids:
+        return patient_ids
+    stmt = sqlite_insert(AnalysisSnapshot).values([
+        {"patient_id": pid, "version": 1, "built_version": 0} for pid in patient_ids
+    ])
+    db.session.execute(stmt.on_conflict_do_update(
+        index_elements=[AnalysisSnapshot.patient_id],
+        set_={"version": AnalysisSnapshot.version + 1}
+    ))
+    return patient_ids
+
+def get_analysis(patient_id):
+    """
+    The patient's comprehensive analysis, served from the snapshot table with
+    a single primary-key lookup and rebuilt only when ingestion invalidated it.
+    Raises ValueError if the patient doesn't exist.
+    """
+    snapshot = db.session.get(AnalysisSnapshot, patient_id)
+    if snapshot is not None and snapshot.payload is not None and snapshot.built_version == snapshot.version \
+            and snapshot.payload_format == PAYLOAD_FORMAT:
+        return snapshot.payload
+    return rebuild(patient_id)
+
+def rebuild(patient_id):
+    from backend.analysis import HealthAnalyzer
+
+    # A patient without a snapshot row counts as version 0
+    snapshot = db.session.get(AnalysisSnapshot, patient_id)
+    version = snapshot.version if snapshot is not None else 0
+    payload = HealthAnalyzer(patient_id).generate_comprehensive_summary()
+
+    # If ingestion bumped the version (or created the row) meanwhile,
+    # built_version stays behind and the next read rebuilds again
+    stmt = sqlite_insert(AnalysisSnapshot).values(
+        patient_id=patient_id, payload=payload, version=version,
+        built_version=version, payload_format=PAYLOAD_FORMAT, updated_at=datetime.utcnow()
+    )
+    db.session.execute(stmt.on_conflict_do_update(
+        index_elements=[AnalysisSnapshot.patient_id],
+        set_={
+            "payload": stmt.excluded.payload,
+            "built_version": stmt.excluded.built_version,
+            "payload_format": stmt.excluded.payload_format,
+            "updated_at": stmt.excluded.updated_at
+        }
+    ))
+    db.session.commit()
+    return payload
+
+def rebuild_dirty(limit=None, patient_ids=None):
+    """
+    Rebuilds stale snapshots, all of them or only those of `patient_ids`
+    (e.g. the patients an ingestion job touched). Returns how many were rebuilt.
+    """
+    query = db.session.query(AnalysisSnapshot.patient_id) \
+        .filter(AnalysisSnapshot.built_version != AnalysisSnapshot.version) \
+        .order_by(AnalysisSnapshot.patient_id)
+    if patient_ids is not None:
+        query = query.filter(AnalysisSnapshot.patient_id.in_(sorted(patient_ids)))
+    if limit:
+        query = query.limit(limit)
+    patient_ids = [pid for (pid,) in query]
+
+    rebuilt = 0
+    for patient_id in patient_ids:
+        try:
+            rebuild(patient_id)
+            rebuilt += 1
+        except ValueError:
+            # Patient was removed; drop its snapshot
+            db.session.rollback()
+            AnalysisSnapshot.query.filter_by(patient_id=patient_id).delete()
+            db.session.commit()
+    return rebuilt
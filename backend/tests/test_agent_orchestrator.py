@@ -0,0 +1,164 @@
+import unittest
+import os
+import sys
+import threading
+import time
+
+# Add parent directory to path to import backend modules
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
+
+from backend.agents.orchestrator import AgentOrchestrator
+
+class FakeLLM:
+    """Stands in for query_ollama: sleeps per system prompt, echoes which agent ran."""
+    def __init__(self, delays=None, default_delay=0.2):
+        self.delays = delays or {}
+        self.default_delay = default_delay
+        self.prompts = []
+        self.lock = threading.Lock()
+
+    def __call__(self, prompt, system_prompt=None):
+        with self.lock:
+            self.prompts.append((system_prompt, prompt))
+        for keyword, delay in self.delays.items():
+            if keyword in system_prompt:
+                time.sleep(delay)
+                break
+        else:
+            time.sleep(self.default_delay)
+        return f"report for: {system_prompt.split('.')[0]}"
+
+INPUTS = {"vitals": "BP 140/90", "labs": "A1C 6.1", "risks": "BRCA1"}
+
+class TestAgentOrchestrator(unittest.TestCase):
+
+    def test_specialists_run_concurrently(self):
+        llm = FakeLLM(default_delay=0.3)
+        start = time.perf_counter()
+        summary, details, _ = AgentOrchestrator(llm=llm, timeout=5).run(INPUTS, "Jane Roe, 41y, Female")
+        elapsed = time.perf_counter() - start
+
+        # Three 0.3s specialists in parallel + 0.3s scribe, well under 4 x 0.3s serial
+        self.assertLess(elapsed, 0.9)
+        self.assertIn("Chief Medical Officer", summary)
+        self.assertEqual(set(details["latency_ms"]), {"vitals", "labs", "risks", "scribe"})
+        self.assertTrue(all(ms >= 250 for ms in details["latency_ms"].values()))
+
+    def test_scribe_receives_specialist_reports(self):
+        llm = FakeLLM(default_delay=0)
+        _, details, _ = AgentOrchestrator(llm=llm, timeout=5).run(INPUTS, "Jane Roe, 41y, Female")
+
+        scribe_prompt = [p for s, p in llm.prompts if "Chief Medical Officer" in s][0]
+        for key in ("vitals", "labs", "risks"):
+            self.assertIn(details[key], scribe_prompt)
+        self.assertIn("Jane Roe", scribe_prompt)
+
+    def test_slow_agent_times_out(self):
+        llm = FakeLLM(delays={"pathologist": 2.0}, default_delay=0.05)
+        start = time.perf_counter()
+        summary, details, _ = AgentOrchestrator(llm=llm, timeout=0.5).run(INPUTS, "Jane Roe")
+
+        self.assertLess(time.perf_counter() - start, 1.5)
+        self.assertEqual(details["failed"], ["labs"])
+        self.assertIn("did not respond", details["labs"])
+        self.assertTrue(summary)
+
+    def test_failing_agent_does_not_sink_pipeline(self):
+        def llm(prompt, system_prompt=None):
+            if "genetic counselor" in system_prompt:
+                raise RuntimeError("model unavailable")
+            return "ok"
+
+        summary, details, _ = AgentOrchestrator(llm=llm, timeout=5).run(INPUTS, "Jane Roe")
+
+        self.assertEqual(summary, "ok")
+        self.assertIn("model unavailable", details["risks"])
+        self.assertIsNone(details["latency_ms"]["risks"])
+
+    def test_unchanged_inputs_reuse_previous_reports(self):
+        llm = FakeLLM(default_delay=0)
+        orchestrator = AgentOrchestrator(llm=llm, timeout=5)
+        _, first_details, fingerprint = orchestrator.run(INPUTS, "Jane Roe")
+
+        llm.prompts.clear()
+        changed = dict(INPUTS, labs="A1C 7.2")
+        _, details, new_fingerprint = orchestrator.run(
+            changed, "Jane Roe", previous_details=first_details, previous_fingerprint=fingerprint
+        )
+
+        ran = [s for s, _ in llm.prompts]
+        self.assertEqual(len(ran), 2) # lab agent + scribe
+        self.assertTrue(any("pathologist" in s for s in ran))
+        self.assertEqual(details["reused"], ["risks", "vitals"])
+        self.assertEqual(details["vitals"], first_details["vitals"])
+        self.assertNotIn("vitals", details["latency_ms"])
+        self.assertNotEqual(new_fingerprint["labs"], fingerprint["labs"])
+        self.assertEqual(new_fingerprint["vitals"], fingerprint["vitals"])
+
+    def test_failed_agent_is_not_fingerprinted(self):
+        llm = FakeLLM(delays={"pathologist": 2.0}, default_delay=0)
+        _, _, fingerprint = AgentOrchestrator(llm=llm, timeout=0.3).run(INPUTS, "Jane Roe")
+        self.assertNotIn("labs", fingerprint)
+        self.assertIn("vitals", fingerprint)
+
+    def test_stream_sends_reports_as_they_finish(self):
+        llm = FakeLLM(delays={"cardiologist": 0.4, "pathologist": 0.05}, default_delay=0.2)
+        scribe_pieces = lambda prompt, system_prompt=None: iter(["Patient ", "is ", "stable."])
+        orchestrator = AgentOrchestrator(llm=llm, timeout=5, stream_llm=scribe_pieces)
+
+        start = time.perf_counter()
+        events = []
+        for event, data in orchestrator.stream(INPUTS, "Jane Roe"):
+            events.append((event, data, time.perf_counter() - start))
+
+        agents = [data["agent"] for event, data, _ in events if event == "agent"]
+        self.assertEqual(agents, ["labs", "risks", "vitals"])
+        # The first report arrives after one agent's latency, not the whole pipeline's
+        self.assertLess(events[0][2], 0.3)
+        self.assertEqual([data for event, data, _ in events if event == "token"], ["Patient ", "is ", "stable."])
+
+        event, (summary, details, fingerprint), _ = events[-1]
+        self.assertEqual(event, "done")
+        self.assertEqual(summary, "Patient is stable.")
+        self.assertEqual(set(details["latency_ms"]), {"vitals", "labs", "risks", "scribe"})
+        self.assertIn("labs", fingerprint)
+
+    def test_stream_reports_reused_and_failed_agents(self):
+        llm = FakeLLM(default_delay=0)
+        orchestrator = AgentOrchestrator(llm=llm, timeout=5)
+        _, first_details, fingerprint = orchestrator.run(INPUTS, "Jane Roe")
+
+        def failing(prompt, system_prompt=None):
+            if "pathologist" in system_prompt:
+                raise RuntimeError("model unavailable")
+            return llm(prompt, system_prompt=system_prompt)
+
+        events = list(AgentOrchestrator(llm=failing, timeout=5).stream(
+            dict(INPUTS, labs="A1C 7.2", risks="APOE4"), "Jane Roe",
+            previous_details=first_details, previous_fingerprint=fingerprint
+        ))
+
+        agent_events = {data["agent"]: data for event, data in events if event == "agent"}
+        self.assertTrue(agent_events["vitals"]["reused"])
+        self.assertTrue(agent_events["labs"]["failed"])
+        self.assertNotIn("failed", agent_events["risks"])
+        _, (summary, details, new_fingerprint) = events[-1]
+        self.assertEqual(details["failed"], ["labs"])
+        self.assertEqual(details["reused"], ["vitals"])
+        self.assertNotIn("labs", new_fingerprint)
+        self.assertIn("Chief Medical Officer", summary)
+
+    def test_stream_scribe_timeout(self):
+        def slow_scribe(prompt, system_prompt=None):
+            yield "Patient "
+            time.sleep(2)
+            yield "is stable."
+
+        stream = AgentOrchestrator(llm=FakeLLM(default_delay=0), timeout=0.3, stream_llm=slow_scribe).stream(INPUTS, "Jane Roe")
+        start = time.perf_counter()
+        with self.assertRaises(TimeoutError):
+            list(stream)
+        self.assertLess(time.perf_counter() - start, 1.0)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,149 @@
+import unittest
+import os
+import sys
+import threading
+import time
+from datetime import datetime
+
+# Add parent directory to path to import backend modules
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
+
+from flask import Flask
+from backend.db import db, Patient, MedicalRecord, LabResult, AIAnalysis, SummaryBatch, SummaryBatchItem
+from backend.ai_summaries import create_batch, run_batch, estimate_cost, summary_inputs
+
+class StubLLM:
+    """Stands in for query_ollama: short fixed delay, tracks concurrent calls."""
+    def __init__(self, delay=0.05, fail_for=None):
+        self.delay = delay
+        self.fail_for = fail_for # patient name whose scribe call fails
+        self.calls = 0
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.lock = threading.Lock()
+
+    def __call__(self, prompt, system_prompt=None):
+        with self.lock:
+            self.calls += 1
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            time.sleep(self.delay)
+            if self.fail_for and self.fail_for in prompt and "Chief Medical Officer" in system_prompt:
+                raise RuntimeError("model unavailable")
+            return f"report for: {system_prompt.split('.')[0]}"
+        finally:
+            with self.lock:
+                self.in_flight -= 1
+
+class TestSummaryBatch(unittest.TestCase):
+
+    def setUp(self):
+        self.app = Flask(__name__)
+        self.app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite://'
+        db.init_app(self.app)
+        self.ctx = self.app.app_context()
+        self.ctx.push()
+        db.create_all()
+        self.patient_ids = []
+        for i in range(6):
+            patient = Patient(name=f"Patient {i}", age=40 + i, gender="Female")
+            db.session.add(patient)
+            db.session.flush()
+            db.session.add(MedicalRecord(patient_id=patient.id, date=datetime(2024, 1, 1), systolic_bp=120 + i * 5,
+                                         diastolic_bp=80, heart_rate=70))
+            db.session.add(LabResult(patient_id=patient.id, date=datetime(2024, 1, 1), test_type="Hemoglobin A1C",
+                                     result_value=5.5 + i * 0.3, unit="%"))
+            self.patient_ids.append(patient.id)
+        db.session.commit()
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.ctx.pop()
+
+    def _statuses(self, batch_id):
+        items = SummaryBatchItem.query.filter_by(batch_id=batch_id).order_by(SummaryBatchItem.id)
+        return {item.patient_id: item.status for item in items}
+
+    def test_summarizes_cohort_under_concurrency_limit(self):
+        llm = StubLLM()
+        batch = create_batch(self.patient_ids, max_concurrency=4)
+
+        report = run_batch(batch.id, llm=llm, log=lambda *a: None)
+
+        self.assertEqual((report["status"], report["done"], report["remaining"]), ("finished", 6, 0))
+        self.assertEqual(llm.calls, 6 * 4) # three specialists and the scribe per patient
+        self.assertLessEqual(llm.max_in_flight, 4)
+        self.assertGreater(llm.max_in_flight, 1) # patients overlap
+        self.assertGreater(report["patients_per_minute"], 0)
+        self.assertEqual(AIAnalysis.query.count(), 6)
+        batch = db.session.get(SummaryBatch, batch.id)
+        self.assertEqual(batch.to_dict()["counts"], {"done": 6})
+        self.assertEqual(batch.tokens_used, report["tokens"])
+
+    def test_unchanged_patients_skip_the_model(self):
+        run_batch(create_batch(self.patient_ids).id, llm=StubLLM(delay=0), log=lambda *a: None)
+
+        llm = StubLLM(delay=0)
+        report = run_batch(create_batch(self.patient_ids).id, llm=llm, log=lambda *a: None)
+
+        self.assertEqual(report["unchanged"], 6)
+        self.assertEqual(llm.calls, 0)
+        self.assertEqual(AIAnalysis.query.count(), 6)
+
+    def test_token_budget_pauses_and_resume_finishes(self):
+        patient = db.session.get(Patient, self.patient_ids[0])
+        per_patient = estimate_cost(*summary_inputs(patient), rerun={"vitals", "labs", "risks"})
+        # Room for two patients (their actual usage is well under the estimate)
+        batch = create_batch(self.patient_ids, max_concurrency=2, token_budget=int(per_patient * 2.5))
+
+        first = run_batch(batch.id, llm=StubLLM(delay=0), log=lambda *a: None)
+
+        self.assertEqual(first["status"], "paused")
+        self.assertLess(first["done"], 6)
+        self.assertEqual(first["remaining"], 6 - first["done"])
+        statuses = self._statuses(batch.id)
+        self.assertEqual(list(statuses.values()).count("pending"), first["remaining"])
+
+        llm = StubLLM(delay=0)
+        second = run_batch(batch.id, llm=llm, token_budget=10 ** 9, log=lambda *a: None)
+
+        self.assertEqual((second["status"], second["done"]), ("finished", first["remaining"]))
+        self.assertEqual(llm.calls, first["remaining"] * 4) # nothing redone
+        self.assertEqual(set(self._statuses(batch.id).values()), {"done"})
+        self.assertEqual(AIAnalysis.query.count(), 6)
+
+    def test_patient_over_the_whole_budget_fails_without_stalling(self):
+        patient = db.session.get(Patient, self.patient_ids[0])
+        per_patient = estimate_cost(*summary_inputs(patient), rerun={"vitals", "labs", "risks"})
+        batch = create_batch(self.patient_ids, token_budget=per_patient - 1)
+
+        llm = StubLLM(delay=0)
+        report = run_batch(batch.id, llm=llm, log=lambda *a: None)
+
+        self.assertEqual((report["status"], report["failed"], report["remaining"]), ("finished", 6, 0))
+        self.assertEqual(llm.calls, 0)
+        item = SummaryBatchItem.query.filter_by(batch_id=batch.id, patient_id=self.patient_ids[0]).one()
+        self.assertIn("exceeds token budget", item.error)
+
+    def test_failed_patient_is_retried_on_resume(self):
+        batch = create_batch(self.patient_ids)
+        report = run_batch(batch.id, llm=StubLLM(delay=0, fail_for="Patient 3"), log=lambda *a: None)
+
+        self.assertEqual((report["done"], report["failed"]), (5, 1))
+        item = SummaryBatchItem.query.filter_by(batch_id=batch.id, patient_id=self.patient_ids[3]).one()
+        self.assertIn("model unavailable", item.error)
+        self.assertIsNone(AIAnalysis.query.filter_by(patient_id=self.patient_ids[3]).first())
+
+        llm = StubLLM(delay=0)
+        report = run_batch(batch.id, llm=llm, log=lambda *a: None)
+        self.assertEqual((report["done"], report["failed"], llm.calls), (1, 0, 4))
+
+    def test_create_batch_drops_unknown_and_duplicate_ids(self):
+        batch = create_batch([self.patient_ids[1], 9999, self.patient_ids[1], self.patient_ids[0]])
+        self.assertEqual(list(self._statuses(batch.id)), [self.patient_ids[1], self.patient_ids[0]])
+        self.assertEqual(len(create_batch().items), 6)
+
+if __name__ == '__main__':
+    unittest.main()
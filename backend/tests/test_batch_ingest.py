@@ -0,0 +1,96 @@
+import unittest
+import os
+import sys
+import tempfile
+
+# Add parent directory to path to import backend modules
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
+
+from flask import Flask
+from backend.db import db, Patient, ImagingRecord, LabResult, AnalysisSnapshot
+
+CSV_BODY = (
+    "Patient Name,Age,Gender,Visit Date,Test Name,Result Value,Unit,Reference Range,Status\n"
+    "Jane Roe,41,Female,2024-01-05,Glucose,101,mg/dL,70-99,High\n"
+)
+
+class TestBatchIngest(unittest.TestCase):
+
+    def setUp(self):
+        # Imported lazily so test_parsers can mock pypdf/pydicom first
+        from backend import batch_ingest
+        self.batch_ingest = batch_ingest
+
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.app = Flask(__name__)
+        self.app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite://'
+        db.init_app(self.app)
+        self.ctx = self.app.app_context()
+        self.ctx.push()
+        db.create_all()
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.ctx.pop()
+        self.tmpdir.cleanup()
+
+    def _write(self, name, body=None):
+        path = os.path.join(self.tmpdir.name, name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(name if body is None else body) # distinct content, identical files are deduplicated
+        return path
+
+    def test_directory_with_mixed_files(self):
+        # Image uploads take the patient name from the filename prefix
+        for i in range(5):
+            self._write(f"scans/Jane Roe_{i}.png")
+        self._write("scans/nested/John Doe_1.jpg")
+        self._write("scans/labs.csv", CSV_BODY)
+        self._write("scans/notes.exe")
+
+        result = self.batch_ingest.ingest_paths([os.path.join(self.tmpdir.name, "scans")], workers=1, batch_size=2)
+
+        self.assertEqual((result['files'], result['succeeded'], result['failed']), (7, 7, []))
+        self.assertEqual(ImagingRecord.query.count(), 6)
+        self.assertEqual(LabResult.query.count(), 1)
+        # CSV and images resolve to the same patient row
+        self.assertEqual(sorted(p.name for p in Patient.query), ["Jane Roe", "John Doe"])
+        self.assertEqual(AnalysisSnapshot.query.count(), 2)
+
+    def test_bad_file_does_not_fail_its_batch(self):
+        for i in range(3):
+            self._write(f"Jane Roe_{i}.png")
+        bad = self._write("_unnamed.png")
+
+        result = self.batch_ingest.ingest_paths([self.tmpdir.name], workers=1, batch_size=10)
+
+        self.assertEqual(result['succeeded'], 3)
+        self.assertEqual([f['file'] for f in result['failed']], [bad])
+        self.assertEqual(ImagingRecord.query.count(), 3)
+
+    def test_process_pool(self):
+        for i in range(4):
+            self._write(f"Patient {i % 2}_{i}.png")
+
+        result = self.batch_ingest.ingest_paths([self.tmpdir.name], workers=2)
+
+        self.assertEqual(result['succeeded'], 4)
+        self.assertEqual(ImagingRecord.query.count(), 4)
+        self.assertEqual(Patient.query.count(), 2)
+
+    def test_process_file_routes_directories(self):
+        from backend.ingestion import IngestProgress, process_file
+        self.app.config['INGEST_PROCESSES'] = 1
+        self._write("Jane Roe_1.png")
+        self._write("_unnamed.png")
+
+        progress = IngestProgress()
+        self.assertFalse(process_file(self.tmpdir.name, progress=progress))
+        self.assertEqual(progress.done, 2)
+        self.assertIn("1 of 2 files failed", progress.error)
+        self.assertEqual(ImagingRecord.query.count(), 1)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,185 @@
+import unittest
+import hashlib
+import io
+import os
+import sys
+import tempfile
+import threading
+import time
+
+# Add parent directory to path to import backend modules
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
+
+from flask import Flask
+from backend.db import db, Patient, LabResult, IngestedFile
+from backend import chunked_upload
+from backend.chunked_upload import UploadError
+
+CSV_HEADER = "Patient Name,Age,Gender,Visit Date,Test Name,Result Value,Unit,Reference Range,Status\n"
+
+def sha(data):
+    return hashlib.sha256(data).hexdigest()
+
+class TestChunkedUpload(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.root = self.tmpdir.name
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def _put(self, upload_id, offset, data, checksum=None):
+        return chunked_upload.write_chunk(self.root, upload_id, offset, io.BytesIO(data), checksum)
+
+    def test_resume_retry_and_complete(self):
+        data = os.urandom(3000)
+        upload = chunked_upload.create_upload(self.root, "../scan.dcm", size=len(data), sha256=sha(data))
+        self.assertEqual(upload['filename'], "scan.dcm")
+        self.assertFalse(upload['stream'])
+        upload_id = upload['upload_id']
+
+        self._put(upload_id, 0, data[:1000], sha(data[:1000]))
+        # Retried chunk that overlaps what was already received
+        self._put(upload_id, 500, data[500:2000])
+        # A client resuming asks where to continue
+        self.assertEqual(chunked_upload.get_upload(self.root, upload_id)['received'], 2000)
+        with self.assertRaises(UploadError) as gap:
+            self._put(upload_id, 2500, data[2500:])
+        self.assertEqual(gap.exception.status, 409)
+        self._put(upload_id, 2000, data[2000:])
+
+        state, digest = chunked_upload.complete_upload(self.root, upload_id)
+        self.assertEqual((state['status'], digest), ("complete", sha(data)))
+        with open(state['path'], 'rb') as f:
+            self.assertEqual(f.read(), data)
+
+    def test_bad_chunks_are_rejected(self):
+        upload_id = chunked_upload.create_upload(self.root, "labs.csv", size=10)['upload_id']
+        self._put(upload_id, 0, b"abcde")
+
+        with self.assertRaises(UploadError) as corrupt:
+            self._put(upload_id, 5, b"fghij", checksum=sha(b"other"))
+        self.assertEqual(corrupt.exception.status, 422)
+        with self.assertRaises(UploadError) as conflict:
+            self._put(upload_id, 0, b"XXXXX")
+        self.assertEqual(conflict.exception.status, 409)
+        with self.assertRaises(UploadError):
+            self._put(upload_id, 5, b"too long!!!")
+
+        state = chunked_upload.get_upload(self.root, upload_id)
+        self.assertEqual(state['received'], 5)
+        self.assertEqual(os.path.getsize(state['path']), 5)
+
+    def test_whole_file_checksum_mismatch_fails_upload(self):
+        upload_id = chunked_upload.create_upload(self.root, "labs.csv")['upload_id']
+        self._put(upload_id, 0, b"abc")
+        with self.assertRaises(UploadError):
+            chunked_upload.complete_upload(self.root, upload_id, sha256=sha(b"abd"))
+        self.assertEqual(chunked_upload.get_upload(self.root, upload_id)['status'], "failed")
+
+class TestStreamingIngestion(unittest.TestCase):
+
+    def setUp(self):
+        # Imported lazily so test_parsers can mock pypdf/pydicom first
+        from backend import ingestion
+        self.ingestion = ingestion
+
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.root = os.path.join(self.tmpdir.name, "chunked")
+        self.app = Flask(__name__)
+        # File-backed so the parser thread sees its own connection
+        self.app.config['SQLALCHEMY_DATABASE_URI'] = f"sqlite:///{os.path.join(self.tmpdir.name, 'stream.db')}"
+        db.init_app(self.app)
+        with self.app.app_context():
+            db.create_all()
+
+        self.original_chunk_size = self.ingestion.CSV_CHUNK_SIZE
+        self.ingestion.CSV_CHUNK_SIZE = 10
+
+    def tearDown(self):
+        self.ingestion.CSV_CHUNK_SIZE = self.original_chunk_size
+        with self.app.app_context():
+            db.session.remove()
+            db.engine.dispose()
+        self.tmpdir.cleanup()
+
+    def _start_ingest(self, path):
+        result = {'progress': self.ingestion.IngestProgress()}
+        def run():
+            with self.app.app_context():
+                result['ok'] = self.ingestion.process_file(path, result['progress'])
+        thread = threading.Thread(target=run)
+        thread.start()
+        return thread, result
+
+    def _wait_for_rows(self, result):
+        deadline = time.monotonic() + 10
+        while result['progress'].done == 0 and time.monotonic() < deadline:
+            time.sleep(0.05)
+
+    def _lab_count(self):
+        with self.app.app_context():
+            return LabResult.query.count()
+
+    def test_csv_parsed_while_it_arrives(self):
+        rows = "".join(f"Jane Roe,41,Female,2024-01-{i + 1:02d},Glucose,{90 + i},mg/dL,70-99,Normal\n" for i in range(25))
+        data = (CSV_HEADER + rows).encode()
+        upload = chunked_upload.create_upload(self.root, "labs.csv", size=len(data))
+        self.assertTrue(upload['stream'])
+        thread, result = self._start_ingest(upload['path'])
+
+        half = len(data) // 2
+        chunked_upload.write_chunk(self.root, upload['upload_id'], 0, io.BytesIO(data[:half]))
+        # The first chunks of rows are parsed before the upload is finished,
+        # but only stored once its checksum matched
+        self._wait_for_rows(result)
+        self.assertGreater(result['progress'].done, 0)
+        self.assertEqual(self._lab_count(), 0)
+        self.assertTrue(thread.is_alive())
+        # ...and other writers aren't locked out meanwhile
+        with self.app.app_context():
+            db.session.execute(db.text("PRAGMA busy_timeout=500"))
+            db.session.add(Patient(name="Walk In", age=30, gender="Male"))
+            db.session.commit()
+
+        chunked_upload.write_chunk(self.root, upload['upload_id'], half, io.BytesIO(data[half:]))
+        chunked_upload.complete_upload(self.root, upload['upload_id'], sha256=sha(data))
+        thread.join(10)
+
+        self.assertTrue(result['ok'])
+        self.assertEqual(self._lab_count(), 25)
+        with self.app.app_context():
+            self.assertEqual(IngestedFile.query.one().content_hash, sha(data))
+
+    def test_checksum_mismatch_keeps_no_rows(self):
+        rows = "".join(f"Jane Roe,41,Female,2024-01-{i + 1:02d},Glucose,{90 + i},mg/dL,70-99,Normal\n" for i in range(25))
+        data = (CSV_HEADER + rows).encode()
+        upload = chunked_upload.create_upload(self.root, "labs.csv")
+        thread, result = self._start_ingest(upload['path'])
+
+        chunked_upload.write_chunk(self.root, upload['upload_id'], 0, io.BytesIO(data[:len(data) // 2]))
+        self._wait_for_rows(result)
+        self.assertGreater(result['progress'].done, 0)
+        with self.assertRaises(UploadError) as mismatch:
+            chunked_upload.complete_upload(self.root, upload['upload_id'], sha256=sha(data))
+        self.assertEqual(mismatch.exception.status, 422)
+        thread.join(10)
+
+        self.assertFalse(result['ok'])
+        self.assertEqual(self._lab_count(), 0)
+        with self.app.app_context():
+            self.assertEqual(Patient.query.count(), 0)
+            self.assertEqual(IngestedFile.query.count(), 0)
+
+    def test_aborted_upload_fails_the_parse(self):
+        upload = chunked_upload.create_upload(self.root, "sample.vcf")
+        thread, result = self._start_ingest(upload['path'])
+        chunked_upload.write_chunk(self.root, upload['upload_id'], 0, io.BytesIO(b"##fileformat=VCFv4.2\n"))
+        chunked_upload.fail_upload(self.root, upload['upload_id'], "Aborted by client")
+        thread.join(10)
+        self.assertFalse(thread.is_alive())
+        self.assertFalse(result['ok'])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,114 @@
+import unittest
+import os
+import sys
+import tempfile
+from datetime import datetime, timedelta
+
+import numpy as np
+
+# Add parent directory to path to import backend modules
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
+
+from flask import Flask
+from backend.db import db, Patient, MedicalRecord, LabResult, GenomicData, DoctorNote
+from backend.analysis import HealthAnalyzer
+from backend.columnar import load_series
+from backend.snapshots import mark_dirty
+from backend.trends import PercentChangeRule, SlopeRule
+
+class TestColumnarStore(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.app = Flask(__name__)
+        self.app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite://'
+        self.app.config['COLUMNAR_DIR'] = self.tmpdir.name
+        db.init_app(self.app)
+        self.ctx = self.app.app_context()
+        self.ctx.push()
+        db.create_all()
+
+        patient = Patient(name="Jane Roe", age=58, gender="Female")
+        db.session.add(patient)
+        db.session.commit()
+        self.patient_id = patient.id
+
+        start = datetime(2023, 1, 1)
+        for i in reversed(range(30)):
+            date = start + timedelta(days=i)
+            # Some visits only have a heart rate, so BP columns hold NULLs
+            db.session.add(MedicalRecord(patient_id=self.patient_id, date=date, heart_rate=70 + i,
+                                         systolic_bp=None if i % 4 == 0 else 120 + i, diastolic_bp=80))
+            db.session.add(LabResult(patient_id=self.patient_id, date=date, test_type="Hemoglobin A1C", result_value=5.0 + i * 0.05, unit="%", flag="Normal"))
+            db.session.add(LabResult(patient_id=self.patient_id, date=date, test_type="LDL Cholesterol", result_value=130.0 - i, unit="mg/dL", flag=None))
+        db.session.add(DoctorNote(patient_id=self.patient_id, date=start, doctor_name="Dr. Smith", note_content="Stable", sentiment="Stable"))
+        db.session.add(GenomicData(patient_id=self.patient_id, gene_marker="chr17:43044295", variant="A>G", risk_association="Cancer Susceptibility", significance="Pathogenic"))
+        db.session.commit()
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.ctx.pop()
+        self.tmpdir.cleanup()
+
+    def _analyze(self, columnar, **kwargs):
+        self.app.config['COLUMNAR_STORE'] = columnar
+        analyzer = HealthAnalyzer(self.patient_id, **kwargs)
+        return analyzer.generate_comprehensive_summary()
+
+    def test_matches_sql_read_path(self):
+        rules = (PercentChangeRule(), SlopeRule(points=5))
+        self.assertEqual(self._analyze(True, lab_rules=rules), self._analyze(False, lab_rules=rules))
+
+    def test_columns_are_memory_mapped(self):
+        series = load_series(self.patient_id)
+        self.assertEqual(len(series['vitals']), 30)
+        self.assertIsInstance(series['labs'].column('result_value'), np.memmap)
+        row = series['vitals'][-1]
+        self.assertEqual((row.systolic_bp, row.heart_rate), (149, 99))
+        self.assertIsInstance(row.systolic_bp, int)
+        self.assertIsNone(series['vitals'][0].systolic_bp)
+        self.assertIsNone(series['labs'][1].flag)
+
+    def test_ingestion_invalidates_store(self):
+        self._analyze(True)
+        db.session.add(LabResult(patient_id=self.patient_id, date=datetime(2024, 1, 1), test_type="Hemoglobin A1C",
+                                 result_value=7.5, unit="%", flag="High"))
+        mark_dirty([self.patient_id])
+        db.session.commit()
+
+        summary = self._analyze(True)
+        self.assertEqual(summary['trends']['labs']['Hemoglobin A1C']['current'], "7.5 %")
+        # Only the served version is kept on disk
+        versions = [d for d in os.listdir(os.path.join(self.tmpdir.name, str(self.patient_id))) if d.startswith("v")]
+        self.assertEqual(versions, ["v1"])
+
+    def test_tail_by_groups_in_row_order(self):
+        # Interleaved tests of uneven length: one shorter than the tail
+        db.session.add(LabResult(patient_id=self.patient_id, date=datetime(2023, 1, 15, 12), test_type="TSH",
+                                 result_value=2.1, unit="mIU/L"))
+        db.session.commit()
+        mark_dirty([self.patient_id])
+        labs = load_series(self.patient_id)['labs']
+
+        tails = labs.tail_by('test_type', 4)
+
+        self.assertEqual(set(tails), {"Hemoglobin A1C", "LDL Cholesterol", "TSH"})
+        for test_type, rows in tails.items():
+            expected = [row for row in labs if row.test_type == test_type][-4:]
+            self.assertEqual(rows, expected)
+        self.assertEqual(len(tails["TSH"]), 1)
+
+    def test_patient_without_history(self):
+        patient = Patient(name="John Doe", age=40, gender="Male")
+        db.session.add(patient)
+        db.session.commit()
+
+        series = load_series(patient.id)
+        self.assertEqual(len(series['vitals']), 0)
+        self.app.config['COLUMNAR_STORE'] = True
+        summary = HealthAnalyzer(patient.id).generate_comprehensive_summary()
+        self.assertEqual(summary['trends'], {'labs': {}})
+
+if __name__ == '__main__':
+    unittest.main()
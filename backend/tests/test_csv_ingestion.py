@@ -0,0 +1,144 @@
+import unittest
+import os
+import sys
+import tempfile
+from datetime import datetime
+
+# Add parent directory to path to import backend modules
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
+
+from flask import Flask
+from backend.db import db, Patient, MedicalRecord, LabResult
+
+CSV_HEADER = "Patient Name,Age,Gender,Phone,Address,Visit Date,Test Name,Result Value,Unit,Reference Range,Status\n"
+
+class TestBulkCsvIngestion(unittest.TestCase):
+
+    def setUp(self):
+        # Imported here rather than at module level so test_parsers can still
+        # swap pypdf/pydicom for mocks before backend.ingestion is first loaded
+        from backend import ingestion
+        self.ingestion = ingestion
+
+        self.app = Flask(__name__)
+        self.app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite://'
+        db.init_app(self.app)
+        self.ctx = self.app.app_context()
+        self.ctx.push()
+        db.create_all()
+
+        self.tmpdir = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.ctx.pop()
+        self.tmpdir.cleanup()
+
+    def _write_csv(self, body):
+        path = os.path.join(self.tmpdir.name, "labs.csv")
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(CSV_HEADER + body)
+        return path
+
+    def test_creates_patients_once_and_inserts_labs(self):
+        path = self._write_csv(
+            "Jane Roe,41,Female,555-0100,1 Main St,2024-01-05,Glucose,101,mg/dL,70-99,High\n"
+            "Jane Roe,41,Female,555-0100,1 Main St,2024-02-05,Glucose,95,mg/dL,70-99,Normal\n"
+            "John^Doe,60,Male,555-0101,2 Main St,2024-01-06,Hemoglobin A1C,6.1,%,<5.7,High\n"
+        )
+
+        self.assertTrue(self.ingestion._process_csv(path))
+
+        patients = {p.name: p for p in Patient.query.all()}
+        self.assertEqual(set(patients), {"Jane Roe", "John Doe"})
+        self.assertEqual(patients["Jane Roe"].age, 41)
+        self.assertEqual(patients["John Doe"].contact_info, "555-0101")
+
+        labs = LabResult.query.filter_by(patient_id=patients["Jane Roe"].id).order_by(LabResult.date).all()
+        self.assertEqual([l.result_value for l in labs], [101.0, 95.0])
+        self.assertEqual(labs[0].flag, "High")
+
+    def test_reuses_existing_patient(self):
+        db.session.add(Patient(name="Jane Roe", age=41, gender="Female"))
+        db.session.commit()
+        path = self._write_csv("Jane Roe,41,Female,,,2024-01-05,Glucose,101,mg/dL,70-99,High\n")
+
+        self.assertTrue(self.ingestion._process_csv(path))
+
+        self.assertEqual(Patient.query.count(), 1)
+        self.assertEqual(LabResult.query.count(), 1)
+
+    def test_merges_vitals_into_one_record_per_visit(self):
+        path = self._write_csv(
+            "Jane Roe,41,Female,,,2024-01-05,Systolic BP,135,mmHg,90-120,High\n"
+            "Jane Roe,41,Female,,,2024-01-05,Diastolic BP,85,mmHg,60-80,High\n"
+            "Jane Roe,41,Female,,,2024-01-05,Body Temperature,98.6,F,97.0-99.0,Normal\n"
+        )
+
+        self.assertTrue(self.ingestion._process_csv(path))
+
+        record = MedicalRecord.query.one()
+        self.assertEqual((record.systolic_bp, record.diastolic_bp, record.heart_rate), (135, 85, None))
+        self.assertAlmostEqual(record.temperature, 98.6)
+
+    def test_undated_rows_are_skipped(self):
+        from backend import metrics
+        metrics.registry.reset()
+        path = self._write_csv(
+            "Jane Roe,41,Female,,,2024-01-05,Heart Rate,72,bpm,60-100,Normal\n"
+            "Jane Roe,41,Female,,,,Heart Rate,75,bpm,60-100,Normal\n"
+            "Jane Roe,41,Female,,,01/06/2024,Glucose,101,mg/dL,70-99,High\n"
+        )
+
+        progress = self.ingestion.IngestProgress()
+        # Re-ingesting the file stores nothing new
+        self.assertTrue(self.ingestion._process_csv(path))
+        self.assertTrue(self.ingestion._process_csv(path, progress=progress))
+
+        self.assertEqual(MedicalRecord.query.count(), 1)
+        self.assertEqual(LabResult.query.count(), 0)
+        self.assertEqual(metrics.registry.counters[("rows_skipped", (("format", "unknown"), ("reason", "invalid_date")))], 4)
+        self.assertIn("2 row(s) skipped without a valid date", progress.warning)
+
+    def test_fails_when_no_row_has_a_valid_date(self):
+        path = self._write_csv("Jane Roe,41,Female,,,01/05/2024,Heart Rate,72,bpm,60-100,Normal\n")
+        progress = self.ingestion.IngestProgress()
+
+        self.assertFalse(self.ingestion._process_csv(path, progress=progress))
+
+        self.assertIn("No rows stored", progress.error)
+        self.assertEqual(Patient.query.count(), 0)
+
+    def test_updates_existing_visit_record(self):
+        patient = Patient(name="Jane Roe", age=41, gender="Female")
+        db.session.add(patient)
+        db.session.commit()
+        db.session.add(MedicalRecord(patient_id=patient.id, date=datetime(2024, 1, 5), systolic_bp=120))
+        db.session.commit()
+        path = self._write_csv("Jane Roe,41,Female,,,2024-01-05,Heart Rate,72,bpm,60-100,Normal\n")
+
+        self.assertTrue(self.ingestion._process_csv(path))
+
+        db.session.expire_all()
+        record = MedicalRecord.query.one()
+        self.assertEqual((record.systolic_bp, record.heart_rate), (120, 72))
+
+    def test_chunked_inserts(self):
+        rows = "".join(
+            f"Jane Roe,41,Female,,,2024-01-{(i % 28) + 1:02d},Glucose,{90 + i % 10},mg/dL,70-99,Normal\n"
+            for i in range(25)
+        )
+        path = self._write_csv(rows)
+
+        original = self.ingestion.CSV_CHUNK_SIZE
+        self.ingestion.CSV_CHUNK_SIZE = 10
+        try:
+            self.assertTrue(self.ingestion._process_csv(path))
+        finally:
+            self.ingestion.CSV_CHUNK_SIZE = original
+
+        self.assertEqual(LabResult.query.count(), 25)
+
+if __name__ == '__main__':
+    unittest.main()
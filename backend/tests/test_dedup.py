@@ -0,0 +1,156 @@
+import unittest
+import os
+import shutil
+import sys
+import tempfile
+from datetime import datetime
+
+# Add parent directory to path to import backend modules
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
+
+from flask import Flask
+from backend.db import db, Patient, MedicalRecord, LabResult, GenomicData, DoctorNote, IngestedFile, upgrade_schema
+
+CSV_HEADER = "Patient Name,Age,Gender,Visit Date,Test Name,Result Value,Unit,Reference Range,Status\n"
+VCF_HEADER = "##fileformat=VCFv4.2\n#CHROM\tPOS\tID\tREF\tALT\tQUAL\tFILTER\tINFO\tFORMAT\tJane^Roe\n"
+
+def note_record(content):
+    return {"kind": "note", "patient_name": "Jane Roe", "date": datetime(2024, 1, 1), "doctor_name": "Extracted from PDF",
+            "note_content": content, "sentiment": "Pending AI Analysis", "content_hash": DoctorNote.hash_content(content)}
+
+class TestIngestionDedup(unittest.TestCase):
+
+    def setUp(self):
+        # Imported lazily so test_parsers can mock pypdf/pydicom first
+        from backend import ingestion
+        self.ingestion = ingestion
+
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.app = Flask(__name__)
+        self.app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite://'
+        db.init_app(self.app)
+        self.ctx = self.app.app_context()
+        self.ctx.push()
+        db.create_all()
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.ctx.pop()
+        self.tmpdir.cleanup()
+
+    def _write(self, name, body):
+        path = os.path.join(self.tmpdir.name, name)
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(body)
+        return path
+
+    def test_same_file_twice_is_skipped(self):
+        path = self._write("labs.csv", CSV_HEADER + "Jane Roe,41,Female,2024-01-05,Glucose,101,mg/dL,70-99,High\n")
+        copy = os.path.join(self.tmpdir.name, "labs (1).csv")
+        shutil.copy(path, copy)
+
+        self.assertTrue(self.ingestion.process_file(path))
+        self.assertTrue(self.ingestion.process_file(path))
+        self.assertTrue(self.ingestion.process_file(copy))
+
+        self.assertEqual(LabResult.query.count(), 1)
+        self.assertEqual(IngestedFile.query.count(), 1)
+
+    def test_overlapping_csv_inserts_only_new_rows(self):
+        first = self._write("jan.csv", CSV_HEADER + "Jane Roe,41,Female,2024-01-05,Glucose,101,mg/dL,70-99,High\n")
+        # A different export that repeats January's result
+        second = self._write("jan-feb.csv", CSV_HEADER +
+                             "Jane Roe,41,Female,2024-01-05,Glucose,101,mg/dL,70-99,High\n"
+                             "Jane Roe,41,Female,2024-02-05,Glucose,95,mg/dL,70-99,Normal\n")
+
+        self.assertTrue(self.ingestion.process_file(first))
+        self.assertTrue(self.ingestion.process_file(second))
+
+        self.assertEqual([l.result_value for l in LabResult.query.order_by(LabResult.date)], [101.0, 95.0])
+
+    def test_vcf_variants_not_duplicated(self):
+        variant = "chr1\t100\t.\tA\tG\t50\tPASS\tDP=10\tGT\t0/1\n"
+        self.assertTrue(self.ingestion.process_file(self._write("a.vcf", VCF_HEADER + variant)))
+        self.assertTrue(self.ingestion.process_file(self._write("b.vcf", "##source=rerun\n" + VCF_HEADER + variant)))
+        self.assertEqual(GenomicData.query.count(), 1)
+
+    def test_notes_keyed_by_content(self):
+        self.ingestion._store_record(note_record("Patient Name: Jane Roe\nStable."))
+        db.session.commit()
+        self.ingestion._store_record(note_record("Patient Name: Jane Roe\nStable."))
+        self.ingestion.store_records_bulk([note_record("Patient Name: Jane Roe\nStable."), note_record("Follow-up.")])
+        db.session.commit()
+        self.assertEqual(sorted(n.note_content for n in DoctorNote.query), ["Follow-up.", "Patient Name: Jane Roe\nStable."])
+
+    def test_batch_skips_seen_files(self):
+        from backend.batch_ingest import ingest_paths
+        self._write("Jane Roe_1.png", "scan 1")
+        self._write("Jane Roe_1 (copy).png", "scan 1")
+
+        first = ingest_paths([self.tmpdir.name], workers=1)
+        second = ingest_paths([self.tmpdir.name], workers=1)
+
+        self.assertEqual((first['succeeded'], first['skipped']), (1, 1))
+        self.assertEqual((second['succeeded'], second['skipped']), (0, 2))
+
+    def test_upgrade_keeps_existing_duplicates(self):
+        # A database from before the natural keys: no unique indexes, no note hashes, duplicated rows
+        db.session.execute(db.text("DROP INDEX uq_lab_result_natural"))
+        db.session.execute(db.text("DROP INDEX uq_doctor_note_content"))
+        db.session.execute(db.text("ALTER TABLE doctor_note DROP COLUMN content_hash"))
+        patient = Patient(name="Jane Roe", age=41, gender="Female")
+        db.session.add(patient)
+        db.session.flush()
+        for _ in range(3):
+            db.session.execute(db.text("INSERT INTO lab_result (patient_id, date, test_type, result_value) "
+                                       "VALUES (:p, '2024-01-05 00:00:00.000000', 'Glucose', 101)"), {"p": patient.id})
+            db.session.execute(db.text("INSERT INTO doctor_note (patient_id, note_content) VALUES (:p, 'Stable.')"), {"p": patient.id})
+        db.session.execute(db.text("INSERT INTO lab_result (patient_id, date, test_type, result_value) "
+                                   "VALUES (:p, '2024-01-05 00:00:00.000000', NULL, 101)"), {"p": patient.id})
+        db.session.commit()
+
+        upgrade_schema()
+
+        # Patient data is never deleted on start: the duplicated key just stays unindexed
+        self.assertEqual(LabResult.query.count(), 4)
+        self.assertEqual(DoctorNote.query.count(), 3)
+        names = {index['name'] for index in db.inspect(db.engine).get_indexes('lab_result')}
+        self.assertNotIn('uq_lab_result_natural', names)
+        # Existing notes have no content hash, repeated wording isn't a duplicate
+        names = {index['name'] for index in db.inspect(db.engine).get_indexes('doctor_note')}
+        self.assertIn('uq_doctor_note_content', names)
+
+        # Once the duplicates are gone, the next start creates the index
+        db.session.execute(db.text("DELETE FROM lab_result WHERE id NOT IN (SELECT MIN(id) FROM lab_result)"))
+        db.session.commit()
+        upgrade_schema()
+        names = {index['name'] for index in db.inspect(db.engine).get_indexes('lab_result')}
+        self.assertIn('uq_lab_result_natural', names)
+
+    def test_visit_key_replaces_the_plain_index(self):
+        # A database from before the visit key, with a visit stored twice
+        db.session.execute(db.text("DROP INDEX uq_medical_record_visit"))
+        db.session.execute(db.text("CREATE INDEX ix_medical_record_patient_date ON medical_record (patient_id, date)"))
+        patient = Patient(name="Jane Roe", age=41, gender="Female")
+        db.session.add(patient)
+        db.session.flush()
+        for systolic in (120, 125):
+            db.session.add(MedicalRecord(patient_id=patient.id, date=datetime(2024, 1, 5), systolic_bp=systolic))
+        db.session.commit()
+
+        def indexes():
+            return {index['name'] for index in db.inspect(db.engine).get_indexes('medical_record')}
+
+        upgrade_schema()
+        # Duplicates block the key, so the old index keeps serving reads
+        self.assertEqual(indexes(), {'ix_medical_record_patient_date'})
+        self.assertEqual(MedicalRecord.query.count(), 2)
+
+        db.session.execute(db.text("DELETE FROM medical_record WHERE systolic_bp = 125"))
+        db.session.commit()
+        upgrade_schema()
+        self.assertEqual(indexes(), {'uq_medical_record_visit'})
+
+if __name__ == '__main__':
+    unittest.main()
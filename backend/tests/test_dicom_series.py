@@ -0,0 +1,92 @@
+import unittest
+from unittest.mock import MagicMock, patch
+import os
+import sys
+import tempfile
+from datetime import datetime
+
+# Add parent directory to path to import backend modules
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
+
+from flask import Flask
+from backend.db import db, Patient, ImagingRecord
+
+def slice_record(series_uid, patient_name="Doe^Jane", modality="CT"):
+    return {
+        "kind": "imaging", "patient_name": patient_name, "date": datetime(2024, 3, 1),
+        "modality": modality, "body_part": "CHEST", "image_url": f"/scans/{series_uid}",
+        "radiologist_report": "DICOM Header Extracted.",
+        "study_uid": "1.2.3", "series_uid": series_uid, "instance_count": 1
+    }
+
+class TestDicomSeries(unittest.TestCase):
+
+    def setUp(self):
+        # Imported lazily so test_parsers can mock pypdf/pydicom first
+        from backend import ingestion
+        self.ingestion = ingestion
+
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.app = Flask(__name__)
+        self.app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite://'
+        db.init_app(self.app)
+        self.ctx = self.app.app_context()
+        self.ctx.push()
+        db.create_all()
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.ctx.pop()
+        self.tmpdir.cleanup()
+
+    def test_header_only_read(self):
+        ds = MagicMock()
+        ds.PatientName, ds.Modality, ds.StudyInstanceUID, ds.SeriesInstanceUID = "Doe^Jane", "MR", "1.2.3", "1.2.3.4"
+        ds.__contains__.side_effect = lambda key: key in ('PatientName', 'Modality', 'StudyInstanceUID', 'SeriesInstanceUID')
+
+        with patch('backend.ingestion.pydicom') as pydicom:
+            pydicom.dcmread.return_value = ds
+            record = self.ingestion.parse_file("slice.dcm")
+
+        _, kwargs = pydicom.dcmread.call_args
+        self.assertTrue(kwargs['stop_before_pixels'])
+        self.assertIn('SeriesInstanceUID', kwargs['specific_tags'])
+        self.assertEqual((record['series_uid'], record['body_part'], record['instance_count']), ("1.2.3.4", "Unknown", 1))
+
+    def test_slices_grouped_per_series(self):
+        records = [slice_record("1.2.3.4") for _ in range(50)] + [slice_record("1.2.3.5", modality="MR") for _ in range(20)]
+        self.ingestion.store_records_bulk(records)
+        # A later batch of the same study adds to the existing series
+        self.ingestion.store_records_bulk([slice_record("1.2.3.4") for _ in range(10)] + [slice_record(None)])
+        db.session.commit()
+
+        counts = {r.series_uid: r.instance_count for r in ImagingRecord.query}
+        self.assertEqual(counts, {"1.2.3.4": 60, "1.2.3.5": 20, None: 1})
+        self.assertEqual(Patient.query.count(), 1)
+
+    def test_single_file_path_groups_too(self):
+        for _ in range(3):
+            self.ingestion._store_record(slice_record("1.2.3.4"))
+            db.session.commit()
+        self.assertEqual([(r.series_uid, r.instance_count) for r in ImagingRecord.query], [("1.2.3.4", 3)])
+
+    def test_same_series_uid_different_patient(self):
+        self.ingestion.store_records_bulk([slice_record("1.2.3.4"), slice_record("1.2.3.4", patient_name="Roe^John")])
+        db.session.commit()
+        self.assertEqual(ImagingRecord.query.count(), 2)
+
+    def test_extensionless_dicom_detected(self):
+        dicom = os.path.join(self.tmpdir.name, "IM0001")
+        other = os.path.join(self.tmpdir.name, "README")
+        with open(dicom, "wb") as f:
+            f.write(b"\0" * 128 + b"DICM" + b"\0" * 16)
+        with open(other, "wb") as f:
+            f.write(b"not a dicom file")
+
+        from backend.batch_ingest import collect_files
+        self.assertEqual(collect_files([self.tmpdir.name]), [dicom])
+        self.assertIs(self.ingestion.record_parser(dicom), self.ingestion._parse_dicom)
+
+if __name__ == '__main__':
+    unittest.main()
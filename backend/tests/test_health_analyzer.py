@@ -0,0 +1,92 @@
+import unittest
+import os
+import sys
+from datetime import datetime, timedelta
+
+# Add parent directory to path to import backend modules
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
+
+from flask import Flask
+from sqlalchemy import event
+from backend.db import db, Patient, MedicalRecord, LabResult, GenomicData, DoctorNote
+from backend.analysis import HealthAnalyzer
+
+class TestHealthAnalyzer(unittest.TestCase):
+
+    def setUp(self):
+        self.app = Flask(__name__)
+        self.app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite://'
+        db.init_app(self.app)
+        self.ctx = self.app.app_context()
+        self.ctx.push()
+        db.create_all()
+
+        patient = Patient(name="Jane Roe", age=58, gender="Female")
+        db.session.add(patient)
+        db.session.commit()
+        self.patient_id = patient.id
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.ctx.pop()
+
+    def _seed(self, days, offset=0):
+        start = datetime(2023, 1, 1)
+        # Inserted newest first so results only come out sorted if the loader sorts
+        for i in reversed(range(offset, offset + days)):
+            date = start + timedelta(days=i)
+            db.session.add(MedicalRecord(patient_id=self.patient_id, date=date, systolic_bp=120 + i, diastolic_bp=80))
+            db.session.add(LabResult(patient_id=self.patient_id, date=date, test_type="Hemoglobin A1C", result_value=5.0 + i * 0.1, unit="%", flag="Normal"))
+            db.session.add(LabResult(patient_id=self.patient_id, date=date, test_type="Glucose", result_value=90.0, unit="mg/dL", flag="Normal"))
+            db.session.add(DoctorNote(patient_id=self.patient_id, date=date, doctor_name="Dr. Smith", note_content=f"Visit {i}", sentiment="Stable"))
+        if not offset:
+            db.session.add(GenomicData(patient_id=self.patient_id, gene_marker="chr17:43044295", variant="A>G", risk_association="Cancer Susceptibility", significance="Pathogenic"))
+        db.session.commit()
+        db.session.expunge_all()
+
+    def _count_queries(self, fn):
+        statements = []
+        listener = lambda *args: statements.append(args[2])
+        event.listen(db.engine, "before_cursor_execute", listener)
+        try:
+            result = fn()
+        finally:
+            event.remove(db.engine, "before_cursor_execute", listener)
+        return result, len(statements)
+
+    def test_query_count_does_not_grow_with_history(self):
+        self._seed(5)
+        _, small = self._count_queries(lambda: HealthAnalyzer(self.patient_id).generate_comprehensive_summary())
+        db.session.expunge_all()
+
+        self._seed(45, offset=5)
+        _, large = self._count_queries(lambda: HealthAnalyzer(self.patient_id).generate_comprehensive_summary())
+
+        self.assertEqual(small, large)
+        self.assertLessEqual(large, 6)
+
+    def test_summary_uses_date_ordered_data(self):
+        self._seed(10)
+        analyzer = HealthAnalyzer(self.patient_id)
+        summary = analyzer.generate_comprehensive_summary()
+
+        dates = [r.date.isoformat() for r in analyzer.data.medical_records]
+        self.assertEqual(dates, sorted(dates))
+        self.assertNotIn('history', summary)
+        self.assertEqual(summary['history_summary']['vitals']['count'], 10)
+        self.assertEqual(summary['history_summary']['vitals']['last'], dates[-1])
+        self.assertEqual(summary['trends']['blood_pressure'], {'status': "Stable", 'current': "129/80", 'previous': "128/80"})
+        self.assertEqual(summary['trends']['labs']['Hemoglobin A1C']['current'], "5.9 %")
+        self.assertEqual(summary['recent_clinical_notes'][0]['summary'], "Visit 9...")
+
+        conditions = {p['condition']: p for p in summary['predictions']}
+        self.assertEqual(conditions['Diabetes']['probability'], "Medium")
+        self.assertIn("Unit Specific Cancer", conditions)
+
+    def test_missing_patient(self):
+        with self.assertRaises(ValueError):
+            HealthAnalyzer(9999)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,121 @@
+import unittest
+import os
+import sys
+from datetime import datetime, timedelta
+
+# Add parent directory to path to import backend modules
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
+
+from flask import Flask
+from backend.db import db, Patient, MedicalRecord, LabResult
+from backend.history import get_history, parse_date_range, lttb, bucket_stats
+
+START = datetime(2023, 1, 1)
+
+class TestHistory(unittest.TestCase):
+
+    def setUp(self):
+        self.app = Flask(__name__)
+        self.app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite://'
+        db.init_app(self.app)
+        self.ctx = self.app.app_context()
+        self.ctx.push()
+        db.create_all()
+
+        patient = Patient(name="Jane Roe", age=58, gender="Female")
+        db.session.add(patient)
+        db.session.commit()
+        self.patient_id = patient.id
+
+        # Two readings per day (labs: at the same time, so pages have to break ties on id)
+        for i in reversed(range(100)):
+            date = START + timedelta(days=i // 2)
+            db.session.add(MedicalRecord(patient_id=self.patient_id, date=date + timedelta(hours=12 * (i % 2)),
+                                         systolic_bp=100 + i, diastolic_bp=70))
+            db.session.add(LabResult(patient_id=self.patient_id, date=date, test_type="Glucose" if i % 2 else "Hemoglobin A1C",
+                                     result_value=float(i), unit="mg/dL", flag="Normal"))
+        db.session.commit()
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.ctx.pop()
+
+    def test_cursor_pages_cover_every_row_once(self):
+        seen, cursor = [], None
+        while True:
+            page = get_history(self.patient_id, 'vitals', cursor=cursor, limit=7)
+            seen += page['items']
+            cursor = page['next_cursor']
+            if cursor is None:
+                break
+        self.assertEqual(len(seen), 100)
+        self.assertEqual(len({(v['date'], v['systolic_bp']) for v in seen}), 100)
+        self.assertEqual([v['date'] for v in seen], sorted(v['date'] for v in seen))
+
+    def test_date_range_and_test_type(self):
+        start, end = parse_date_range("2023-01-11", "2023-01-20")
+        page = get_history(self.patient_id, 'labs', start=start, end=end, test_type="Glucose")
+        self.assertEqual(len(page['items']), 10) # 10 days, whole end day included
+        self.assertEqual({l['test_type'] for l in page['items']}, {"Glucose"})
+        self.assertIsNone(page['next_cursor'])
+
+    def test_lttb_downsampling(self):
+        result = get_history(self.patient_id, 'vitals', points=20)
+        items = result['items']
+        self.assertEqual(len(items), 20)
+        self.assertEqual(result['downsampled']['source_rows'], 100)
+        full = get_history(self.patient_id, 'vitals', limit=1000)['items']
+        self.assertEqual(items[0], full[0])
+        self.assertEqual(items[-1], full[-1])
+
+    def test_labs_downsampled_per_test_type(self):
+        items = get_history(self.patient_id, 'labs', points=10)['items']
+        counts = {}
+        for item in items:
+            counts[item['test_type']] = counts.get(item['test_type'], 0) + 1
+        self.assertEqual(counts, {"Glucose": 10, "Hemoglobin A1C": 10})
+
+    def test_bucket_downsampling(self):
+        items = get_history(self.patient_id, 'vitals', points=5, method='bucket')['items']
+        self.assertEqual(sum(item['count'] for item in items), 100)
+        self.assertEqual(items[0]['systolic_bp_min'], 100)
+        self.assertEqual(items[-1]['systolic_bp_max'], 199)
+
+    def test_lttb_keeps_spike(self):
+        rows = [MedicalRecord(date=START + timedelta(days=i), systolic_bp=120) for i in range(100)]
+        rows[50].systolic_bp = 200
+        picked = lttb(rows, 10, 'systolic_bp')
+        self.assertIn(rows[50], picked)
+
+    def test_lttb_keeps_visits_without_blood_pressure(self):
+        for i in range(10):
+            db.session.add(MedicalRecord(patient_id=self.patient_id, date=START + timedelta(days=100 + i), heart_rate=70 + i))
+        db.session.commit()
+
+        items = get_history(self.patient_id, 'vitals', points=200)['items']
+
+        self.assertEqual(len(items), 110)
+        self.assertEqual(items[-1]['heart_rate'], 79)
+
+    def test_bucket_stats_single_day(self):
+        rows = [MedicalRecord(date=START, systolic_bp=v) for v in (110, 130)]
+        buckets = bucket_stats(rows, 4, ('systolic_bp',))
+        self.assertEqual(len(buckets), 1)
+        self.assertEqual(buckets[0]['systolic_bp'], (110, 130, 120))
+
+    def test_bad_arguments(self):
+        with self.assertRaises(ValueError):
+            get_history(self.patient_id, 'vitals', cursor="not-a-cursor")
+        with self.assertRaises(ValueError):
+            get_history(self.patient_id, 'notes')
+        with self.assertRaises(ValueError):
+            parse_date_range("yesterday", None)
+        for points in (-5, 0, 1):
+            with self.assertRaises(ValueError):
+                get_history(self.patient_id, 'vitals', points=points)
+        with self.assertRaises(ValueError):
+            get_history(self.patient_id, 'vitals', limit=0)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,157 @@
+import unittest
+import os
+import sys
+import tempfile
+from unittest.mock import patch
+
+# Add parent directory to path to import backend modules
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
+
+from flask import Flask
+from backend.db import db, AnalysisSnapshot, IngestionJob, LabResult, Patient
+
+CSV_BODY = (
+    "Patient Name,Age,Gender,Visit Date,Test Name,Result Value,Unit,Reference Range,Status\n"
+    "Jane Roe,41,Female,2024-01-05,Glucose,101,mg/dL,70-99,High\n"
+    "Jane Roe,41,Female,2024-02-05,Glucose,95,mg/dL,70-99,Normal\n"
+)
+
+class TestIngestionJobQueue(unittest.TestCase):
+
+    def setUp(self):
+        # Imported lazily so test_parsers can mock pypdf/pydicom first
+        from backend.jobs import IngestionJobQueue
+        self.queue_cls = IngestionJobQueue
+
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.app = Flask(__name__)
+        # File-backed so worker threads share the database
+        self.app.config['SQLALCHEMY_DATABASE_URI'] = f"sqlite:///{os.path.join(self.tmpdir.name, 'jobs.db')}"
+        self.app.config['INGEST_WORKERS'] = 1
+        db.init_app(self.app)
+        with self.app.app_context():
+            db.create_all()
+
+    def tearDown(self):
+        with self.app.app_context():
+            db.session.remove()
+            db.engine.dispose()
+        self.tmpdir.cleanup()
+
+    def _write(self, name, body):
+        path = os.path.join(self.tmpdir.name, name)
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(body)
+        return path
+
+    def test_job_runs_in_background_and_reports_progress(self):
+        queue = self.queue_cls(self.app)
+        path = self._write("labs.csv", CSV_BODY)
+
+        with self.app.app_context():
+            job_id = queue.submit(path).id
+        queue.shutdown()
+
+        with self.app.app_context():
+            job = queue.get(job_id)
+            self.assertEqual(job['status'], "succeeded")
+            self.assertEqual(job['progress'], 2)
+            self.assertIsNone(job['error'])
+            self.assertEqual(LabResult.query.count(), 2)
+
+    def test_failed_job_records_error(self):
+        queue = self.queue_cls(self.app)
+        path = self._write("notes.txt", "not ingestible")
+
+        with self.app.app_context():
+            job_id = queue.submit(path).id
+        queue.shutdown()
+
+        with self.app.app_context():
+            job = queue.get(job_id)
+            self.assertEqual(job['status'], "failed")
+            self.assertIn("Unsupported file format", job['error'])
+
+    def test_skipped_rows_are_reported_as_a_warning(self):
+        queue = self.queue_cls(self.app)
+        path = self._write("labs.csv", CSV_BODY + "Jane Roe,41,Female,03/05/2024,Glucose,99,mg/dL,70-99,Normal\n")
+
+        with self.app.app_context():
+            job_id = queue.submit(path).id
+        queue.shutdown()
+
+        with self.app.app_context():
+            job = queue.get(job_id)
+            self.assertEqual(job['status'], "succeeded")
+            self.assertIn("1 row(s) skipped without a valid date", job['warning'])
+
+    def test_repeated_upload_ends_as_duplicate_job(self):
+        queue = self.queue_cls(self.app)
+        path = self._write("labs.csv", CSV_BODY)
+        again = self._write("labs-again.csv", CSV_BODY)
+
+        with self.app.app_context():
+            first = queue.submit(path).id
+            second = queue.submit(again).id
+        queue.shutdown()
+
+        with self.app.app_context():
+            self.assertEqual(queue.get(first)['status'], "succeeded")
+            self.assertEqual(queue.get(second)['status'], "duplicate")
+            self.assertIsNone(queue.get(second)['error'])
+            self.assertEqual(LabResult.query.count(), 2)
+
+    def test_rebuilds_only_the_snapshots_the_job_touched(self):
+        from backend.snapshots import mark_dirty
+        with self.app.app_context():
+            other = Patient(name="John Doe", age=50, gender="Male")
+            db.session.add(other)
+            db.session.commit()
+            other_id = other.id
+            mark_dirty([other_id]) # stale from some earlier ingest
+            db.session.commit()
+
+        queue = self.queue_cls(self.app)
+        path = self._write("labs.csv", CSV_BODY)
+        with self.app.app_context():
+            job_id = queue.submit(path).id
+        queue.shutdown()
+
+        with self.app.app_context():
+            self.assertEqual(queue.get(job_id)['status'], "succeeded")
+            jane = Patient.query.filter_by(name="Jane Roe").one()
+            snapshot = db.session.get(AnalysisSnapshot, jane.id)
+            self.assertEqual(snapshot.built_version, snapshot.version)
+            self.assertEqual(db.session.get(AnalysisSnapshot, other_id).built_version, 0)
+
+    def test_failed_snapshot_rebuild_is_noted_on_the_job(self):
+        queue = self.queue_cls(self.app)
+        path = self._write("labs.csv", CSV_BODY)
+
+        with patch("backend.snapshots.rebuild_dirty", side_effect=RuntimeError("boom")):
+            with self.app.app_context():
+                job_id = queue.submit(path).id
+            queue.shutdown()
+
+        with self.app.app_context():
+            job = queue.get(job_id)
+            self.assertEqual(job['status'], "succeeded")
+            self.assertIn("Snapshot rebuild failed: boom", job['warning'])
+
+    def test_pending_jobs_resume_on_start(self):
+        path = self._write("labs.csv", CSV_BODY)
+        with self.app.app_context():
+            # Simulates a job interrupted by a restart
+            db.session.add(IngestionJob(filepath=path, filename="labs.csv", status="running"))
+            db.session.commit()
+
+        queue = self.queue_cls(self.app)
+        queue.shutdown()
+
+        with self.app.app_context():
+            job = IngestionJob.query.one()
+            self.assertEqual(job.status, "succeeded")
+            self.assertEqual(LabResult.query.count(), 2)
+
+if __name__ == '__main__':
+    unittest.main()
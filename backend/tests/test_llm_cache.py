@@ -0,0 +1,133 @@
+import asyncio
+import threading
+import unittest
+from unittest.mock import AsyncMock, MagicMock, patch
+import os
+import sys
+import tempfile
+
+# Add parent directory to path to import backend modules
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
+
+from backend.agents import ollama_client
+from backend.agents.llm_cache import LLMResponseCache
+from backend.agents.llm_client import LLMError
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+class TestLLMResponseCache(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.clock = FakeClock()
+        self.path = os.path.join(self.tmpdir.name, "cache.db")
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def _cache(self, **kwargs):
+        return LLMResponseCache(path=self.path, clock=self.clock, **kwargs)
+
+    def test_key_covers_every_request_parameter(self):
+        base = ("model", "system", "prompt", 0.3, 500)
+        key = LLMResponseCache.make_key(*base)
+        self.assertEqual(key, LLMResponseCache.make_key(*base))
+        for i, changed in enumerate(["model2", "system2", "prompt2", 0.4, 501]):
+            params = list(base)
+            params[i] = changed
+            self.assertNotEqual(key, LLMResponseCache.make_key(*params))
+
+    def test_hit_miss_and_persistence(self):
+        cache = self._cache()
+        self.assertIsNone(cache.get("k"))
+        cache.set("k", "summary")
+        self.assertEqual(cache.get("k"), "summary")
+
+        # A new instance on the same file sees the entry
+        self.assertEqual(self._cache().get("k"), "summary")
+        self.assertEqual(cache.stats()['hits'], 1)
+        self.assertEqual(cache.stats()['misses'], 1)
+
+    def test_ttl_expiry(self):
+        cache = self._cache(ttl=60)
+        cache.set("k", "summary")
+        self.clock.now += 61
+        self.assertIsNone(cache.get("k"))
+        self.assertEqual(cache.stats()['entries'], 0)
+
+    def test_lru_eviction(self):
+        cache = self._cache(max_entries=2)
+        cache.set("a", "1")
+        self.clock.now += 1
+        cache.set("b", "2")
+        self.clock.now += 1
+        cache.get("a") # "b" is now least recently used
+        self.clock.now += 1
+        cache.set("c", "3")
+
+        self.assertEqual(cache.get("a"), "1")
+        self.assertIsNone(cache.get("b"))
+        self.assertEqual(cache.get("c"), "3")
+        self.assertEqual(cache.stats()['evictions'], 1)
+
+class TestQueryOllamaCaching(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        patcher = patch.object(ollama_client, '_cache', LLMResponseCache(path=os.path.join(self.tmpdir.name, "cache.db")))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.addCleanup(self.tmpdir.cleanup)
+
+        self.client = MagicMock()
+        self.client.complete.return_value = "cached answer"
+        client_patcher = patch.object(ollama_client, 'get_client', return_value=self.client)
+        client_patcher.start()
+        self.addCleanup(client_patcher.stop)
+
+    def test_repeat_query_served_from_cache(self):
+        first = ollama_client.query_ollama("data", system_prompt="sys")
+        second = ollama_client.query_ollama("data", system_prompt="sys")
+
+        self.assertEqual(first, "cached answer")
+        self.assertEqual(second, "cached answer")
+        self.assertEqual(self.client.complete.call_count, 1)
+
+    def test_errors_are_not_cached(self):
+        self.client.complete.side_effect = LLMError("rate limited", status=429)
+        with self.assertRaises(LLMError):
+            ollama_client.query_ollama("data", system_prompt="sys")
+
+        self.client.complete.side_effect = None
+        self.assertEqual(ollama_client.query_ollama("data", system_prompt="sys"), "cached answer")
+
+    def test_async_query_uses_the_cache_off_the_event_loop(self):
+        self.client.acomplete = AsyncMock(return_value="cached answer")
+        cache = ollama_client._cache
+        threads = []
+        original_get = cache.get
+        def get(key):
+            threads.append(threading.current_thread())
+            return original_get(key)
+
+        async def run():
+            loop_thread = threading.current_thread()
+            first = await ollama_client.query_ollama_async("data", system_prompt="sys")
+            second = await ollama_client.query_ollama_async("data", system_prompt="sys")
+            return loop_thread, first, second
+
+        with patch.object(cache, 'get', side_effect=get):
+            loop_thread, first, second = asyncio.run(run())
+
+        self.assertEqual((first, second), ("cached answer", "cached answer"))
+        self.client.acomplete.assert_awaited_once()
+        self.assertEqual(len(threads), 2)
+        self.assertNotIn(loop_thread, threads)
+
+if __name__ == '__main__':
+    unittest.main()
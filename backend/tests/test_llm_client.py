@@ -0,0 +1,123 @@
+import unittest
+import asyncio
+import os
+import sys
+import time
+
+# Add parent directory to path to import backend modules
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
+
+from backend.agents.fake_server import FakeLLMServer
+from backend.agents.llm_client import LLMClient, LLMError, LLMTimeoutError, TokenBucket
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+class TestTokenBucket(unittest.TestCase):
+
+    def test_refill_and_overdraft(self):
+        clock = FakeClock()
+        bucket = TokenBucket(60, clock=clock) # 1 per second, burst of 60
+
+        self.assertEqual(bucket.delay(60), 0)
+        bucket.take(60)
+        self.assertEqual(bucket.delay(1), 1.0)
+        clock.now += 0.5
+        self.assertEqual(bucket.delay(1), 0.5)
+
+        # A reply that used more tokens than estimated is charged afterwards
+        bucket.give_back(-10)
+        self.assertEqual(bucket.delay(1), 10.5)
+        # More than a full bucket only waits for a full bucket
+        clock.now += 100
+        self.assertEqual(bucket.delay(1000), 0)
+
+class TestLLMClient(unittest.TestCase):
+
+    def setUp(self):
+        self.server = FakeLLMServer().start()
+        self.addCleanup(self.server.stop)
+
+    def _client(self, **kwargs):
+        options = dict(api_key="test", base_url=self.server.url, model="fake-model", rpm=0, tpm=0, backoff_base=0.01)
+        options.update(kwargs)
+        client = LLMClient(**options)
+        self.addCleanup(client.close)
+        return client
+
+    def test_completion_and_usage_stats(self):
+        client = self._client()
+        reply = client.complete("BP 140/90", system_prompt="You are a cardiologist. Be brief.")
+
+        self.assertEqual(reply, "report for: You are a cardiologist")
+        self.assertEqual(self.server.requests[0]["messages"][0]["role"], "system")
+        stats = client.stats()
+        self.assertEqual((stats["requests"], stats["succeeded"], stats["retries"]), (1, 1, 0))
+        self.assertGreater(stats["prompt_tokens"], 0)
+        self.assertIn("p95", stats["latency_ms"])
+
+    def test_rate_limited_request_is_retried_after_retry_after(self):
+        self.server.fail_next(429, retry_after=0.3)
+        self.server.fail_next(503)
+        client = self._client()
+
+        start = time.perf_counter()
+        self.assertTrue(client.complete("data"))
+
+        self.assertGreaterEqual(time.perf_counter() - start, 0.3)
+        self.assertEqual(len(self.server.requests), 3)
+        stats = client.stats()
+        self.assertEqual((stats["retries"], stats["rate_limited"], stats["failed"]), (2, 1, 0))
+
+    def test_stream_yields_pieces_and_retries_before_the_first(self):
+        self.server.fail_next(503)
+        client = self._client()
+
+        pieces = list(client.stream("BP 140/90", system_prompt="You are a cardiologist. Be brief."))
+
+        self.assertEqual(pieces, ["report ", "for: ", "You ", "are ", "a ", "cardiologist"])
+        self.assertTrue(self.server.requests[-1]["stream"])
+        stats = client.stats()
+        self.assertEqual((stats["succeeded"], stats["retries"]), (1, 1))
+        self.assertGreater(stats["completion_tokens"], 0) # usage from the last chunk
+
+    def test_client_errors_raise_without_retry(self):
+        self.server.fail_next(400)
+        with self.assertRaises(LLMError) as error:
+            self._client().complete("data")
+        self.assertEqual(error.exception.status, 400)
+        self.assertEqual(len(self.server.requests), 1)
+
+    def test_timeout_after_retries(self):
+        self.server.latency = 1.0
+        with self.assertRaises(LLMTimeoutError):
+            self._client(timeout=0.2, max_retries=1).complete("data")
+        self.assertEqual(len(self.server.requests), 2)
+
+    def test_async_callers_share_the_concurrency_limit(self):
+        self.server.latency = 0.1
+        client = self._client(max_concurrency=2)
+
+        async def run():
+            return await asyncio.gather(*(client.acomplete(f"patient {i}") for i in range(6)))
+
+        self.assertEqual(len(asyncio.run(run())), 6)
+        self.assertEqual(self.server.max_in_flight, 2)
+
+    def test_requests_per_minute_limit(self):
+        client = self._client(rpm=600) # burst of 600, then one every 0.1s
+        client.request_bucket.tokens = 1
+
+        start = time.perf_counter()
+        for _ in range(3):
+            client.complete("data")
+
+        self.assertGreaterEqual(time.perf_counter() - start, 0.18)
+        self.assertGreater(client.stats()["throttled_seconds"], 0)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,125 @@
+import unittest
+import json
+import os
+import sys
+import tempfile
+import time
+
+# Add parent directory to path to import backend modules
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
+
+from flask import Flask
+from backend.db import db
+from backend import metrics
+
+CSV_HEADER = "Patient Name,Age,Gender,Visit Date,Test Name,Result Value,Unit,Reference Range,Status\n"
+CSV_ROWS = (
+    "Jane Roe,41,Female,2024-01-05,Glucose,101,mg/dL,70-99,High\n"
+    "Jane Roe,41,Female,2024-01-05,Systolic BP,128,mmHg,<120,High\n"
+    "Jane Roe,41,Female,2024-01-05,Glucose,,mg/dL,70-99,\n"
+)
+
+class TestIngestMetrics(unittest.TestCase):
+
+    def setUp(self):
+        # Imported lazily so test_parsers can mock pypdf/pydicom first
+        from backend import ingestion
+        self.ingestion = ingestion
+
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.app = Flask(__name__)
+        # File-backed so the job queue's worker thread shares the database
+        self.app.config['SQLALCHEMY_DATABASE_URI'] = f"sqlite:///{os.path.join(self.tmpdir.name, 'metrics.db')}"
+        self.app.config['INGEST_WORKERS'] = 1
+        db.init_app(self.app)
+        with self.app.app_context():
+            db.create_all()
+        metrics.registry.reset()
+
+    def tearDown(self):
+        with self.app.app_context():
+            db.session.remove()
+            db.engine.dispose()
+        self.tmpdir.cleanup()
+
+    def _write(self, name, body):
+        path = os.path.join(self.tmpdir.name, name)
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(body)
+        return path
+
+    def _counter(self, name, **labels):
+        return metrics.registry.counters.get((name, tuple(sorted(labels.items()))), 0)
+
+    def test_csv_counters_and_stages(self):
+        first = self._write("jan.csv", CSV_HEADER + CSV_ROWS)
+        # Repeats the glucose result already stored from jan.csv
+        second = self._write("jan-copy.csv", CSV_HEADER + CSV_ROWS.splitlines(True)[0])
+
+        with self.app.app_context():
+            progress = self.ingestion.IngestProgress()
+            self.assertTrue(self.ingestion.process_file(first, progress=progress))
+            self.assertTrue(self.ingestion.process_file(second))
+
+        self.assertEqual(self._counter("rows_parsed", format="csv"), 4)
+        self.assertEqual(self._counter("rows_skipped", format="csv", reason="invalid"), 1)
+        self.assertEqual(self._counter("rows_skipped", format="csv", reason="duplicate"), 1)
+        self.assertEqual(self._counter("patients_created", format="csv"), 1)
+        self.assertEqual(self._counter("bytes_read", format="csv"), os.path.getsize(first) + os.path.getsize(second))
+        self.assertEqual(self._counter("files", format="csv", status="succeeded"), 2)
+
+        profile = progress.profile.to_dict()
+        self.assertEqual(profile["format"], "csv")
+        self.assertEqual(profile["counters"]["rows_parsed"], 3)
+        self.assertLessEqual({"fingerprint", "parse", "resolve_patients", "flush", "commit"}, set(profile["stages"]))
+
+        text = metrics.registry.render()
+        self.assertIn('ingest_rows_parsed_total{format="csv"} 4', text)
+        self.assertIn('ingest_stage_seconds_count{format="csv",stage="commit"}', text)
+        self.assertIn('ingest_stage_seconds_bucket{format="csv",stage="parse",le="+Inf"}', text)
+
+    def test_nested_stages_are_not_counted_twice(self):
+        def rows():
+            time.sleep(0.02)
+            yield 1
+
+        with metrics.profile("notes.pdf", "pdf") as profile:
+            with metrics.stage("flush"):
+                time.sleep(0.02)
+                with metrics.stage("resolve_patients"):
+                    time.sleep(0.05)
+            for _ in metrics.timed(rows(), "parse"):
+                with metrics.stage("commit"):
+                    time.sleep(0.02)
+
+        stages = {name: totals["seconds"] for name, totals in profile.to_dict()["stages"].items()}
+        self.assertGreaterEqual(stages["resolve_patients"], 0.05)
+        self.assertLess(stages["flush"], 0.045)
+        self.assertLess(stages["parse"], 0.04)
+        self.assertLessEqual(sum(stages.values()), profile.seconds)
+
+    def test_job_profile_dump(self):
+        from backend.jobs import IngestionJobQueue
+        profile_dir = os.path.join(self.tmpdir.name, "profiles")
+        self.app.config['INGEST_PROFILE_DIR'] = profile_dir
+        path = self._write("labs.csv", CSV_HEADER + CSV_ROWS)
+
+        queue = IngestionJobQueue(self.app)
+        with self.app.app_context():
+            job_id = queue.submit(path).id
+        queue.shutdown()
+
+        with open(os.path.join(profile_dir, f"job-{job_id}.json")) as f:
+            profile = json.load(f)
+        self.assertEqual(profile["file"], path)
+        self.assertEqual(profile["counters"]["files:succeeded"], 1)
+        self.assertEqual(profile["stages"]["flush"]["calls"], 1)
+
+    def test_failed_file_is_counted(self):
+        path = self._write("notes.txt", "not a supported format")
+        with self.app.app_context():
+            self.assertFalse(self.ingestion.process_file(path))
+        self.assertEqual(self._counter("files", format="other", status="failed"), 1)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -106,10 +106,9 @@ class TestParsers(unittest.TestCase):
         self.assertEqual(kwargs['body_part'], "CHEST")
 
     @patch('builtins.open', new_callable=unittest.mock.mock_open, read_data="##fileformat=VCFv4.2\n#CHROM\tPOS\tID\tREF\tALT\tQUAL\tFILTER\tINFO\tFORMAT\tSample1\nchr1\t100\t.\tA\tT\t.\t.\tRisk=High")
-    @patch('backend.ingestion.GenomicData')
     @patch('backend.ingestion.db.session')
     @patch('backend.ingestion._get_or_create_patient')
-    def test_vcf_parsing(self, mock_get_patient, mock_session, mock_genomic, mock_open):
+    def test_vcf_parsing(self, mock_get_patient, mock_session, mock_open):
          # Setup mocks
         mock_patient = MagicMock()
         mock_patient.id = 3
@@ -120,10 +119,13 @@ class TestParsers(unittest.TestCase):
         
         # Verify
         self.assertTrue(result)
-        mock_genomic.assert_called()
-        args, kwargs = mock_genomic.call_args
-        self.assertEqual(kwargs['gene_marker'], "chr1:100")
-        self.assertEqual(kwargs['variant'], "A>T")
+        # Variants are written with one INSERT ... ON CONFLICT DO NOTHING per batch
+        inserts = [c.args for c in mock_session.execute.call_args_list
+                   if getattr(c.args[0], 'table', None) is not None and c.args[0].table.name == "genomic_data"]
+        self.assertEqual(len(inserts), 1)
+        stmt, rows = inserts[0]
+        self.assertEqual(rows[0]['gene_marker'], "chr1:100")
+        self.assertEqual(rows[0]['variant'], "A>T")
 
 if __name__ == '__main__':
     unittest.main()
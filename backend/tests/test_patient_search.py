@@ -0,0 +1,91 @@
+import unittest
+import os
+import sys
+
+# Add parent directory to path to import backend modules
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
+
+from flask import Flask
+from sqlalchemy import insert
+from backend.db import db, Patient
+from backend.search import search_patients, ensure_search_index, name_similarity
+
+NAMES = ["John Smith", "Johnny Appleseed", "Jane Roe", "Diana Bush", "Smith Johnson", "Robert Jones"]
+
+class TestPatientSearch(unittest.TestCase):
+
+    def setUp(self):
+        self.app = Flask(__name__)
+        self.app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite://'
+        db.init_app(self.app)
+        self.ctx = self.app.app_context()
+        self.ctx.push()
+        db.create_all()
+
+        db.session.add_all([Patient(name=name, age=40, gender="Female") for name in NAMES])
+        db.session.commit()
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.ctx.pop()
+
+    def _names(self, query, **kwargs):
+        return [p.name for p in search_patients(query, **kwargs)]
+
+    def test_prefix_match(self):
+        self.assertEqual(self._names("dia"), ["Diana Bush"])
+        self.assertEqual(self._names("jan ro"), ["Jane Roe"])
+        self.assertIn("Johnny Appleseed", self._names("john"))
+
+    def test_all_tokens_must_match(self):
+        self.assertEqual(self._names("john smi"), ["John Smith", "Smith Johnson"])
+
+    def test_typo_tolerant(self):
+        self.assertEqual(self._names("jhon smiht")[0], "John Smith")
+        self.assertEqual(self._names("daina"), ["Diana Bush"])
+        self.assertEqual(self._names("xyzzy"), [])
+
+    def test_prefix_matches_rank_before_fuzzy(self):
+        names = self._names("robert")
+        self.assertEqual(names[0], "Robert Jones")
+
+    def test_pagination(self):
+        everyone = self._names("j", limit=10)
+        self.assertEqual(len(everyone), 5)
+        pages = self._names("j", limit=2) + self._names("j", limit=2, offset=2) + self._names("j", limit=2, offset=4)
+        self.assertEqual(pages, everyone)
+
+    def test_index_follows_updates_and_deletes(self):
+        patient = Patient.query.filter_by(name="Jane Roe").first()
+        patient.name = "Janet Rowe"
+        db.session.commit()
+        self.assertEqual(self._names("janet"), ["Janet Rowe"])
+        self.assertEqual(self._names("roe"), [])
+
+        db.session.delete(patient)
+        db.session.commit()
+        self.assertEqual(self._names("janet"), [])
+
+    def test_bulk_inserts_are_indexed(self):
+        # Same path as the CSV ingest: Core insert, no ORM events
+        db.session.execute(insert(Patient), [{"name": f"Bulk Patient {i}", "age": 30, "gender": "Male"} for i in range(50)])
+        db.session.commit()
+        self.assertEqual(len(self._names("bulk", limit=100)), 50)
+
+    def test_backfills_existing_database(self):
+        for table in ("patient_fts", "patient_trigram"):
+            db.session.execute(db.text(f"DROP TABLE {table}"))
+        db.session.execute(db.text("DROP TRIGGER patient_search_ai"))
+        db.session.commit()
+
+        self.assertTrue(ensure_search_index())
+        self.assertEqual(self._names("dia"), ["Diana Bush"])
+
+    def test_name_similarity(self):
+        self.assertEqual(name_similarity(["john"], "John Smith"), 1.0)
+        self.assertGreaterEqual(name_similarity(["jhon"], "John Smith"), 0.7)
+        self.assertLess(name_similarity(["xyzzy"], "John Smith"), 0.7)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,155 @@
+import unittest
+from unittest.mock import patch
+import os
+import sys
+from concurrent.futures import ThreadPoolExecutor
+
+# Add parent directory to path to import backend modules
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
+
+from flask import Flask
+from backend.db import db, DoctorNote, NoteTextChunk
+from backend import pdf_text
+
+class FakeObject(dict):
+    def get_object(self):
+        return self
+
+class FakePage:
+    """Just enough of pypdf's PageObject: resources and extract_text."""
+    def __init__(self, text="", scanned=False):
+        self.text = text
+        self.modes = []
+        if scanned:
+            self.resources = FakeObject({"/XObject": FakeObject({"/Im0": FakeObject({"/Subtype": "/Image"})})})
+        else:
+            self.resources = FakeObject({"/Font": FakeObject({"/F1": FakeObject()})})
+
+    def get(self, key, default=None):
+        return self.resources if key == "/Resources" else default
+
+    def extract_text(self, extraction_mode="plain"):
+        self.modes.append(extraction_mode)
+        return self.text
+
+class FakeReader:
+    def __init__(self, pages):
+        self.pages = pages
+
+class ThreadExecutor(ThreadPoolExecutor):
+    # Stands in for the process pool: the fake reader only exists in this process
+    def __init__(self, max_workers, mp_context=None):
+        super().__init__(max_workers=max_workers)
+
+def report_pages(count, lines_per_page=40):
+    pages = [FakePage("\n".join(f"page {p} line {i}: BP stable" for i in range(lines_per_page))) for p in range(count)]
+    pages[0].text = "Patient Name: Jane Roe\n" + pages[0].text
+    return pages
+
+class TestPdfText(unittest.TestCase):
+
+    def setUp(self):
+        pdf_text._readers.clear()
+        self.original = (pdf_text.TEXT_CHUNK_CHARS, pdf_text.PARALLEL_MIN_PAGES, pdf_text.PAGES_PER_TASK)
+        pdf_text.TEXT_CHUNK_CHARS = 4000
+
+    def tearDown(self):
+        pdf_text.TEXT_CHUNK_CHARS, pdf_text.PARALLEL_MIN_PAGES, pdf_text.PAGES_PER_TASK = self.original
+
+    def _extract(self, pages, workers=1, max_pages=None):
+        with patch.object(pdf_text.pypdf, "PdfReader", return_value=FakeReader(pages)):
+            return pdf_text.extract_pdf("report.pdf", workers=workers, max_pages=max_pages)
+
+    def test_full_text_kept_in_page_aligned_chunks(self):
+        pages = report_pages(30)
+        expected = "".join(page.text + "\n" for page in pages)
+
+        result = self._extract(pages)
+
+        self.assertEqual(result.page_count, 30)
+        self.assertGreater(result.chars, pdf_text.PREVIEW_CHARS)
+        self.assertEqual(len(result.preview), pdf_text.PREVIEW_CHARS)
+        self.assertEqual(result.head_lines[0], "Patient Name: Jane Roe")
+        self.assertGreater(len(result.chunks), 1)
+        self.assertEqual(pdf_text.decompress_chunks(result.chunks), expected)
+        self.assertEqual(result.sha256, DoctorNote.hash_content(expected))
+        # Chunks cover consecutive page ranges
+        self.assertEqual(result.chunks[0]["page_start"], 0)
+        for previous, chunk in zip(result.chunks, result.chunks[1:]):
+            self.assertEqual(chunk["page_start"], previous["page_end"] + 1)
+        self.assertEqual(result.chunks[-1]["page_end"], 29)
+
+    def test_scanned_pages_are_not_extracted(self):
+        pages = report_pages(2) + [FakePage(scanned=True) for _ in range(3)]
+
+        result = self._extract(pages)
+
+        self.assertEqual(result.textless_pages, 3)
+        self.assertEqual([page.modes for page in pages[2:]], [[], [], []])
+        self.assertEqual(pages[0].modes, ["layout"])
+        self.assertIsNone(self._extract([FakePage(scanned=True)]).sha256)
+
+    def test_parallel_ranges_are_reassembled_in_order(self):
+        pdf_text.PARALLEL_MIN_PAGES, pdf_text.PAGES_PER_TASK = 4, 3
+        pages = report_pages(20, lines_per_page=2)
+
+        with patch.object(pdf_text, "ProcessPoolExecutor", ThreadExecutor):
+            result = self._extract(pages, workers=4)
+
+        self.assertEqual(pdf_text.decompress_chunks(result.chunks), "".join(page.text + "\n" for page in pages))
+
+    def test_max_pages_stops_early(self):
+        pdf_text.PARALLEL_MIN_PAGES, pdf_text.PAGES_PER_TASK = 4, 3
+        pages = report_pages(40, lines_per_page=2)
+
+        with patch.object(pdf_text, "ProcessPoolExecutor", ThreadExecutor):
+            result = self._extract(pages, workers=4, max_pages=7)
+
+        self.assertEqual(result.page_count, 7)
+        self.assertEqual(result.head_lines[0], "Patient Name: Jane Roe")
+        self.assertEqual([bool(page.modes) for page in pages], [True] * 7 + [False] * 33)
+
+class TestPdfIngestion(unittest.TestCase):
+
+    def setUp(self):
+        # Imported lazily so test_parsers can mock pypdf/pydicom first
+        from backend import ingestion
+        self.ingestion = ingestion
+
+        self.app = Flask(__name__)
+        self.app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite://'
+        db.init_app(self.app)
+        self.ctx = self.app.app_context()
+        self.ctx.push()
+        db.create_all()
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.ctx.pop()
+
+    def test_long_note_stored_whole(self):
+        pages = report_pages(40)
+        with patch.object(pdf_text.pypdf, "PdfReader", return_value=FakeReader(pages)):
+            record = self.ingestion._parse_pdf("discharge.pdf")
+        self.ingestion._store_record(record)
+        self.ingestion.store_records_bulk([record]) # same document again
+        db.session.commit()
+
+        note = DoctorNote.query.one()
+        self.assertEqual(record["patient_name"], "Jane Roe")
+        self.assertEqual(len(note.note_content), 5000)
+        self.assertEqual(note.full_text(), "".join(page.text + "\n" for page in pages))
+        self.assertEqual(NoteTextChunk.query.count(), len(record["text_chunks"]))
+
+    def test_pdf_max_pages_setting(self):
+        pages = report_pages(40)
+        self.app.config['PDF_MAX_PAGES'] = 3
+        with patch.object(pdf_text.pypdf, "PdfReader", return_value=FakeReader(pages)):
+            record = self.ingestion._parse_pdf("discharge.pdf")
+
+        self.assertEqual(record["patient_name"], "Jane Roe")
+        self.assertEqual([bool(page.modes) for page in pages], [True] * 3 + [False] * 37)
+
+if __name__ == '__main__':
+    unittest.main()
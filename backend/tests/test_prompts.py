@@ -0,0 +1,120 @@
+import unittest
+import os
+import sys
+import time
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+# Add parent directory to path to import backend modules
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
+
+from backend.agents.llm_client import estimate_tokens
+from backend.agents.prompts import vitals_input, labs_input, risks_input
+
+START = datetime(2023, 1, 1)
+
+def vital(day, systolic=120, diastolic=80, heart_rate=70):
+    return SimpleNamespace(date=START + timedelta(days=day), systolic_bp=systolic, diastolic_bp=diastolic,
+                           heart_rate=heart_rate, temperature=36.8)
+
+def lab(day, test_type, value, flag="Normal"):
+    return SimpleNamespace(date=START + timedelta(days=day), test_type=test_type, result_value=value, unit="%",
+                           reference_range="<5.7", flag=flag)
+
+def variant(i, significance):
+    return SimpleNamespace(id=i, gene_marker=f"GENE{i}", variant=f"rs{100000 + i}", significance=significance,
+                           risk_association="Cancer Susceptibility" if significance == "Pathogenic" else "Unknown")
+
+def patient(medical_records=(), lab_results=(), genomic_data=()):
+    return SimpleNamespace(medical_records=list(medical_records), lab_results=list(lab_results),
+                           genomic_data=list(genomic_data))
+
+class TestPromptBuilder(unittest.TestCase):
+
+    def test_compact_tables_without_ids_or_timestamps(self):
+        data = patient([vital(0, 128, 84, 72), vital(30, 142, 91, 78)], [lab(0, "A1C", 6.1, "High")])
+        trends = {"blood_pressure": {"status": "Rising", "current": "142/91", "previous": "128/84"},
+                  "labs": {"A1C": {"status": "Stable"}}}
+
+        vitals = vitals_input(data, trends)
+        labs = labs_input(data, trends)
+
+        self.assertIn("Blood pressure trend: Rising (latest 142/91, previous 128/84)", vitals)
+        self.assertIn("2023-01-01|128/84|72|36.8", vitals)
+        self.assertIn("A1C|6.1|%|High|<5.7|Stable|2023-01-01", labs)
+        for text in (vitals, labs):
+            self.assertNotIn("T00:00:00", text)
+            self.assertNotIn("'id'", text)
+            self.assertNotIn("omitted", text)
+
+    def test_large_genomics_fit_budget_with_pathogenic_first(self):
+        variants = [variant(i, "Benign") for i in range(3000)]
+        for i in (17, 1500, 2999):
+            variants[i] = variant(i, "Pathogenic")
+        variants[42] = variant(42, "Uncertain significance")
+        data = patient(genomic_data=variants)
+        predictions = [{"condition": "Unit Specific Cancer", "probability": "High", "severity": "Critical",
+                        "reason": "Pathogenic variant found in GENE17: Cancer Susceptibility"}]
+        old_prompt = str(predictions) + "\nGenomics: " + str([{"id": g.id, "gene_marker": g.gene_marker, "variant": g.variant,
+                                                              "risk_association": g.risk_association,
+                                                              "significance": g.significance} for g in variants])
+
+        start = time.perf_counter()
+        prompt = risks_input(data, predictions, budget=300)
+        self.assertLess(time.perf_counter() - start, 1.0)
+
+        self.assertLessEqual(estimate_tokens(prompt), 300)
+        self.assertGreater(estimate_tokens(old_prompt), 100 * 300)
+        self.assertIn("Unit Specific Cancer|High|Critical", prompt)
+        for i in (17, 1500, 2999, 42):
+            self.assertIn(f"GENE{i}|", prompt)
+        self.assertRegex(prompt, r"\(\+\d+ more omitted: \d+ Benign\)")
+        # Kept rows stay in their original order
+        self.assertLess(prompt.index("GENE17|"), prompt.index("GENE42|"))
+        self.assertLess(prompt.index("GENE1500|"), prompt.index("GENE2999|"))
+
+    def test_labs_keep_latest_per_test_then_abnormal(self):
+        labs = [lab(day, "Glucose", 90 + day % 7) for day in range(400)]
+        labs.insert(10, lab(10, "Glucose", 250, "High"))
+        labs.append(lab(401, "A1C", 6.8, "High"))
+        labs.append(lab(402, "LDL", 120))
+        prompt = labs_input(patient(lab_results=labs), {"labs": {}}, budget=150)
+
+        self.assertLessEqual(estimate_tokens(prompt), 150)
+        self.assertIn("A1C|6.8|%|High", prompt)
+        self.assertIn("LDL|120|", prompt)
+        self.assertIn("Glucose|90|%|Normal|<5.7||2024-02-04", prompt) # latest glucose (day 399)
+        self.assertIn("2023-01-11|Glucose|250|High", prompt) # old, but abnormal
+        self.assertIn("2024-02-03|Glucose|96|Normal", prompt) # then the newest normal ones
+        self.assertNotIn("2023-01-02|Glucose", prompt)
+        self.assertIn("more omitted)", prompt)
+
+    def test_vitals_keep_recent_and_abnormal_readings(self):
+        records = [vital(day) for day in range(500)]
+        records[5] = vital(5, 182, 110, 120)
+        prompt = vitals_input(patient(records), {}, budget=80)
+
+        self.assertLessEqual(estimate_tokens(prompt), 80)
+        self.assertIn("2023-01-06|182/110|120", prompt)
+        self.assertIn("2024-05-14|", prompt) # latest reading (day 499)
+        lines = [line for line in prompt.splitlines() if line[:4].isdigit()]
+        self.assertEqual(lines, sorted(lines)) # oldest first
+
+    def test_every_budget_is_respected(self):
+        data = patient([vital(day, 110 + day % 50) for day in range(300)],
+                       [lab(day, f"Test {day % 9}", day % 13, "High" if day % 5 == 0 else "Normal") for day in range(300)],
+                       [variant(i, ["Benign", "Pathogenic", "VUS"][i % 3]) for i in range(300)])
+        predictions = [{"condition": "Diabetes", "probability": "High", "severity": "High", "reason": "A1C 6.8%"}]
+        for budget in (20, 50, 100, 400, 1000, 5000):
+            for prompt in (vitals_input(data, {}, budget), labs_input(data, {}, budget),
+                           risks_input(data, predictions, budget)):
+                self.assertLessEqual(estimate_tokens(prompt), budget, prompt[:80])
+
+    def test_empty_patient(self):
+        data = patient()
+        self.assertEqual(vitals_input(data, {}), "No vitals recorded.")
+        self.assertEqual(labs_input(data, {}), "No lab results recorded.")
+        self.assertEqual(risks_input(data, []), "No rule-based risk flags.\nNo genomic variants recorded.")
+
+if __name__ == '__main__':
+    unittest.main()
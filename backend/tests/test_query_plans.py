@@ -0,0 +1,140 @@
+import unittest
+import os
+import re
+import sys
+import tempfile
+
+# Add parent directory to path to import backend modules
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
+
+from flask import Flask
+from sqlalchemy import event, update
+from backend.db import db, Patient, LabResult, AIAnalysis, IngestionJob, upgrade_schema
+from backend.history import get_history, parse_date_range
+from backend.patient_data import load_patient_data
+from backend.search import search_patients
+from backend.snapshots import get_analysis, rebuild_dirty
+
+CSV_BODY = (
+    "Patient Name,Age,Gender,Phone,Address,Visit Date,Test Name,Result Value,Unit,Reference Range,Status\n"
+    "Jane Roe,41,Female,555-0100,1 Main St,2024-01-05,Glucose,101,mg/dL,70-99,High\n"
+    "Jane Roe,41,Female,555-0100,1 Main St,2024-01-05,Systolic BP,150,mmHg,<120,High\n"
+    "Jane Roe,41,Female,555-0100,1 Main St,2024-02-05,Hemoglobin A1C,6.1,%,<5.7,High\n"
+    "John Doe,60,Male,555-0101,2 Main St,2024-01-06,Heart Rate,72,bpm,60-100,Normal\n"
+)
+
+# "SCAN patient" is a full table scan; "SCAN patient USING INDEX ...",
+# FTS5 "SCAN patient_fts VIRTUAL TABLE ..." and the schema table are not
+FULL_SCAN = re.compile(r"^SCAN (?!sqlite_)\w+\b(?! USING| VIRTUAL TABLE)")
+
+class TestQueryPlans(unittest.TestCase):
+    """Runs the hot per-patient queries and fails if any plan scans a whole table."""
+
+    def setUp(self):
+        from backend import ingestion
+        self.ingestion = ingestion
+
+        self.app = Flask(__name__)
+        self.app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite://'
+        db.init_app(self.app)
+        self.ctx = self.app.app_context()
+        self.ctx.push()
+        db.create_all()
+
+        self.tmpdir = tempfile.TemporaryDirectory()
+        path = os.path.join(self.tmpdir.name, "labs.csv")
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(CSV_BODY)
+        self.csv_path = path
+
+        self.statements = []
+        event.listen(db.engine, "before_cursor_execute", self._record)
+
+    def tearDown(self):
+        event.remove(db.engine, "before_cursor_execute", self._record)
+        db.session.remove()
+        db.drop_all()
+        self.ctx.pop()
+        self.tmpdir.cleanup()
+
+    def _record(self, conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith(("SELECT", "UPDATE", "DELETE")):
+            params = parameters[0] if executemany else parameters
+            self.statements.append((statement, params))
+
+    def _assert_no_full_scans(self):
+        event.remove(db.engine, "before_cursor_execute", self._record)
+        try:
+            self.assertTrue(self.statements)
+            with db.engine.connect() as conn:
+                for statement, params in self.statements:
+                    plan = conn.exec_driver_sql("EXPLAIN QUERY PLAN " + statement, params).all()
+                    for row in plan:
+                        self.assertIsNone(FULL_SCAN.match(row[-1]), f"{row[-1]}\n  in: {statement}")
+        finally:
+            event.listen(db.engine, "before_cursor_execute", self._record)
+
+    def _patient_id(self, name):
+        return db.session.execute(db.select(Patient.id).where(Patient.name == name)).scalar()
+
+    def test_ingestion_queries(self):
+        self.assertTrue(self.ingestion._process_csv(self.csv_path))
+        # Re-ingesting the same file takes the "patients and visits exist" path
+        self.assertTrue(self.ingestion._process_csv(self.csv_path))
+        self.ingestion._get_or_create_patient({"Patient Name": "Jane Roe"})
+        # DICOM slices of an already stored series
+        series = {"kind": "imaging", "patient_name": "Jane Roe", "modality": "CT", "series_uid": "1.2.3", "instance_count": 1}
+        self.ingestion.store_records_bulk([series])
+        self.ingestion.store_records_bulk([series])
+        self._assert_no_full_scans()
+
+    def test_patient_read_queries(self):
+        self.ingestion._process_csv(self.csv_path)
+        patient_id = self._patient_id("Jane Roe")
+        db.session.add(AIAnalysis(patient_id=patient_id, summary="ok"))
+        db.session.commit()
+        self.statements.clear()
+
+        load_patient_data(patient_id)
+        rebuild_dirty()
+        get_analysis(patient_id)
+        search_patients("jan")
+        # Latest AI summary, as in the /ai_summary endpoints
+        AIAnalysis.query.filter_by(patient_id=patient_id).order_by(AIAnalysis.date.desc()).first()
+        # History pages and chart series
+        page = get_history(patient_id, 'vitals', limit=1)
+        get_history(patient_id, 'vitals', cursor=page['next_cursor'], limit=1)
+        start, end = parse_date_range("2024-01-01", "2024-12-31")
+        get_history(patient_id, 'labs', start=start, end=end, test_type="Glucose", points=50)
+        self._assert_no_full_scans()
+
+    def test_job_queue_queries(self):
+        # Same statements as IngestionJobQueue._resume_pending/_claim
+        db.session.add(IngestionJob(filepath="/tmp/x.csv"))
+        db.session.commit()
+        self.statements.clear()
+
+        db.session.execute(update(IngestionJob).where(IngestionJob.status == "running").values(status="queued"))
+        db.session.query(IngestionJob.id).filter(IngestionJob.status == "queued").order_by(IngestionJob.id).all()
+        db.session.commit()
+        self._assert_no_full_scans()
+
+    def test_detects_full_scan(self):
+        Patient.query.filter(Patient.age > 40).all()
+        with self.assertRaises(AssertionError):
+            self._assert_no_full_scans()
+
+    def test_upgrade_schema_adds_missing_indexes(self):
+        db.session.execute(db.text("DROP INDEX ix_lab_result_patient_date"))
+        db.session.execute(db.text("CREATE INDEX ix_imaging_record_series ON imaging_record (series_uid)"))
+        db.session.commit()
+
+        upgrade_schema()
+
+        names = {index['name'] for index in db.inspect(db.engine).get_indexes('lab_result')}
+        self.assertIn('ix_lab_result_patient_date', names)
+        names = {index['name'] for index in db.inspect(db.engine).get_indexes('imaging_record')}
+        self.assertNotIn('ix_imaging_record_series', names)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,85 @@
+import unittest
+import os
+import random
+import sys
+from datetime import datetime, timedelta
+
+# Add parent directory to path to import backend modules
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
+
+from flask import Flask
+from backend.db import db, Patient, MedicalRecord, LabResult, GenomicData, PatientRisk
+from backend.analysis import HealthAnalyzer
+from backend.risk_batch import score_population, patient_risks, predictions_by_patient, run_batch
+
+class TestRiskBatch(unittest.TestCase):
+
+    def setUp(self):
+        self.app = Flask(__name__)
+        self.app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite://'
+        db.init_app(self.app)
+        self.ctx = self.app.app_context()
+        self.ctx.push()
+        db.create_all()
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.ctx.pop()
+
+    def _seed_random_population(self, count, rng):
+        start = datetime(2023, 1, 1)
+        for i in range(count):
+            patient = Patient(name=f"Patient {i}", age=50, gender="Female")
+            db.session.add(patient)
+            db.session.flush()
+            labs = set() # (date, test_type, value) is a lab's natural key
+            for _ in range(rng.randint(0, 4)):
+                # Few distinct dates so same-day ties are exercised
+                date = start + timedelta(days=rng.randint(0, 3))
+                labs.add((date, rng.choice(["Hemoglobin A1C", "A1C", "a1c", "Glucose"]), rng.choice([5.5, 5.7, 5.8, 6.4, 6.5, 9.1])))
+            for date, test_type, value in sorted(labs):
+                db.session.add(LabResult(patient_id=patient.id, date=date, unit="%", test_type=test_type, result_value=value))
+            visits = {} # one record per (patient, date)
+            for _ in range(rng.randint(0, 3)):
+                date = start + timedelta(days=rng.randint(0, 3))
+                visits[date] = rng.choice([None, 120, 140, 141, 165])
+            for date, systolic in visits.items():
+                db.session.add(MedicalRecord(patient_id=patient.id, date=date, systolic_bp=systolic))
+            for j in range(rng.randint(0, 3)):
+                db.session.add(GenomicData(patient_id=patient.id, gene_marker=f"chr{j}:{i}", variant="A>G",
+                                           risk_association=rng.choice(["Cancer Susceptibility", "Unknown"]),
+                                           significance=rng.choice(["Pathogenic", "Benign"])))
+        db.session.commit()
+
+    def test_matches_predict_risks_for_every_patient(self):
+        self._seed_random_population(150, random.Random(7))
+
+        batch = predictions_by_patient(score_population())
+
+        for patient in Patient.query.all():
+            expected = HealthAnalyzer(patient.id).predict_risks()
+            self.assertEqual(batch.get(patient.id, []), expected, f"patient {patient.id}")
+
+    def test_run_batch_rewrites_risk_table(self):
+        patient = Patient(name="Jane Roe", age=58, gender="Female")
+        db.session.add(patient)
+        db.session.flush()
+        db.session.add(LabResult(patient_id=patient.id, date=datetime(2024, 1, 1), test_type="Hemoglobin A1C", result_value=6.8))
+        db.session.add(MedicalRecord(patient_id=patient.id, date=datetime(2024, 1, 1), systolic_bp=150))
+        db.session.commit()
+
+        self.assertEqual(run_batch(), 2)
+        self.assertEqual(run_batch(), 2) # replaces rather than appends
+
+        rows = PatientRisk.query.filter_by(patient_id=patient.id).order_by(PatientRisk.id).all()
+        self.assertEqual([r.condition for r in rows], ["Diabetes", "Hypertension"])
+        self.assertEqual(rows[0].reason, "Latest A1C is 6.8% (Diabetic range)")
+        self.assertEqual([r['condition'] for r in patient_risks(patient.id)], ["Diabetes", "Hypertension"])
+
+    def test_empty_database(self):
+        self.assertTrue(score_population().empty)
+        self.assertEqual(run_batch(), 0)
+
+if __name__ == '__main__':
+    unittest.main()
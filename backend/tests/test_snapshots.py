@@ -0,0 +1,112 @@
+import unittest
+from unittest.mock import patch
+import os
+import sys
+import tempfile
+from datetime import datetime
+
+# Add parent directory to path to import backend modules
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
+
+from flask import Flask
+from backend.db import db, Patient, LabResult, AnalysisSnapshot
+from backend.snapshots import get_analysis, mark_dirty, rebuild_dirty
+
+class TestAnalysisSnapshots(unittest.TestCase):
+
+    def setUp(self):
+        self.app = Flask(__name__)
+        self.app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite://'
+        db.init_app(self.app)
+        self.ctx = self.app.app_context()
+        self.ctx.push()
+        db.create_all()
+
+        patient = Patient(name="Jane Roe", age=58, gender="Female")
+        db.session.add(patient)
+        db.session.commit()
+        self.patient_id = patient.id
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.ctx.pop()
+
+    def _add_lab(self, value):
+        db.session.add(LabResult(patient_id=self.patient_id, date=datetime(2024, 1, int(value) % 28 + 1),
+                                 test_type="Glucose", result_value=value, unit="mg/dL", flag="Normal"))
+
+    def test_reads_are_served_from_snapshot(self):
+        first = get_analysis(self.patient_id)
+        with patch('backend.analysis.HealthAnalyzer') as analyzer:
+            second = get_analysis(self.patient_id)
+            analyzer.assert_not_called()
+        self.assertEqual(first, second)
+        self.assertEqual(first['patient']['name'], "Jane Roe")
+
+    def test_mark_dirty_triggers_rebuild(self):
+        self.assertEqual(get_analysis(self.patient_id)['trends']['labs'], {})
+
+        self._add_lab(101.0)
+        mark_dirty([self.patient_id])
+        db.session.commit()
+
+        self.assertEqual(get_analysis(self.patient_id)['trends']['labs']['Glucose']['current'], "101.0 mg/dL")
+
+    def test_old_payload_format_is_rebuilt(self):
+        get_analysis(self.patient_id)
+        snapshot = db.session.get(AnalysisSnapshot, self.patient_id)
+        snapshot.payload = {"history": {"vitals": [], "labs": []}}
+        snapshot.payload_format = None # written before payload_format existed
+        db.session.commit()
+
+        payload = get_analysis(self.patient_id)
+        self.assertNotIn('history', payload)
+        self.assertIn('history_summary', payload)
+
+    def test_rebuild_dirty_in_background(self):
+        self._add_lab(95.0)
+        mark_dirty([self.patient_id])
+        db.session.commit()
+
+        self.assertEqual(rebuild_dirty(), 1)
+        self.assertEqual(rebuild_dirty(), 0)
+        snapshot = db.session.get(AnalysisSnapshot, self.patient_id)
+        self.assertEqual(snapshot.built_version, snapshot.version)
+
+    def test_invalidation_during_rebuild_is_not_lost(self):
+        from backend.analysis import HealthAnalyzer
+        original = HealthAnalyzer.generate_comprehensive_summary
+
+        def ingest_midway(analyzer):
+            payload = original(analyzer)
+            mark_dirty([self.patient_id]) # simulates an ingest landing mid-rebuild
+            return payload
+
+        with patch.object(HealthAnalyzer, 'generate_comprehensive_summary', ingest_midway):
+            get_analysis(self.patient_id)
+            mark_dirty([self.patient_id])
+            get_analysis(self.patient_id)
+
+        snapshot = db.session.get(AnalysisSnapshot, self.patient_id)
+        self.assertNotEqual(snapshot.built_version, snapshot.version)
+
+    def test_csv_ingest_invalidates_snapshot(self):
+        from backend.ingestion import _process_csv
+        get_analysis(self.patient_id)
+
+        with tempfile.TemporaryDirectory() as tmpdir:
+            path = os.path.join(tmpdir, "labs.csv")
+            with open(path, "w") as f:
+                f.write("Patient Name,Visit Date,Test Name,Result Value,Unit\n"
+                        "Jane Roe,2024-03-01,Glucose,120,mg/dL\n")
+            self.assertTrue(_process_csv(path))
+
+        self.assertEqual(get_analysis(self.patient_id)['trends']['labs']['Glucose']['current'], "120.0 mg/dL")
+
+    def test_missing_patient(self):
+        with self.assertRaises(ValueError):
+            get_analysis(9999)
+
+if __name__ == '__main__':
+    unittest.main()
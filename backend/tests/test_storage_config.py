@@ -0,0 +1,87 @@
+import unittest
+import os
+import sys
+import tempfile
+
+# Add parent directory to path to import backend modules
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
+
+from flask import Flask
+from sqlalchemy.exc import OperationalError
+from backend.config import init_db, engine_options, storage_config
+from backend.db import db, Patient
+
+class TestStorageConfig(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.ctx = None
+
+    def tearDown(self):
+        if self.ctx:
+            db.session.remove()
+            db.engine.dispose()
+            self.ctx.pop()
+        self.tmpdir.cleanup()
+
+    def _app(self, **config):
+        app = Flask(__name__)
+        app.config['SQLALCHEMY_DATABASE_URI'] = f"sqlite:///{os.path.join(self.tmpdir.name, 'health.db')}"
+        app.config.update(config)
+        init_db(app)
+        self.ctx = app.app_context()
+        self.ctx.push()
+        db.create_all()
+        return app
+
+    def _pragma(self, name):
+        return db.session.execute(db.text(f"PRAGMA {name}")).scalar()
+
+    def test_defaults(self):
+        app = self._app()
+        self.assertEqual(self._pragma("journal_mode"), "wal")
+        self.assertEqual(self._pragma("synchronous"), 1) # NORMAL
+        self.assertEqual(self._pragma("busy_timeout"), app.config['SQLITE_BUSY_TIMEOUT_MS'])
+        self.assertEqual(self._pragma("cache_size"), -app.config['SQLITE_CACHE_SIZE_KB'])
+        self.assertEqual(db.engine.pool.size(), app.config['DB_POOL_SIZE'])
+
+    def test_settings_are_switchable(self):
+        self._app(SQLITE_WAL=False, SQLITE_SYNCHRONOUS="FULL", SQLITE_BUSY_TIMEOUT_MS=250, DB_POOL_SIZE=3)
+        self.assertEqual(self._pragma("journal_mode"), "delete")
+        self.assertEqual(self._pragma("synchronous"), 2) # FULL
+        self.assertEqual(self._pragma("busy_timeout"), 250)
+        self.assertEqual(db.engine.pool.size(), 3)
+
+    def test_in_memory_database_keeps_default_pool(self):
+        config = {**storage_config(), 'SQLALCHEMY_DATABASE_URI': 'sqlite://'}
+        self.assertEqual(engine_options(config), {})
+
+    def _read_during_write(self):
+        # Another connection holds the write lock mid-ingest
+        writer = db.engine.raw_connection()
+        try:
+            db.session.add(Patient(name="Jane Roe", age=41, gender="Female"))
+            db.session.commit()
+
+            cursor = writer.cursor()
+            cursor.execute("BEGIN EXCLUSIVE")
+            cursor.execute("INSERT INTO patient (name, age, gender) VALUES ('John Doe', 60, 'Male')")
+            try:
+                return Patient.query.count()
+            finally:
+                writer.rollback()
+        finally:
+            writer.close()
+
+    def test_reads_continue_during_write_in_wal_mode(self):
+        self._app(SQLITE_BUSY_TIMEOUT_MS=200)
+        # The uncommitted insert is invisible, but the read isn't blocked
+        self.assertEqual(self._read_during_write(), 1)
+
+    def test_rollback_journal_blocks_reads_during_write(self):
+        self._app(SQLITE_WAL=False, SQLITE_BUSY_TIMEOUT_MS=200)
+        with self.assertRaises(OperationalError):
+            self._read_during_write()
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,48 @@
+import unittest
+import os
+import sys
+from types import SimpleNamespace
+
+# Add parent directory to path to import backend modules
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
+
+from backend.trends import compute_lab_trends, PercentChangeRule, SlopeRule
+
+def lab(test_type, value, unit="mg/dL", flag="Normal"):
+    return SimpleNamespace(test_type=test_type, result_value=value, unit=unit, flag=flag)
+
+class TestLabTrends(unittest.TestCase):
+
+    def test_percent_change_matches_previous_engine(self):
+        labs = [
+            lab("Glucose", 100), lab("LDL", 120), lab("Glucose", 106, flag="High"),
+            lab("LDL", 119), lab("A1C", 6.1, unit="%"), lab("HDL", 50), lab("HDL", 47)
+        ]
+        trends = compute_lab_trends(labs)
+
+        self.assertEqual(trends["Glucose"], {'status': "Rising", 'current': "106 mg/dL", 'flag': "High"})
+        self.assertEqual(trends["LDL"]['status'], "Stable")
+        self.assertEqual(trends["HDL"]['status'], "Falling")
+        self.assertEqual(trends["A1C"], {'status': "Stable", 'current': "6.1 %", 'flag': "Normal"})
+
+    def test_only_latest_two_values_matter_for_percent_change(self):
+        labs = [lab("Glucose", v) for v in (50, 200, 100, 101)]
+        self.assertEqual(compute_lab_trends(labs)["Glucose"]['status'], "Stable")
+
+    def test_slope_rule_over_window(self):
+        rule = SlopeRule(points=4, threshold=0.02)
+        self.assertEqual(rule.evaluate([100, 103, 106, 109]), "Rising")
+        self.assertEqual(rule.evaluate([109, 106, 103, 100]), "Falling")
+        self.assertEqual(rule.evaluate([100, 101, 99, 100]), "Stable")
+        # Readings outside the window are ignored
+        self.assertEqual(rule.evaluate([10, 100, 100, 100, 100]), "Stable")
+
+    def test_multiple_rules_report_signals(self):
+        labs = [lab("Glucose", v) for v in (90, 95, 100, 105, 106)]
+        trends = compute_lab_trends(labs, rules=(PercentChangeRule(), SlopeRule(points=5)))
+
+        self.assertEqual(trends["Glucose"]['status'], "Stable")
+        self.assertEqual(trends["Glucose"]['signals'], {"percent_change": "Stable", "slope_5": "Rising"})
+
+if __name__ == '__main__':
+    unittest.main()
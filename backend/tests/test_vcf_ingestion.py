@@ -0,0 +1,83 @@
+import unittest
+import gzip
+import os
+import sys
+import tempfile
+
+# Add parent directory to path to import backend modules
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
+
+from flask import Flask
+from backend.db import db, Patient, GenomicData
+
+VCF_HEADER = (
+    "##fileformat=VCFv4.2\n"
+    "##source=test\n"
+    "#CHROM\tPOS\tID\tREF\tALT\tQUAL\tFILTER\tINFO\tFORMAT\tSample^One\n"
+)
+
+class TestStreamingVcfIngestion(unittest.TestCase):
+
+    def setUp(self):
+        # Imported lazily so test_parsers can mock pypdf/pydicom first
+        from backend import ingestion
+        self.ingestion = ingestion
+
+        self.app = Flask(__name__)
+        self.app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite://'
+        db.init_app(self.app)
+        self.ctx = self.app.app_context()
+        self.ctx.push()
+        db.create_all()
+
+        self.tmpdir = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.ctx.pop()
+        self.tmpdir.cleanup()
+
+    def _variants(self, count):
+        return "".join(
+            f"chr1\t{100 + i}\t.\tA\tG\t50\tPASS\t{'BRCA1;Risk=High' if i % 10 == 0 else 'DP=10'}\tGT\t0/1\n"
+            for i in range(count)
+        )
+
+    def test_reads_all_variants_in_batches(self):
+        path = os.path.join(self.tmpdir.name, "sample.vcf")
+        with open(path, "w") as f:
+            f.write(VCF_HEADER + self._variants(120))
+
+        original = self.ingestion.VCF_BATCH_SIZE
+        self.ingestion.VCF_BATCH_SIZE = 25
+        try:
+            self.assertTrue(self.ingestion.process_file(path))
+        finally:
+            self.ingestion.VCF_BATCH_SIZE = original
+
+        patient = Patient.query.one()
+        self.assertEqual(patient.name, "Sample One")
+        self.assertEqual(GenomicData.query.filter_by(patient_id=patient.id).count(), 120)
+        self.assertEqual(GenomicData.query.filter_by(significance="Pathogenic").count(), 12)
+
+    def test_gzip_input(self):
+        path = os.path.join(self.tmpdir.name, "sample.vcf.gz")
+        with gzip.open(path, "wt") as f:
+            f.write(VCF_HEADER + self._variants(3))
+
+        self.assertTrue(self.ingestion.process_file(path))
+
+        markers = [g.gene_marker for g in GenomicData.query.order_by(GenomicData.id)]
+        self.assertEqual(markers, ["chr1:100", "chr1:101", "chr1:102"])
+
+    def test_header_only_creates_nothing(self):
+        path = os.path.join(self.tmpdir.name, "empty.vcf")
+        with open(path, "w") as f:
+            f.write(VCF_HEADER)
+
+        self.assertTrue(self.ingestion.process_file(path))
+        self.assertEqual(Patient.query.count(), 0)
+
+if __name__ == '__main__':
+    unittest.main()
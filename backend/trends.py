@@ -0,0 +1,81 @@
+from collections import deque
+
+class PercentChangeRule:
+    """Rising/Falling when the latest value moved more than `threshold` (a fraction) from the previous one."""
+    def __init__(self, threshold=0.05):
+        self.threshold = threshold
+        self.name = "percent_change"
+        self.window = 2
+
+    def evaluate(self, values):
+        if len(values) < 2:
+            return "Stable"
+        last, prev = values[-1], values[-2]
+        if last > prev * (1 + self.threshold):
+            return "Rising"
+        if last < prev * (1 - self.threshold):
+            return "Falling"
+        return "Stable"
+
+class SlopeRule:
+    """
+    Least-squares slope over the last `points` readings, relative to their
+    mean. Rising/Falling when it exceeds `threshold` per reading.
+    """
+    def __init__(self, points=5, threshold=0.02):
+        self.points = points
+        self.threshold = threshold
+        self.name = f"slope_{points}"
+        self.window = points
+
+    def evaluate(self, values):
+        values = list(values)[-self.points:]
+        n = len(values)
+        if n < 2:
+            return "Stable"
+        x_mean = (n - 1) / 2
+        y_mean = sum(values) / n
+        slope = sum((x - x_mean) * (y - y_mean) for x, y in enumerate(values)) / \
+            sum((x - x_mean) ** 2 for x in range(n))
+        relative = slope / abs(y_mean) if y_mean else slope
+        if relative > self.threshold:
+            return "Rising"
+        if relative < -self.threshold:
+            return "Falling"
+        return "Stable"
+
+DEFAULT_LAB_RULES = (PercentChangeRule(),)
+
+def compute_lab_trends(labs, rules=DEFAULT_LAB_RULES):
+    """
+    Trend per lab test type from date-sorted `labs` in a single pass.
+
+    Only the last `window` results of each type are kept, where window is the
+    largest any rule needs. The first rule sets 'status'; when more rules are
+    given, every rule's verdict is also reported under 'signals'.
+    """
+    window = max(rule.window for rule in rules)
+    if hasattr(labs, 'tail_by'):
+        # Columnar labs (backend/columnar.py) group without building every row
+        recent = labs.tail_by('test_type', window)
+    else:
+        recent = {}
+        for lab in labs:
+            results = recent.get(lab.test_type)
+            if results is None:
+                results = recent[lab.test_type] = deque(maxlen=window)
+            results.append(lab)
+
+    trends = {}
+    for test_type, results in recent.items():
+        last = results[-1]
+        values = [r.result_value for r in results]
+        trend = {
+            'status': rules[0].evaluate(values),
+            'current': f"{last.result_value} {last.unit}",
+            'flag': last.flag
+        }
+        if len(rules) > 1:
+            trend['signals'] = {rule.name: rule.evaluate(values) for rule in rules}
+        trends[test_type] = trend
+    return trends
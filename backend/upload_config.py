@@ -1,8 +1,10 @@
 import os
 
 UPLOAD_FOLDER = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'uploads')
-ALLOWED_EXTENSIONS = {'txt', 'pdf', 'png', 'jpg', 'jpeg', 'gif', 'dcm', 'csv', 'json'}
+ALLOWED_EXTENSIONS = {'txt', 'pdf', 'png', 'jpg', 'jpeg', 'gif', 'dcm', 'dicom', 'csv', 'json', 'vcf'}
 
 def allowed_file(filename):
+    if filename.lower().endswith('.vcf.gz'):
+        return True
     return '.' in filename and \
            filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
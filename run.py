@@ -1,4 +1,4 @@
-from backend.app import app
-
 if __name__ == "__main__":
+    # Imported here so the parser processes (spawn), which re-import this module, don't build the app
+    from backend.app import app
     app.run(debug=True, port=5000)
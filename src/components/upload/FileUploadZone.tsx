@@ -1,5 +1,5 @@
 import { useState, useCallback } from 'react';
-import { Upload, X, FileText, Image, FileCode, CheckCircle } from 'lucide-react';
+import { Upload, X, FileText, Image, FileCode, CheckCircle, Loader2, AlertCircle } from 'lucide-react';
 import { Card, CardContent, CardHeader, CardTitle } from '@/components/ui/card';
 import { Button } from '@/components/ui/button';
 import { Progress } from '@/components/ui/progress';
@@ -11,9 +11,24 @@ interface UploadedFile {
   size: number;
   type: string;
   progress: number;
-  status: 'uploading' | 'completed' | 'error';
+  // 'queued' / 'running' / 'done' / 'duplicate' follow the ingestion job (/api/jobs/<id>)
+  status: 'uploading' | 'queued' | 'running' | 'done' | 'duplicate' | 'error';
+  rows?: number;
+  error?: string;
+  warning?: string;
 }
 
+// How often an uploaded file's ingestion job is polled
+const JOB_POLL_MS = 1000;
+
+const JOB_STATUS: Record<string, UploadedFile['status']> = {
+  queued: 'queued',
+  running: 'running',
+  succeeded: 'done',
+  duplicate: 'duplicate',
+  failed: 'error',
+};
+
 interface FileUploadZoneProps {
   title: string;
   description: string;
@@ -51,6 +66,10 @@ export function FileUploadZone({
     e.stopPropagation();
   }, []);
 
+  const updateFile = (id: string, changes: Partial<UploadedFile>) => {
+    setFiles((prev) => prev.map((f) => (f.id === id ? { ...f, ...changes } : f)));
+  };
+
   const handleUpload = async (file: File) => {
     const newFile: UploadedFile = {
       id: Math.random().toString(36).substr(2, 9),
@@ -63,33 +82,34 @@ export function FileUploadZone({
 
     setFiles((prev) => [...prev, newFile]);
 
-    try {
-      // Start fake progress for UX
-      const interval = setInterval(() => {
-        setFiles(prev => prev.map(f => {
-          if (f.id === newFile.id && f.progress < 90) {
-            return { ...f, progress: f.progress + 10 };
-          }
-          return f;
-        }));
-      }, 300);
-
-      // Perform real upload
-      await import('@/services/api').then(mod => mod.api.uploadFile(file));
+    // Start fake progress for UX
+    const interval = setInterval(() => {
+      setFiles(prev => prev.map(f => {
+        if (f.id === newFile.id && f.progress < 90) {
+          return { ...f, progress: f.progress + 10 };
+        }
+        return f;
+      }));
+    }, 300);
 
+    try {
+      const { api } = await import('@/services/api');
+      // The upload only queues ingestion (202); the job says how it went
+      const { job_id } = await api.uploadFile(file);
       clearInterval(interval);
-      setFiles((prev) =>
-        prev.map((f) =>
-          f.id === newFile.id ? { ...f, progress: 100, status: 'completed' } : f
-        )
-      );
+      updateFile(newFile.id, { progress: 100, status: 'queued' });
+
+      while (true) {
+        const job = await api.getJobStatus(job_id);
+        const status = JOB_STATUS[job.status] ?? 'running';
+        updateFile(newFile.id, { status, rows: job.progress, error: job.error ?? undefined, warning: job.warning ?? undefined });
+        if (status !== 'queued' && status !== 'running') break;
+        await new Promise((resolve) => setTimeout(resolve, JOB_POLL_MS));
+      }
     } catch (error) {
+      clearInterval(interval);
       console.error("Upload failed for file:", file.name, error);
-      setFiles((prev) =>
-        prev.map((f) =>
-          f.id === newFile.id ? { ...f, status: 'error' } : f
-        )
-      );
+      updateFile(newFile.id, { status: 'error', error: error instanceof Error ? error.message : undefined });
     }
   };
 
@@ -218,10 +238,26 @@ export function FileUploadZone({
                     {file.status === 'uploading' && (
                       <Progress value={file.progress} className="h-1 flex-1" />
                     )}
-                    {file.status === 'completed' && (
-                      <div className="flex items-center gap-1 text-status-normal">
-                        <CheckCircle className="h-3 w-3" />
-                        <span className="text-xs">Uploaded</span>
+                    {(file.status === 'queued' || file.status === 'running') && (
+                      <div className="flex items-center gap-1 text-muted-foreground">
+                        <Loader2 className="h-3 w-3 animate-spin" />
+                        <span className="text-xs">
+                          {file.status === 'queued' ? 'Queued' : `Ingesting${file.rows ? ` (${file.rows} done)` : ''}`}
+                        </span>
+                      </div>
+                    )}
+                    {(file.status === 'done' || file.status === 'duplicate') && (
+                      <div className="flex items-center gap-1 min-w-0 text-status-normal" title={file.warning}>
+                        <CheckCircle className="h-3 w-3 flex-shrink-0" />
+                        <span className="text-xs truncate">
+                          {file.status === 'done' ? (file.warning ? `Ingested, ${file.warning}` : 'Ingested') : 'Already ingested'}
+                        </span>
+                      </div>
+                    )}
+                    {file.status === 'error' && (
+                      <div className="flex items-center gap-1 min-w-0 text-destructive" title={file.error}>
+                        <AlertCircle className="h-3 w-3 flex-shrink-0" />
+                        <span className="text-xs truncate">{file.error || 'Failed'}</span>
                       </div>
                     )}
                   </div>
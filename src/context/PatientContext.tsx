@@ -16,10 +16,13 @@ interface AnalysisData {
     patient: Patient;
     trends: any;
     predictions: any[];
+    // Scores from the last population batch run (backend/risk_batch.py); empty if it hasn't run
+    population_risks: { condition: string; probability: string; reason: string; severity: string; computed_at: string | null }[];
     recent_clinical_notes: any[];
-    history: {
-        vitals: any[];
-        labs: any[];
+    // Counts and date span only; chart series come from api.getPatientHistory
+    history_summary: {
+        vitals: { count: number; first: string | null; last: string | null };
+        labs: { count: number; first: string | null; last: string | null; test_types: string[] };
     };
 }
 
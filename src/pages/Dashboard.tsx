@@ -1,5 +1,6 @@
-import { useEffect } from "react";
+import { useEffect, useState } from "react";
 import { usePatient } from "@/context/PatientContext";
+import { api } from "@/services/api";
 import { HealthSummaryCard } from "@/components/HealthSummaryCard";
 import { RiskPrediction } from "@/components/RiskPrediction";
 import { TrendChart } from "@/components/TrendChart";
@@ -27,8 +28,30 @@ const item = {
   show: { opacity: 1, y: 0 }
 };
 
+// Points per chart series; the backend downsamples long histories (LTTB)
+const CHART_POINTS = 200;
+
 export default function Dashboard() {
   const { patientData: data, loading, setPatientId, refreshPatient } = usePatient();
+  const [history, setHistory] = useState<{ vitals: any[]; labs: any[] }>({ vitals: [], labs: [] });
+
+  useEffect(() => {
+    if (!data) return;
+    let cancelled = false;
+    Promise.all([
+      api.getPatientHistory(data.patient.id, "vitals", { points: CHART_POINTS }),
+      api.getPatientHistory(data.patient.id, "labs", { points: CHART_POINTS }),
+    ])
+      .then(([vitals, labs]) => {
+        if (!cancelled) setHistory({ vitals: vitals.items, labs: labs.items });
+      })
+      .catch(() => {
+        if (!cancelled) setHistory({ vitals: [], labs: [] });
+      });
+    return () => {
+      cancelled = true;
+    };
+  }, [data]);
 
   if (loading) {
     return (
@@ -49,8 +72,8 @@ export default function Dashboard() {
     );
   }
 
-  const a1cData = data.history.labs.filter((l: any) => l.test_type.includes("A1C"));
-  const cholData = data.history.labs.filter((l: any) => l.test_type.includes("Cholesterol"));
+  const a1cData = history.labs.filter((l: any) => l.test_type.includes("A1C"));
+  const cholData = history.labs.filter((l: any) => l.test_type.includes("Cholesterol"));
 
   return (
     <MainLayout>
@@ -155,7 +178,7 @@ export default function Dashboard() {
                 <TrendChart
                   title="Blood Pressure History"
                   subtitle="Systolic vs Diastolic over last 24 months"
-                  data={data.history.vitals}
+                  data={history.vitals}
                   dataKeys={[
                     { key: 'systolic_bp', color: '#ef4444', name: 'Systolic' },
                     { key: 'diastolic_bp', color: '#3b82f6', name: 'Diastolic' }
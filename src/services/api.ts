@@ -26,6 +26,19 @@ export const api = {
             throw error;
         }
     },
+    getPatientHistory: async (id: number, kind: "vitals" | "labs", params: Record<string, string | number> = {}) => {
+        try {
+            const query = new URLSearchParams(Object.entries(params).map(([k, v]) => [k, String(v)]));
+            const response = await fetch(`${API_BASE_URL}/patient/${id}/history/${kind}?${query}`);
+            if (!response.ok) {
+                throw new Error("Failed to fetch patient history");
+            }
+            return await response.json();
+        } catch (error) {
+            console.error("History fetch failed:", error);
+            throw error;
+        }
+    },
     uploadFile: async (file: File, patientId?: number) => {
         const formData = new FormData();
         formData.append("file", file);
@@ -49,6 +62,18 @@ export const api = {
             throw error;
         }
     },
+    getJobStatus: async (jobId: number) => {
+        try {
+            const response = await fetch(`${API_BASE_URL}/jobs/${jobId}`);
+            if (!response.ok) {
+                throw new Error("Failed to fetch job status");
+            }
+            return await response.json();
+        } catch (error) {
+            console.error("Job status fetch failed:", error);
+            throw error;
+        }
+    },
     createPatient: async (patientData: any) => {
         try {
             const response = await fetch(`${API_BASE_URL}/patients/create`, {